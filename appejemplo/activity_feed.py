@@ -0,0 +1,149 @@
+"""
+Feed de actividad reciente para HabitatChile
+
+Construye la lista de "actividad reciente" (postulaciones, beneficiarios y
+proyectos nuevos) con una única consulta UNION ALL ordenada y limitada en la
+base de datos, en vez de tres consultas que luego se mezclan en Python.
+
+El feed soporta paginación por keyset: cada elemento expone un `cursor` que
+puede pasarse como `antes_de` para obtener la actividad más antigua.
+"""
+
+import datetime
+
+from django.db.models import CharField, F, Q, Value
+
+from .models import Beneficiarios, Postulaciones, ProyectosHabitacionales
+
+
+class ActivityFeed:
+    """
+    Feed unificado de actividad reciente.
+
+    Orden: fecha descendente, luego tipo y id descendentes como desempate
+    estable para la paginación por keyset.
+    """
+
+    LIMITE_DEFECTO = 5
+    LIMITE_MAXIMO = 100
+
+    ICONOS = {
+        'postulacion': 'file-earmark-text',
+        'beneficiario': 'person-plus',
+        'proyecto': 'building',
+    }
+
+    # Columnas proyectadas por cada rama del UNION (en este orden)
+    COLUMNAS = ('act_tipo', 'act_id', 'act_fecha', 'act_nombre', 'act_apellidos', 'act_proyecto')
+
+    @classmethod
+    def _rama(cls, queryset, tipo, pk, fecha, nombre=None, apellidos=None, proyecto=None):
+        """Proyecta un queryset a las columnas comunes del feed."""
+        def texto(campo):
+            return F(campo) if campo else Value(None, output_field=CharField())
+
+        # Las anotaciones se agregan siempre en el mismo orden para que las
+        # columnas de todas las ramas del UNION queden alineadas.
+        return queryset.filter(**{f'{fecha}__isnull': False}).annotate(
+            act_tipo=Value(tipo, output_field=CharField()),
+            act_id=F(pk),
+            act_fecha=F(fecha),
+            act_nombre=texto(nombre),
+            act_apellidos=texto(apellidos),
+            act_proyecto=texto(proyecto),
+        ).values(*cls.COLUMNAS).order_by()
+
+    @staticmethod
+    def _filtro_keyset(tipo, pk, fecha, cursor):
+        """Condición (fecha, tipo, id) < cursor para una rama de tipo constante."""
+        c_fecha, c_tipo, c_id = cursor
+        condicion = Q(**{f'{fecha}__lt': c_fecha})
+        if tipo < c_tipo:
+            condicion |= Q(**{fecha: c_fecha})
+        elif tipo == c_tipo:
+            condicion |= Q(**{fecha: c_fecha, f'{pk}__lt': c_id})
+        return condicion
+
+    @staticmethod
+    def codificar_cursor(fecha, tipo, pk):
+        return f"{fecha.isoformat()}:{tipo}:{pk}"
+
+    @classmethod
+    def decodificar_cursor(cls, raw):
+        """Convierte 'YYYY-MM-DD:tipo:id' en tupla; lanza ValueError si es inválido."""
+        try:
+            fecha, tipo, pk = str(raw).split(':')
+            fecha = datetime.date.fromisoformat(fecha)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise ValueError('cursor inválido')
+        if tipo not in cls.ICONOS:
+            raise ValueError('cursor inválido')
+        return fecha, tipo, pk
+
+    @classmethod
+    def _ramas(cls, cursor=None):
+        fuentes = [
+            (Postulaciones.objects.all(), 'postulacion', 'id_postulacion', 'fecha_postulacion',
+             'id_beneficiario__nombre', 'id_beneficiario__apellidos', 'id_proyecto__nombre_proyecto'),
+            (Beneficiarios.objects.all(), 'beneficiario', 'id_beneficiario', 'fecha_registro',
+             'nombre', 'apellidos', None),
+            (ProyectosHabitacionales.objects.all(), 'proyecto', 'id_proyecto', 'fecha_inicio',
+             None, None, 'nombre_proyecto'),
+        ]
+        ramas = []
+        for qs, tipo, pk, fecha, nombre, apellidos, proyecto in fuentes:
+            if cursor is not None:
+                qs = qs.filter(cls._filtro_keyset(tipo, pk, fecha, cursor))
+            ramas.append(cls._rama(qs, tipo, pk, fecha, nombre, apellidos, proyecto))
+        return ramas
+
+    @classmethod
+    def queryset(cls, limite=None, antes_de=None):
+        """
+        Devuelve el queryset UNION ALL ordenado y limitado (una sola consulta).
+
+        Args:
+            limite: Número máximo de elementos (por defecto LIMITE_DEFECTO)
+            antes_de: Cursor (string o tupla) del último elemento ya mostrado
+        """
+        if isinstance(antes_de, str):
+            antes_de = cls.decodificar_cursor(antes_de)
+        limite = min(int(limite or cls.LIMITE_DEFECTO), cls.LIMITE_MAXIMO)
+        primera, *resto = cls._ramas(antes_de)
+        union = primera.union(*resto, all=True)
+        return union.order_by('-act_fecha', '-act_tipo', '-act_id')[:limite]
+
+    @classmethod
+    def _descripcion(cls, fila):
+        tipo = fila['act_tipo']
+        nombre_completo = f"{fila['act_nombre']} {fila['act_apellidos']}"
+        if tipo == 'postulacion':
+            beneficiario = nombre_completo if (fila['act_nombre'] or fila['act_apellidos']) else "Beneficiario no especificado"
+            proyecto = fila['act_proyecto'] or "Proyecto no especificado"
+            return f"Nueva postulación de {beneficiario} para {proyecto}"
+        if tipo == 'beneficiario':
+            return f"Nuevo beneficiario registrado: {nombre_completo}"
+        return f"Nuevo proyecto: {fila['act_proyecto']}"
+
+    @classmethod
+    def obtener(cls, limite=None, antes_de=None):
+        """
+        Devuelve la actividad reciente como lista de dicts listos para plantilla o API.
+
+        Cada dict contiene: tipo, id, descripcion, fecha, icon y cursor.
+        """
+        actividades = []
+        for fila in cls.queryset(limite=limite, antes_de=antes_de):
+            fecha = fila['act_fecha']
+            if isinstance(fecha, str):
+                fecha = datetime.date.fromisoformat(fecha)
+            actividades.append({
+                'tipo': fila['act_tipo'],
+                'id': fila['act_id'],
+                'descripcion': cls._descripcion(fila),
+                'fecha': fecha,
+                'icon': cls.ICONOS[fila['act_tipo']],
+                'cursor': cls.codificar_cursor(fecha, fila['act_tipo'], fila['act_id']),
+            })
+        return actividades
@@ -0,0 +1,352 @@
+"""
+Índice de autocompletado de direcciones (trie en memoria del proceso)
+
+Sugiere direcciones ya registradas en `Terrenos`, `EmpresasConstructoras` y
+`ProyectosHabitacionales` (dirección de su terreno). Cada dirección
+normalizada (con su municipio) es una entrada con peso = cantidad de
+registros que la usan. La entrada se inserta en el trie desde cada inicio de
+palabra (hasta MAX_WORD_STARTS), de modo que "irarraz" encuentra "Avenida
+Irarrázaval 3000". Cada nodo guarda sus TOP_K mejores entradas, así que una
+consulta recorre len(q) nodos y no explora subárboles.
+
+El índice se construye en la primera consulta y luego se actualiza en forma
+incremental con post_save/post_delete (ver apps.py; guardar un terreno
+actualiza también sus proyectos); ADDRESS_INDEX_TTL acota la
+desincronización con cambios hechos por otros procesos, reconstruyéndolo en
+segundo plano.
+"""
+
+import gc
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .geocoding import normalize_address
+from .models import EmpresasConstructoras, ProyectosHabitacionales, Terrenos
+
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_INDEX_TTL = getattr(settings, 'ADDRESS_INDEX_TTL', 900)
+
+# Sugerencias guardadas por nodo (= máximo por consulta)
+TOP_K = 10
+# Profundidad máxima del trie; consultas más largas se filtran por prefijo
+MAX_DEPTH = 24
+# Inicios de palabra indexados por dirección
+MAX_WORD_STARTS = 4
+
+
+class _Node:
+    __slots__ = ('children', 'terminal', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.terminal = None  # set de claves que terminan aquí (se crea al primer uso)
+        self.top = ()
+
+
+def _word_starts(text):
+    starts = [0] + [i + 1 for i, c in enumerate(text) if c == ' ' and i + 1 < len(text) and text[i + 1].isalpha()]
+    return starts[:MAX_WORD_STARTS]
+
+
+class AddressIndex:
+    def __init__(self):
+        self.root = _Node()
+        self.entries = {}   # clave -> dict(direccion, municipio, latitud, longitud, peso)
+        self.records = {}   # (modelo, pk) -> clave
+        self._lock = threading.RLock()
+
+    # ===== estructura =====
+
+    def _rank(self, key):
+        e = self.entries[key]
+        return -e['peso'], key
+
+    def _recompute(self, node):
+        if not node.terminal and len(node.children) == 1:
+            # tramo sin bifurcaciones: compartir la lista del hijo (nunca se modifica en el lugar)
+            node.top = next(iter(node.children.values())).top
+            return
+        candidates = set(node.terminal or ())
+        for child in node.children.values():
+            candidates.update(child.top)
+        node.top = sorted(candidates, key=self._rank)[:TOP_K]
+
+    def _paths(self, key, create):
+        """Nodos de cada camino (uno por inicio de palabra) de la entrada."""
+        paths = []
+        for start in _word_starts(key):
+            node, path = self.root, [self.root]
+            for ch in key[start:start + MAX_DEPTH]:
+                nxt = node.children.get(ch)
+                if nxt is None:
+                    if not create:
+                        break
+                    nxt = node.children[ch] = _Node()
+                node = nxt
+                path.append(node)
+            paths.append(path)
+        return paths
+
+    def _refresh(self, paths):
+        # de lo más profundo hacia la raíz, sobre la unión de caminos (pueden compartir nodos)
+        nodes = {}
+        for path in paths:
+            for depth, node in enumerate(path):
+                nodes[id(node)] = (depth, node)
+        for _, node in sorted(nodes.values(), key=lambda item: -item[0]):
+            self._recompute(node)
+
+    def _prune(self, path):
+        for parent, node in zip(reversed(path[:-1]), reversed(path)):
+            if node.children or node.terminal:
+                return
+            for ch, child in list(parent.children.items()):
+                if child is node:
+                    del parent.children[ch]
+
+    # ===== registros =====
+
+    def _add(self, key, direccion, municipio, lat, lng, refresh=True):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = {'direccion': direccion, 'municipio': municipio,
+                                 'latitud': lat, 'longitud': lng, 'peso': 1}
+            paths = self._paths(key, create=True)
+            for path in paths:
+                node = path[-1]
+                if node.terminal is None:
+                    node.terminal = set()
+                node.terminal.add(key)
+        else:
+            entry['peso'] += 1
+            if entry['latitud'] is None and lat is not None:
+                entry['latitud'], entry['longitud'] = lat, lng
+            paths = self._paths(key, create=False)
+        if refresh:
+            self._refresh(paths)
+
+    def _remove(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return
+        paths = self._paths(key, create=False)
+        entry['peso'] -= 1
+        if entry['peso'] <= 0:
+            del self.entries[key]
+            for path in paths:
+                if path[-1].terminal:
+                    path[-1].terminal.discard(key)
+        self._refresh(paths)
+        if key not in self.entries:
+            for path in paths:
+                self._prune(path)
+
+    def update_record(self, record, direccion, municipio=None, lat=None, lng=None, refresh=True):
+        """Agrega, mueve o quita (sin dirección) el registro `record` = (modelo, pk)."""
+        key = normalize_address(f'{direccion}, {municipio}' if municipio else direccion) if direccion else ''
+        lat = float(lat) if lat is not None else None
+        lng = float(lng) if lng is not None else None
+        with self._lock:
+            old = self.records.get(record)
+            if old == key:
+                entry = self.entries.get(key) if key else None
+                if entry is not None and lat is not None:
+                    entry['latitud'], entry['longitud'] = lat, lng
+                return
+            if old:
+                self._remove(old)
+                del self.records[record]
+            if key:
+                self.records[record] = key
+                self._add(key, direccion.strip(), municipio, lat, lng, refresh=refresh)
+
+    def remove_record(self, record):
+        with self._lock:
+            old = self.records.pop(record, None)
+            if old:
+                self._remove(old)
+
+    def finish(self):
+        """Calcula los TOP_K de todos los nodos tras una carga masiva (refresh=False)."""
+        with self._lock:
+            stack, order = [self.root], []
+            while stack:
+                node = stack.pop()
+                order.append(node)
+                stack.extend(node.children.values())
+            for node in reversed(order):
+                self._recompute(node)
+        return self
+
+    # ===== consulta =====
+
+    def suggest(self, query, limit=TOP_K):
+        q = normalize_address(query)
+        if not q:
+            return []
+        with self._lock:
+            node = self.root
+            for ch in q[:MAX_DEPTH]:
+                node = node.children.get(ch)
+                if node is None:
+                    return []
+            keys = node.top
+            if len(q) > MAX_DEPTH:
+                # bajo la profundidad máxima: filtrar el subárbol por el prefijo completo
+                found, stack = set(), [node]
+                while stack:
+                    n = stack.pop()
+                    found.update(k for k in n.terminal or () if any(k[s:].startswith(q) for s in _word_starts(k)))
+                    stack.extend(n.children.values())
+                keys = sorted(found, key=self._rank)
+            return [dict(self.entries[k], clave=k) for k in keys[:limit]]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+# ===== fuentes =====
+
+def _terreno_record(t):
+    municipio = t.id_municipio.nombre_municipio if t.id_municipio_id else None
+    return ('terreno', t.pk), t.direccion, municipio, t.latitud, t.longitud
+
+
+def _empresa_record(e):
+    return ('empresa', e.pk), e.direccion, None, e.latitud, e.longitud
+
+
+def _proyecto_record(p):
+    terreno = p.id_terreno
+    direccion = terreno.direccion if terreno else None
+    municipio = p.id_municipio.nombre_municipio if p.id_municipio_id else None
+    return ('proyecto', p.pk), direccion, municipio, p.latitud, p.longitud
+
+
+def build_index():
+    index = AddressIndex()
+    sources = (
+        (Terrenos.objects.select_related('id_municipio').exclude(direccion__isnull=True), _terreno_record),
+        (EmpresasConstructoras.objects.exclude(direccion__isnull=True), _empresa_record),
+        (ProyectosHabitacionales.objects.select_related('id_terreno', 'id_municipio')
+         .exclude(id_terreno__direccion__isnull=True), _proyecto_record),
+    )
+    # la carga crea cientos de miles de nodos pequeños: con el GC cíclico
+    # activo la construcción es varias veces más lenta
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for qs, to_record in sources:
+            for obj in qs.iterator(chunk_size=2000):
+                record, direccion, municipio, lat, lng = to_record(obj)
+                index.update_record(record, direccion, municipio, lat, lng, refresh=False)
+        return index.finish()
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+_index = None
+_built_at = 0.0
+_rebuild_thread = None
+_pending = None     # cambios recibidos durante una reconstrucción, para reaplicarlos al índice nuevo
+_lock = threading.Lock()
+
+
+def _rebuild():
+    global _index, _built_at, _rebuild_thread, _pending
+    try:
+        index = build_index()
+        with _lock:
+            for change in _pending or ():
+                change(index)
+            _index = index
+            _built_at = time.monotonic()
+    except Exception:
+        # se sigue sirviendo el índice anterior; la próxima consulta lo reintenta
+        logger.exception('No se pudo reconstruir el índice de direcciones')
+    finally:
+        with _lock:
+            _rebuild_thread = None
+            _pending = None
+        connection.close()
+
+
+def get_index():
+    """
+    Índice del proceso: se construye en la primera consulta; vencido
+    ADDRESS_INDEX_TTL se reconstruye en un hilo y se reemplaza al terminar,
+    sin bloquear las consultas que llegan mientras tanto.
+    """
+    global _index, _built_at, _rebuild_thread, _pending
+    with _lock:
+        if _index is None:
+            _index = build_index()
+            _built_at = time.monotonic()
+        elif time.monotonic() - _built_at > ADDRESS_INDEX_TTL and _rebuild_thread is None:
+            _pending = []
+            _rebuild_thread = threading.Thread(target=_rebuild, name='address-index-rebuild', daemon=True)
+            _rebuild_thread.start()
+        return _index
+
+
+def reset_index():
+    global _index
+    with _lock:
+        _index = None
+
+
+_RECORDS = {Terrenos: _terreno_record, EmpresasConstructoras: _empresa_record, ProyectosHabitacionales: _proyecto_record}
+
+
+def _apply(change):
+    with _lock:
+        if _index is not None:
+            change(_index)
+        if _pending is not None:
+            _pending.append(change)
+
+
+def _terreno_projects(terreno_id):
+    """Registros de los proyectos que muestran la dirección del terreno `terreno_id`."""
+    proyectos = (ProyectosHabitacionales.objects.select_related('id_terreno', 'id_municipio')
+                 .filter(id_terreno_id=terreno_id))
+    return [_proyecto_record(p) for p in proyectos]
+
+
+def index_saved(sender, instance, **kwargs):
+    """
+    Receptor post_save: actualiza el índice si ya está construido (si no, se
+    construirá completo). El cambio se aplica al confirmar la transacción,
+    como en gazetteer.py, para no sugerir direcciones de un rollback.
+    """
+    if _index is None:
+        return
+    records = [_RECORDS[sender](instance)]
+    if sender is Terrenos:
+        records += _terreno_projects(instance.pk)
+
+    def change(index):
+        for record in records:
+            index.update_record(*record)
+    transaction.on_commit(lambda: _apply(change))
+
+
+def index_deleted(sender, instance, **kwargs):
+    if _index is None:
+        return
+    key = _RECORDS[sender](instance)[0]
+    # sin el terreno, sus proyectos quedan sin dirección y salen del índice
+    records = _terreno_projects(instance.pk) if sender is Terrenos else []
+
+    def change(index):
+        index.remove_record(key)
+        for record in records:
+            index.update_record(*record)
+    transaction.on_commit(lambda: _apply(change))
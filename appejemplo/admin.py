@@ -49,30 +49,25 @@ class ProyectosHabitacionalesAdmin(admin.ModelAdmin):
 
     def geocode_selected_projects(self, request, queryset):
         """Admin action: geocode selected projects using Terreno.direccion or municipio+nombre."""
-        from geopy.geocoders import Nominatim
-        geolocator = Nominatim(user_agent='pjrEjemplo-admin-geocode')
+        from .geocoding import geocode, geocode_stats, project_address, reset_geocode_stats
+        reset_geocode_stats()
         updated = 0
-        for p in queryset:
+        for p in queryset.select_related('id_terreno', 'id_municipio'):
             if p.latitud and p.longitud:
                 continue
-            q = None
-            if p.id_terreno and p.id_terreno.direccion:
-                q = f"{p.id_terreno.direccion}, {p.id_municipio.nombre_municipio if p.id_municipio else ''}, Chile"
-            else:
-                # fallback: municipio + nombre de proyecto
-                municipio = p.id_municipio.nombre_municipio if p.id_municipio else ''
-                q = f"{p.nombre_proyecto}, {municipio}, Chile"
             try:
-                loc = geolocator.geocode(q, timeout=10)
-                if loc:
-                    p.latitud = round(loc.latitude, 6)
-                    p.longitud = round(loc.longitude, 6)
+                coords = geocode(project_address(p))
+                if coords:
+                    p.latitud = round(coords[0], 6)
+                    p.longitud = round(coords[1], 6)
                     p.save()
                     updated += 1
             except Exception:
                 # ignorar errores individuales
                 continue
-        self.message_user(request, f"Geocodificados: {updated} proyectos (si los datos estaban disponibles)")
+        stats = geocode_stats()
+        self.message_user(request, f"Geocodificados: {updated} proyectos (si los datos estaban disponibles). "
+                                   f"Caché: {stats['lru_hits'] + stats['db_hits']} aciertos, {stats['misses']} consultas remotas")
     geocode_selected_projects.short_description = 'Geocodificar proyectos seleccionados (Nominatim)'
 
 
@@ -149,6 +144,13 @@ class MatchingAdmin(admin.ModelAdmin):
 @admin.register(Evento)
 class EventoAdmin(admin.ModelAdmin):
     list_display = ['id_evento', 'titulo', 'tipo', 'fecha_inicio', 'fecha_fin', 'proyecto']
-    list_filter = ['tipo', 'fecha_inicio']
+    list_filter = ['tipo', 'recurrencia_freq', 'fecha_inicio']
     search_fields = ['titulo', 'descripcion', 'ubicacion']
     filter_horizontal = ('asignados',)
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+    list_display = ['direccion_normalizada', 'estado', 'latitud', 'longitud', 'fecha_actualizacion']
+    list_filter = ['estado']
+    search_fields = ['direccion_normalizada']
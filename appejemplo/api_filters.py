@@ -0,0 +1,100 @@
+"""
+Filtros estructurados para los viewsets de la API
+
+Cada vista declara `filter_fields = {'parametro': 'ruta__orm'}` y el backend
+traduce la query string en condiciones indexables:
+
+- `?estado=Aprobada` igualdad; `?estado=Aprobada,Pendiente` -> IN,
+- `?fecha_postulacion_desde=2026-01-01&fecha_postulacion_hasta=2026-03-31`
+  rango cerrado (para DateTimeField una fecha sola en `_hasta` incluye el
+  día completo),
+- las rutas pueden cruzar relaciones: `region` ->
+  `id_proyecto__id_municipio__id_region`.
+
+Los valores se convierten con el campo del modelo; uno inválido responde 400.
+A diferencia de SearchFilter (icontains sobre varias columnas) estas
+condiciones usan los índices declarados en models.py.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import models
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+
+RANGE_SUFFIXES = {'_desde': 'gte', '_hasta': 'lte'}
+
+
+def _target_field(model, path):
+    """Campo del modelo al final de `path` (para una FK, la clave primaria referida)."""
+    field = None
+    for part in path.split('__'):
+        field = model._meta.get_field(part)
+        if field.is_relation:
+            model = field.related_model
+    if field.is_relation:
+        field = field.target_field
+    return field
+
+
+class FieldFilterBackend(BaseFilterBackend):
+    def _convert(self, field, param, raw):
+        try:
+            value = field.to_python(raw)
+        except DjangoValidationError:
+            raise serializers.ValidationError({param: [f'Valor inválido: {raw}']})
+        if value is None:
+            raise serializers.ValidationError({param: [f'Valor inválido: {raw}']})
+        if isinstance(field, models.DateTimeField) and settings.USE_TZ and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        return value
+
+    def get_conditions(self, request, view):
+        conditions = {}
+        params = request.query_params
+        for param, path in (getattr(view, 'filter_fields', None) or {}).items():
+            field = _target_field(view.queryset.model, path)
+
+            raw = params.get(param)
+            if raw not in (None, ''):
+                values = [v.strip() for v in raw.split(',') if v.strip()]
+                if len(values) == 1:
+                    conditions[path] = self._convert(field, param, values[0])
+                elif values:
+                    conditions[f'{path}__in'] = [self._convert(field, param, v) for v in values]
+
+            for suffix, lookup in RANGE_SUFFIXES.items():
+                raw = params.get(param + suffix)
+                if raw in (None, ''):
+                    continue
+                value = self._convert(field, param + suffix, raw.strip())
+                if isinstance(field, models.DateTimeField) and lookup == 'lte' and len(raw.strip()) == 10:
+                    # '2026-03-31' como límite superior abarca todo ese día
+                    conditions[f'{path}__lt'] = value + datetime.timedelta(days=1)
+                else:
+                    conditions[f'{path}__{lookup}'] = value
+        return conditions
+
+    def filter_queryset(self, request, queryset, view):
+        conditions = self.get_conditions(request, view)
+        return queryset.filter(**conditions) if conditions else queryset
+
+    def get_schema_operation_parameters(self, view):
+        parameters = []
+        for param, path in (getattr(view, 'filter_fields', None) or {}).items():
+            try:
+                field = _target_field(view.queryset.model, path)
+            except FieldDoesNotExist:
+                continue
+            names = [param] + [param + suffix for suffix in RANGE_SUFFIXES]
+            for name in names:
+                parameters.append({
+                    'name': name, 'required': False, 'in': 'query',
+                    'description': f'Filtro sobre {path} ({field.get_internal_type()}).',
+                    'schema': {'type': 'string'},
+                })
+        return parameters
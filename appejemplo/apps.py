@@ -4,3 +4,33 @@ from django.apps import AppConfig
 class AppejemploConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'appejemplo'
+
+    def ready(self):
+        from django.contrib.auth.models import User
+        from django.db.models.signals import post_delete, post_save
+        from .address_index import index_deleted, index_saved
+        from .gazetteer import invalidate_gazetteer
+        from .models import (EmpresasConstructoras, Municipios, ProyectosHabitacionales, Regiones, Terrenos,
+                             UserProfile, UsuariosSistema)
+        from .proyectos_geo import invalidate_geo_cache
+        from .roles import invalidate_role_cache
+
+        # Mantener coherente la caché de roles cuando cambian usuarios o perfiles
+        for model in (User, UserProfile, UsuariosSistema):
+            post_save.connect(invalidate_role_cache, sender=model, dispatch_uid=f'roles_cache_save_{model.__name__}')
+            post_delete.connect(invalidate_role_cache, sender=model, dispatch_uid=f'roles_cache_delete_{model.__name__}')
+
+        # El GeoJSON cacheado del mapa de proyectos depende de proyectos y terrenos
+        for model in (ProyectosHabitacionales, Terrenos):
+            post_save.connect(invalidate_geo_cache, sender=model, dispatch_uid=f'proyectos_geo_save_{model.__name__}')
+            post_delete.connect(invalidate_geo_cache, sender=model, dispatch_uid=f'proyectos_geo_delete_{model.__name__}')
+
+        # El gazetteer local se reconstruye cuando cambian sus fuentes
+        for model in (ProyectosHabitacionales, Terrenos, Municipios, Regiones):
+            post_save.connect(invalidate_gazetteer, sender=model, dispatch_uid=f'gazetteer_save_{model.__name__}')
+            post_delete.connect(invalidate_gazetteer, sender=model, dispatch_uid=f'gazetteer_delete_{model.__name__}')
+
+        # Índice de autocompletado de direcciones: actualización incremental
+        for model in (Terrenos, EmpresasConstructoras, ProyectosHabitacionales):
+            post_save.connect(index_saved, sender=model, dispatch_uid=f'address_index_save_{model.__name__}')
+            post_delete.connect(index_deleted, sender=model, dispatch_uid=f'address_index_delete_{model.__name__}')
@@ -0,0 +1,236 @@
+"""
+Geocodificación inversa local: punto -> municipio/región
+
+Los límites comunales se cargan desde un GeoJSON (settings.COMUNAS_GEOJSON o
+el archivo indicado al comando `assign_municipios`). Cada feature se asocia a
+un `Municipios` por código (propiedad `codigo_municipio`/`cut`/`codigo`) o
+por nombre normalizado (`nombre_municipio`/`comuna`/`nombre`/`name`).
+
+Búsqueda:
+
+1. un STR-tree (Sort-Tile-Recursive) sobre los rectángulos envolventes de
+   las comunas descarta en O(log n) las que no pueden contener el punto,
+2. ray casting (par-impar, soporta agujeros y multipolígonos) sobre las
+   aristas de la franja de latitud del punto: cada polígono reparte sus
+   aristas en franjas horizontales, de modo que se prueban unas pocas
+   aristas aunque el límite tenga miles de vértices.
+"""
+
+import json
+import math
+import threading
+
+from django.conf import settings
+
+from .geocoding import normalize_address
+from .models import EmpresasConstructoras, Municipios, ProyectosHabitacionales, Terrenos
+
+
+COMUNAS_GEOJSON = getattr(settings, 'COMUNAS_GEOJSON', None)
+
+CODE_PROPERTIES = ('codigo_municipio', 'cut', 'codigo', 'cod_comuna')
+NAME_PROPERTIES = ('nombre_municipio', 'comuna', 'nombre', 'name')
+
+# Aristas promedio por franja al particionar un polígono
+EDGES_PER_BAND = 8
+
+
+class STRTree:
+    """Árbol R estático empaquetado con Sort-Tile-Recursive. `items`: [(bbox, valor)], bbox = (minx, miny, maxx, maxy)."""
+
+    def __init__(self, items, node_capacity=10):
+        self.node_capacity = max(2, node_capacity)
+        level = [(bbox, value, None) for bbox, value in items]
+        while len(level) > 1:
+            level = self._pack(level)
+        self.root = level[0] if level else None
+
+    def _pack(self, nodes):
+        cap = self.node_capacity
+        n_parents = math.ceil(len(nodes) / cap)
+        n_slices = math.ceil(math.sqrt(n_parents))
+        by_x = sorted(nodes, key=lambda n: n[0][0] + n[0][2])
+        slice_size = n_slices * cap
+        parents = []
+        for i in range(0, len(by_x), slice_size):
+            column = sorted(by_x[i:i + slice_size], key=lambda n: n[0][1] + n[0][3])
+            for j in range(0, len(column), cap):
+                children = column[j:j + cap]
+                bbox = (min(c[0][0] for c in children), min(c[0][1] for c in children),
+                        max(c[0][2] for c in children), max(c[0][3] for c in children))
+                parents.append((bbox, None, children))
+        return parents
+
+    def query_point(self, x, y):
+        """Valores cuyo rectángulo contiene (x, y)."""
+        if self.root is None:
+            return []
+        found, stack = [], [self.root]
+        while stack:
+            (minx, miny, maxx, maxy), value, children = stack.pop()
+            if x < minx or x > maxx or y < miny or y > maxy:
+                continue
+            if children is None:
+                found.append(value)
+            else:
+                stack.extend(children)
+        return found
+
+
+class BandedPolygon:
+    """Polígono (o multipolígono) con sus aristas repartidas en franjas de latitud."""
+
+    def __init__(self, rings):
+        edges = []
+        for ring in rings:
+            pts = [(float(p[0]), float(p[1])) for p in ring]
+            if len(pts) < 3:
+                continue
+            if pts[0] != pts[-1]:
+                pts.append(pts[0])
+            edges.extend((a[0], a[1], b[0], b[1]) for a, b in zip(pts, pts[1:]) if a[1] != b[1])
+        xs = [e[0] for e in edges] + [e[2] for e in edges]
+        ys = [e[1] for e in edges] + [e[3] for e in edges]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys)) if edges else (0.0, 0.0, -1.0, -1.0)
+        self.n_bands = max(1, len(edges) // EDGES_PER_BAND)
+        self.band_height = ((self.bbox[3] - self.bbox[1]) / self.n_bands) or 1.0
+        self.bands = [[] for _ in range(self.n_bands)]
+        for e in edges:
+            lo, hi = self._band(min(e[1], e[3])), self._band(max(e[1], e[3]))
+            for b in range(lo, hi + 1):
+                self.bands[b].append(e)
+
+    def _band(self, y):
+        return min(self.n_bands - 1, max(0, int((y - self.bbox[1]) / self.band_height)))
+
+    def contains(self, x, y):
+        minx, miny, maxx, maxy = self.bbox
+        if x < minx or x > maxx or y < miny or y > maxy:
+            return False
+        inside = False
+        for x1, y1, x2, y2 in self.bands[self._band(y)]:
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+
+def _rings(geometry):
+    kind, coords = geometry.get('type'), geometry.get('coordinates') or []
+    if kind == 'Polygon':
+        return list(coords)
+    if kind == 'MultiPolygon':
+        return [ring for polygon in coords for ring in polygon]
+    return []
+
+
+def _first(props, keys):
+    for k in keys:
+        if props.get(k) not in (None, ''):
+            return str(props[k])
+    return None
+
+
+class BoundaryIndex:
+    """Índice de comunas: `locate(lat, lng)` -> (id_municipio, id_region) o None."""
+
+    def __init__(self, features, municipios):
+        """`municipios`: iterable de (id_municipio, codigo, nombre, id_region)."""
+        by_code, by_name = {}, {}
+        for pk, codigo, nombre, region in municipios:
+            if codigo:
+                by_code[str(codigo).lstrip('0')] = (pk, region)
+            by_name[normalize_address(nombre)] = (pk, region)
+        items = []
+        self.unmatched = []
+        for feature in features:
+            props = feature.get('properties') or {}
+            code, name = _first(props, CODE_PROPERTIES), _first(props, NAME_PROPERTIES)
+            target = by_code.get(code.lstrip('0')) if code else None
+            if target is None and name:
+                target = by_name.get(normalize_address(name))
+            if target is None:
+                self.unmatched.append(name or code)
+                continue
+            polygon = BandedPolygon(_rings(feature.get('geometry') or {}))
+            items.append((polygon.bbox, (polygon, target)))
+        self.size = len(items)
+        self.tree = STRTree(items)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return cls.from_geojson(data)
+
+    @classmethod
+    def from_geojson(cls, data):
+        municipios = Municipios.objects.values_list('id_municipio', 'codigo_municipio', 'nombre_municipio', 'id_region_id')
+        return cls(data.get('features') or [], list(municipios))
+
+    def locate(self, lat, lng):
+        if lat is None or lng is None:
+            return None
+        x, y = float(lng), float(lat)
+        for polygon, target in self.tree.query_point(x, y):
+            if polygon.contains(x, y):
+                return target
+        return None
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_boundary_index():
+    """Índice del archivo settings.COMUNAS_GEOJSON (cargado una vez por proceso), o None si no está configurado."""
+    global _index
+    if not COMUNAS_GEOJSON:
+        return None
+    with _lock:
+        if _index is None:
+            _index = BoundaryIndex.from_file(COMUNAS_GEOJSON)
+        return _index
+
+
+def locate_municipio(lat, lng):
+    """(id_municipio, id_region) del punto según los límites configurados, o None."""
+    index = get_boundary_index()
+    return index.locate(lat, lng) if index else None
+
+
+def assign_municipios(index, fix=False, only_missing=False, chunk_size=2000):
+    """
+    Valida (y con `fix` corrige) el municipio de proyectos y terrenos según sus
+    coordenadas. Las empresas no tienen municipio: sólo se informa si caen en
+    alguna comuna. Devuelve estadísticas por modelo.
+    """
+    stats = {}
+    for model in (ProyectosHabitacionales, Terrenos):
+        s = stats[model.__name__] = {'total': 0, 'outside': 0, 'ok': 0, 'missing': 0, 'mismatch': 0, 'updated': 0}
+        changes = {}
+        rows = (model.objects.filter(latitud__isnull=False, longitud__isnull=False)
+                .values_list('pk', 'latitud', 'longitud', 'id_municipio_id'))
+        for pk, lat, lng, actual in rows.iterator(chunk_size=chunk_size):
+            s['total'] += 1
+            found = index.locate(lat, lng)
+            if found is None:
+                s['outside'] += 1
+            elif actual == found[0]:
+                s['ok'] += 1
+            else:
+                s['missing' if actual is None else 'mismatch'] += 1
+                if actual is None or not only_missing:
+                    changes.setdefault(found[0], []).append(pk)
+        if fix:
+            # una actualización por municipio destino, en lotes de pks
+            for municipio_id, pks in changes.items():
+                for i in range(0, len(pks), chunk_size):
+                    s['updated'] += model.objects.filter(pk__in=pks[i:i + chunk_size]).update(id_municipio=municipio_id)
+
+    s = stats['EmpresasConstructoras'] = {'total': 0, 'outside': 0, 'located': 0}
+    rows = (EmpresasConstructoras.objects.filter(latitud__isnull=False, longitud__isnull=False)
+            .values_list('latitud', 'longitud'))
+    for lat, lng in rows.iterator(chunk_size=chunk_size):
+        s['total'] += 1
+        s['located' if index.locate(lat, lng) else 'outside'] += 1
+    return stats
@@ -0,0 +1,297 @@
+"""
+Altas y modificaciones masivas en la API (cuerpo JSON con una lista)
+
+`POST /api/<colección>/` con una lista crea todos los elementos y
+`PATCH /api/<colección>/` con una lista (cada elemento con su clave primaria)
+los modifica parcialmente. Cada elemento se valida con el serializer de la
+vista, pero las relaciones (PrimaryKeyRelatedField) y los campos únicos se
+resuelven con una consulta por lote en vez de una por elemento; la escritura
+usa bulk_create/bulk_update en bloques de API_BULK_CHUNK_SIZE.
+
+Modo de confirmación (`?atomico=1|0`, por defecto settings.API_BULK_ATOMIC):
+
+- atómico: si algún elemento falla no se escribe nada (HTTP 400),
+- parcial: se escriben los válidos y se informa el resto (HTTP 207).
+
+La respuesta trae un resultado por elemento, en el orden recibido.
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, connection, transaction
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter, Route
+from rest_framework.validators import UniqueValidator
+
+
+logger = logging.getLogger(__name__)
+
+API_BULK_MAX_ITEMS = getattr(settings, 'API_BULK_MAX_ITEMS', 5000)
+API_BULK_CHUNK_SIZE = getattr(settings, 'API_BULK_CHUNK_SIZE', 500)
+API_BULK_ATOMIC = getattr(settings, 'API_BULK_ATOMIC', True)
+
+TRUE_VALUES = ('1', 'true', 'si', 'sí', 'yes')
+
+# El detalle del error de base de datos va al log, no a la respuesta
+WRITE_ERROR_MESSAGE = 'No se pudo guardar el elemento.'
+
+
+class BulkRouter(DefaultRouter):
+    """DefaultRouter que además enruta PATCH sobre la colección a `bulk_partial_update` (si la vista lo define)."""
+
+    routes = [
+        route._replace(mapping={**route.mapping, 'patch': 'bulk_partial_update'})
+        if isinstance(route, Route) and route.mapping.get('get') == 'list' else route
+        for route in DefaultRouter.routes
+    ]
+
+
+class _Preloaded:
+    """Sustituto del queryset de un PrimaryKeyRelatedField con los objetos del lote ya cargados."""
+
+    def __init__(self, model, objects):
+        self.model = model
+        self.objects = objects
+
+    def get(self, pk):
+        try:
+            key = self.model._meta.pk.to_python(pk)
+        except DjangoValidationError:
+            raise ValueError(pk)
+        try:
+            return self.objects[key]
+        except KeyError:
+            raise self.model.DoesNotExist
+
+
+def _preload_related(serializer, items):
+    for name, field in serializer.fields.items():
+        if field.read_only or not isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue
+        queryset = field.get_queryset()
+        pk_field = queryset.model._meta.pk
+        keys = set()
+        for item in items:
+            value = item.get(field.source) if isinstance(item, dict) else None
+            if value is None or isinstance(value, bool):
+                continue
+            try:
+                keys.add(pk_field.to_python(value))
+            except DjangoValidationError:
+                continue
+        field.queryset = _Preloaded(queryset.model, queryset.in_bulk(keys) if keys else {})
+
+
+def _take_unique_validators(serializer):
+    """Quita los UniqueValidator (una consulta por elemento) para verificarlos luego por lote."""
+    taken = []
+    for name, field in serializer.fields.items():
+        for validator in list(field.validators):
+            if isinstance(validator, UniqueValidator):
+                field.validators.remove(validator)
+                taken.append((name, field.source, validator))
+    return taken
+
+
+class BulkWriteMixin:
+    bulk_max_items = API_BULK_MAX_ITEMS
+    bulk_chunk_size = API_BULK_CHUNK_SIZE
+
+    def create(self, request, *args, **kwargs):
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
+        return super().create(request, *args, **kwargs)
+
+    # ===== utilidades =====
+
+    def _bulk_atomic(self, request):
+        raw = request.query_params.get('atomico')
+        if raw is None:
+            return API_BULK_ATOMIC
+        return raw.lower() in TRUE_VALUES
+
+    def _bulk_items(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            raise serializers.ValidationError({'non_field_errors': ['Se esperaba una lista de elementos.']})
+        if len(items) > self.bulk_max_items:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f'Máximo {self.bulk_max_items} elementos por solicitud.']})
+        return items
+
+    def _bulk_validate(self, items, instances=None):
+        """Valida cada elemento; devuelve (modelo, validados {índice: datos}, errores {índice: errores})."""
+        serializer = self.get_serializer(partial=instances is not None)
+        _preload_related(serializer, items)
+        uniques = _take_unique_validators(serializer)
+        valid, errors = {}, {}
+        for i, item in enumerate(items):
+            if instances is not None:
+                if instances[i] is None:
+                    continue
+                serializer.instance = instances[i]
+            if not isinstance(item, dict):
+                errors[i] = {'non_field_errors': ['Se esperaba un objeto.']}
+                continue
+            try:
+                valid[i] = serializer.run_validation(item)
+            except serializers.ValidationError as exc:
+                errors[i] = exc.detail
+        serializer.instance = None
+
+        model = serializer.Meta.model
+        for name, source, validator in uniques:
+            values = {}
+            for i, data in valid.items():
+                value = data.get(source)
+                if value is None:
+                    continue
+                own = instances[i].pk if instances is not None else None
+                if value in values:
+                    errors[i] = {name: [validator.message]}
+                else:
+                    values[value] = own
+            if not values:
+                continue
+            existing = validator.queryset.filter(**{f'{source}__in': list(values)}).values_list(source, 'pk')
+            taken = {value for value, pk in existing if values.get(value) != pk}
+            for i, data in valid.items():
+                if data.get(source) in taken:
+                    errors[i] = {name: [validator.message]}
+        for i in errors:
+            valid.pop(i, None)
+        return model, valid, errors
+
+    def _bulk_write(self, chunks, write, atomic):
+        """Ejecuta `write(chunk)`; en modo parcial, un bloque que falla se reintenta elemento por elemento."""
+        failed = {}
+        if atomic:
+            with transaction.atomic():
+                for chunk in chunks:
+                    write(chunk)
+            return failed
+        for chunk in chunks:
+            try:
+                with transaction.atomic():
+                    write(chunk)
+            except DatabaseError:
+                for index, obj in chunk:
+                    try:
+                        with transaction.atomic():
+                            write([(index, obj)])
+                    except DatabaseError:
+                        logger.exception('Escritura masiva: falló el elemento %s', index)
+                        failed[index] = {'non_field_errors': [WRITE_ERROR_MESSAGE]}
+        return failed
+
+    def _chunks(self, pairs):
+        size = max(1, self.bulk_chunk_size)
+        return [pairs[i:i + size] for i in range(0, len(pairs), size)]
+
+    def _bulk_response(self, items, ok_status, results, errors, atomic):
+        payload = {
+            'atomico': atomic,
+            'total': len(items),
+            'correctos': 0 if atomic and errors else len(items) - len(errors),
+            'fallidos': len(errors),
+            'resultados': [],
+        }
+        for i in range(len(items)):
+            if i in errors:
+                payload['resultados'].append({'indice': i, 'estado': 400, 'errores': errors[i]})
+            elif atomic and errors:
+                # válido pero no escrito porque otro elemento del lote falló
+                payload['resultados'].append({'indice': i, 'estado': 424})
+            else:
+                payload['resultados'].append(dict(results[i], indice=i, estado=ok_status))
+        if not errors:
+            code = ok_status
+        elif atomic:
+            code = status.HTTP_400_BAD_REQUEST
+        else:
+            code = status.HTTP_207_MULTI_STATUS
+        return Response(payload, status=code)
+
+    def _integrity_failure(self, items, atomic):
+        logger.exception('Escritura masiva: falló el lote de %s elementos', len(items))
+        errors = {i: {'non_field_errors': [WRITE_ERROR_MESSAGE]} for i in range(len(items))}
+        return self._bulk_response(items, status.HTTP_400_BAD_REQUEST, {}, errors, atomic)
+
+    # ===== acciones =====
+
+    def bulk_create(self, request):
+        items = self._bulk_items(request)
+        atomic = self._bulk_atomic(request)
+        model, valid, errors = self._bulk_validate(items)
+        if atomic and errors:
+            return self._bulk_response(items, status.HTTP_201_CREATED, {}, errors, atomic)
+
+        pairs = [(i, model(**data)) for i, data in sorted(valid.items())]
+
+        def write(chunk):
+            objs = [obj for _, obj in chunk]
+            if connection.features.can_return_rows_from_bulk_insert:
+                model._default_manager.bulk_create(objs)
+            else:
+                # sin RETURNING (MySQL) bulk_create no asigna las claves: inserción por fila en la misma transacción
+                for obj in objs:
+                    obj.save(force_insert=True)
+
+        try:
+            errors.update(self._bulk_write(self._chunks(pairs), write, atomic))
+        except DatabaseError:
+            return self._integrity_failure(items, atomic)
+        results = {i: {'id': obj.pk} for i, obj in pairs if i not in errors}
+        return self._bulk_response(items, status.HTTP_201_CREATED, results, errors, atomic)
+
+    def bulk_partial_update(self, request, *args, **kwargs):
+        items = self._bulk_items(request)
+        atomic = self._bulk_atomic(request)
+        model = self.get_serializer_class().Meta.model
+        pk_name = model._meta.pk.name
+
+        errors, keys = {}, {}
+        for i, item in enumerate(items):
+            value = item.get(pk_name, item.get('pk')) if isinstance(item, dict) else None
+            try:
+                keys[i] = model._meta.pk.to_python(value) if value is not None else None
+            except DjangoValidationError:
+                keys[i] = None
+            if keys[i] is None:
+                errors[i] = {pk_name: ['Este campo es requerido.']}
+        found = self.get_queryset().in_bulk({k for k in keys.values() if k is not None})
+        instances = []
+        for i in range(len(items)):
+            obj = found.get(keys[i])
+            if obj is None and i not in errors:
+                errors[i] = {pk_name: ['No encontrado.']}
+            elif obj is not None:
+                self.check_object_permissions(request, obj)
+            instances.append(obj if i not in errors else None)
+
+        _, valid, invalid = self._bulk_validate(items, instances)
+        errors.update(invalid)
+        if atomic and errors:
+            return self._bulk_response(items, status.HTTP_200_OK, {}, errors, atomic)
+
+        pairs, fields = [], set()
+        for i, data in sorted(valid.items()):
+            obj = instances[i]
+            for attr, value in data.items():
+                setattr(obj, attr, value)
+            fields.update(model._meta.get_field(attr).name for attr in data)
+            pairs.append((i, obj))
+
+        def write(chunk):
+            if fields:
+                model._default_manager.bulk_update([obj for _, obj in chunk], sorted(fields))
+
+        try:
+            errors.update(self._bulk_write(self._chunks(pairs), write, atomic))
+        except DatabaseError:
+            return self._integrity_failure(items, atomic)
+        results = {i: {'id': obj.pk} for i, obj in pairs if i not in errors}
+        return self._bulk_response(items, status.HTTP_200_OK, results, errors, atomic)
@@ -0,0 +1,75 @@
+"""
+Estadísticas del calendario
+
+Contadores de cabecera, desgloses por tipo y por asignado, y mapa de calor
+diario de eventos. Cada cálculo se resuelve con una sola consulta agregada
+(agregación condicional o GROUP BY) en vez de varias consultas count().
+"""
+
+import datetime
+
+from django.db.models import Count, Q
+
+from .events import overlap_q
+from .models import Evento
+from .recurrence import occurrence_dates, rule_from_values
+
+
+def header_counters(today=None, queryset=None):
+    """Totales de la cabecera del calendario en una sola consulta."""
+    today = today or datetime.date.today()
+    qs = queryset if queryset is not None else Evento.objects.all()
+    return qs.aggregate(
+        total_events=Count('id_evento'),
+        upcoming_events=Count('id_evento', filter=Q(fecha_inicio__gte=today)),
+        overdue_events=Count('id_evento', filter=Q(fecha_fin__lt=today)),
+        today_events=Count('id_evento', filter=Q(fecha_inicio=today)),
+    )
+
+
+def _window_qs(start=None, end=None):
+    qs = Evento.objects.all()
+    if start and end:
+        qs = qs.filter(overlap_q(start, end))
+    return qs
+
+
+def by_type(start=None, end=None):
+    """{tipo: total} de las filas de eventos (opcionalmente dentro de una ventana)."""
+    rows = _window_qs(start, end).values('tipo').annotate(total=Count('id_evento')).order_by()
+    return {(r['tipo'] or 'sin_tipo'): r['total'] for r in rows}
+
+
+def by_assignee(start=None, end=None):
+    """Lista de {user_id, username, total} ordenada por total descendente."""
+    rows = (_window_qs(start, end).filter(asignados__isnull=False)
+            .values('asignados__id', 'asignados__username')
+            .annotate(total=Count('id_evento'))
+            .order_by('-total', 'asignados__username'))
+    return [{'user_id': r['asignados__id'], 'username': r['asignados__username'], 'total': r['total']} for r in rows]
+
+
+def heatmap(start, end):
+    """
+    {fecha_iso: total} de eventos que comienzan cada día de [start, end).
+
+    Los eventos simples se cuentan con un único GROUP BY fecha_inicio; las
+    series recurrentes (pocas filas) se expanden en memoria sobre la ventana.
+    """
+    counts = {}
+    simples = (Evento.objects.filter(recurrencia_freq__isnull=True, fecha_inicio__gte=start, fecha_inicio__lt=end)
+               .values('fecha_inicio').annotate(total=Count('id_evento')).order_by())
+    for r in simples:
+        counts[r['fecha_inicio']] = r['total']
+
+    series = (Evento.objects.filter(recurrencia_freq__isnull=False, fecha_inicio__lt=end)
+              .filter(Q(recurrencia_fin__isnull=True) | Q(recurrencia_fin__gte=start))
+              .values('fecha_inicio', 'recurrencia_freq', 'recurrencia_intervalo', 'recurrencia_hasta',
+                      'recurrencia_count', 'recurrencia_excepciones'))
+    for r in series:
+        rule = rule_from_values(r['recurrencia_freq'], r['recurrencia_intervalo'], r['recurrencia_hasta'],
+                                r['recurrencia_count'], r['recurrencia_excepciones'])
+        for d in occurrence_dates(r['fecha_inicio'], rule, start, end):
+            counts[d] = counts.get(d, 0) + 1
+
+    return {d.isoformat(): counts[d] for d in sorted(counts)}
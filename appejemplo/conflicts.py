@@ -0,0 +1,248 @@
+"""
+Detección de conflictos de agenda para los asignados de un evento
+
+Para un conjunto de usuarios y uno o más intervalos candidatos se buscan los
+eventos ya asignados que se solapan. Los candidatos se obtienen con una sola
+consulta por rango de fechas (índices de `eventos` + tabla de asignados) y el
+cruce fino por fecha/hora se hace en memoria con un árbol de intervalos por
+usuario, de modo que el costo no depende del total de eventos de cada usuario.
+"""
+
+import datetime
+import math
+from collections import defaultdict
+
+from .events import overlap_q
+from .models import Evento
+from .recurrence import occurrence_dates, parse_rrule, rule_from_values, series_end
+
+
+# Duración asumida cuando un evento tiene hora de inicio pero no de fin
+DEFAULT_DURATION = datetime.timedelta(hours=1)
+
+# Horizonte máximo (días) para verificar series recurrentes sin fin
+CONFLICT_HORIZON_DAYS = 366
+
+
+class IntervalTree:
+    """
+    Árbol de intervalos sobre intervalos semiabiertos [inicio, fin).
+
+    Se construye ordenando por inicio (árbol binario implícito sobre el
+    arreglo ordenado, cada nodo guarda el fin máximo de su subárbol). Una
+    consulta cuesta O(log n + k) con k = intervalos solapados. `add` acumula
+    los intervalos nuevos en un búfer que se recorre linealmente y se integra
+    al árbol cuando supera ~√n elementos.
+    """
+
+    def __init__(self, intervals=()):
+        self._pending = []
+        self._rebuild(intervals)
+
+    def _rebuild(self, intervals):
+        self._items = sorted(intervals, key=lambda it: (it[0], it[1]))
+        self._max_end = [None] * len(self._items)
+        self._build(0, len(self._items))
+
+    def __len__(self):
+        return len(self._items) + len(self._pending)
+
+    def add(self, start, end, data=None):
+        self._pending.append((start, end, data))
+        if len(self._pending) > max(8, math.isqrt(len(self._items))):
+            self._rebuild(self._items + self._pending)
+            self._pending = []
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        end = self._items[mid][1]
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > end:
+                end = child
+        self._max_end[mid] = end
+        return end
+
+    def overlapping(self, start, end):
+        """Intervalos (inicio, fin, dato) que solapan [start, end)."""
+        found = []
+        stack = [(0, len(self._items))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self._max_end[mid] <= start:
+                continue
+            stack.append((lo, mid))
+            item = self._items[mid]
+            if item[0] < end:
+                if item[1] > start:
+                    found.append(item)
+                stack.append((mid + 1, hi))
+        found.extend(item for item in self._pending if item[0] < end and item[1] > start)
+        return found
+
+
+def occurrence_interval(dia, duracion_dias, hora_inicio, hora_fin, all_day):
+    """Intervalo [inicio, fin) en datetime de una ocurrencia que comienza el día `dia`."""
+    ultimo_dia = dia + datetime.timedelta(days=duracion_dias)
+    if all_day or hora_inicio is None:
+        return (datetime.datetime.combine(dia, datetime.time.min),
+                datetime.datetime.combine(ultimo_dia + datetime.timedelta(days=1), datetime.time.min))
+    inicio = datetime.datetime.combine(dia, hora_inicio)
+    fin = datetime.datetime.combine(ultimo_dia, hora_fin) if hora_fin else inicio + DEFAULT_DURATION
+    return inicio, max(fin, inicio + datetime.timedelta(minutes=1))
+
+
+def event_intervals(fecha_inicio, fecha_fin, hora_inicio, hora_fin, all_day, rule, window):
+    """Intervalos de un evento (o de las ocurrencias de una serie) dentro de `window`."""
+    duracion = (fecha_fin - fecha_inicio).days if fecha_fin and fecha_fin > fecha_inicio else 0
+    if rule is None:
+        dias = (fecha_inicio,)
+    else:
+        dias = occurrence_dates(fecha_inicio, rule, window[0], window[1], duracion)
+    return [occurrence_interval(d, duracion, hora_inicio, hora_fin, all_day) for d in dias]
+
+
+def candidate_intervals(ev):
+    """Intervalos de un `Evento` (guardado o no) y la ventana de fechas que abarcan."""
+    rule = ev.regla_recurrencia
+    desde = ev.fecha_inicio
+    if rule is None:
+        hasta = (ev.fecha_fin or ev.fecha_inicio) + datetime.timedelta(days=1)
+    else:
+        fin = series_end(ev.fecha_inicio, ev.fecha_fin, rule)
+        tope = desde + datetime.timedelta(days=CONFLICT_HORIZON_DAYS)
+        hasta = min(fin + datetime.timedelta(days=1), tope) if fin else tope
+    return event_intervals(ev.fecha_inicio, ev.fecha_fin, ev.hora_inicio, ev.hora_fin, ev.all_day, rule, (desde, hasta)), (desde, hasta)
+
+
+def assigned_interval_trees(user_ids, window, exclude_event_id=None):
+    """
+    {user_id: IntervalTree} con los eventos asignados a cada usuario que
+    solapan `window`, a partir de una única consulta sobre la tabla de asignados.
+    """
+    start, end = window
+    through = Evento.asignados.through
+    rows = (through.objects.filter(overlap_q(start, end, prefix='evento__'), user_id__in=list(user_ids))
+            .values_list('user_id', 'evento_id', 'evento__titulo', 'evento__fecha_inicio', 'evento__fecha_fin',
+                         'evento__hora_inicio', 'evento__hora_fin', 'evento__all_day', 'evento__recurrencia_freq',
+                         'evento__recurrencia_intervalo', 'evento__recurrencia_hasta', 'evento__recurrencia_count',
+                         'evento__recurrencia_excepciones'))
+    if exclude_event_id:
+        rows = rows.exclude(evento_id=exclude_event_id)
+
+    por_usuario = defaultdict(list)
+    for (uid, eid, titulo, f_ini, f_fin, h_ini, h_fin, all_day, freq, intervalo, hasta, count, excepciones) in rows:
+        rule = rule_from_values(freq, intervalo, hasta, count, excepciones)
+        for inicio, fin in event_intervals(f_ini, f_fin, h_ini, h_fin, all_day, rule, window):
+            por_usuario[uid].append((inicio, fin, (eid, titulo)))
+    return {uid: IntervalTree(items) for uid, items in por_usuario.items()}
+
+
+def find_conflicts(user_ids, intervals, window, exclude_event_id=None):
+    """
+    Lista de conflictos {user_id, event_id, title, start, end} entre los
+    `intervals` candidatos y los eventos ya asignados a `user_ids`.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids or not intervals:
+        return []
+    trees = assigned_interval_trees(user_ids, window, exclude_event_id=exclude_event_id)
+    conflicts = []
+    vistos = set()
+    for uid in user_ids:
+        tree = trees.get(uid)
+        if not tree:
+            continue
+        for start, end in intervals:
+            for o_start, o_end, (eid, titulo) in tree.overlapping(start, end):
+                key = (uid, eid, o_start)
+                if key in vistos:
+                    continue
+                vistos.add(key)
+                conflicts.append({'user_id': uid, 'event_id': eid, 'title': titulo,
+                                  'start': o_start.isoformat(), 'end': o_end.isoformat()})
+    conflicts.sort(key=lambda c: (c['start'], c['user_id'], c['event_id']))
+    return conflicts
+
+
+class BatchSchedule:
+    """
+    Agenda de los elementos ya aceptados de una creación masiva, por usuario.
+
+    Los conflictos de un elemento se buscan contra los eventos guardados
+    (`find_conflicts`) y además contra los elementos anteriores del mismo lote,
+    que todavía no están en la base de datos.
+    """
+
+    def __init__(self):
+        self._trees = defaultdict(IntervalTree)
+
+    def add(self, user_ids, intervals, index, title):
+        for uid in dict.fromkeys(user_ids):
+            for start, end in intervals:
+                self._trees[uid].add(start, end, (index, title))
+
+    def conflicts(self, user_ids, intervals):
+        """Conflictos {user_id, batch_index, title, start, end} con elementos anteriores del lote."""
+        conflicts = []
+        vistos = set()
+        for uid in dict.fromkeys(user_ids):
+            tree = self._trees.get(uid)
+            if not tree:
+                continue
+            for start, end in intervals:
+                for o_start, o_end, (index, titulo) in tree.overlapping(start, end):
+                    key = (uid, index, o_start)
+                    if key in vistos:
+                        continue
+                    vistos.add(key)
+                    conflicts.append({'user_id': uid, 'batch_index': index, 'title': titulo,
+                                      'start': o_start.isoformat(), 'end': o_end.isoformat()})
+        conflicts.sort(key=lambda c: (c['start'], c['user_id'], c['batch_index']))
+        return conflicts
+
+
+def conflicts_for_event(ev, user_ids):
+    """Conflictos de agenda que produciría asignar `ev` a `user_ids`."""
+    intervals, window = candidate_intervals(ev)
+    return find_conflicts(user_ids, intervals, window, exclude_event_id=ev.pk)
+
+
+def candidate_from_payload(payload):
+    """
+    Construye un `Evento` sin guardar con sólo los campos de fecha/hora y
+    recurrencia de un payload (mismas claves que events_api). Lanza ValueError.
+    """
+    try:
+        fecha_inicio = datetime.date.fromisoformat(str(payload.get('start') or payload.get('fecha_inicio'))[:10])
+    except ValueError:
+        raise ValueError('start inválido, usar YYYY-MM-DD')
+    fecha_fin = payload.get('end') or payload.get('fecha_fin')
+    try:
+        fecha_fin = datetime.date.fromisoformat(str(fecha_fin)[:10]) if fecha_fin else None
+        hora_inicio = payload.get('time') or payload.get('hora_inicio')
+        hora_fin = payload.get('end_time') or payload.get('hora_fin')
+        hora_inicio = datetime.time.fromisoformat(str(hora_inicio)) if hora_inicio else None
+        hora_fin = datetime.time.fromisoformat(str(hora_fin)) if hora_fin else None
+    except ValueError:
+        raise ValueError('fechas u horas inválidas')
+    if fecha_fin and fecha_fin < fecha_inicio:
+        raise ValueError('fecha_fin no puede ser anterior a fecha_inicio')
+    all_day = payload.get('all_day') or payload.get('allDay')
+    if isinstance(all_day, str):
+        all_day = all_day.lower() in ['1', 'true', 'yes', 'on']
+    ev = Evento(fecha_inicio=fecha_inicio, fecha_fin=fecha_fin, hora_inicio=hora_inicio, hora_fin=hora_fin,
+                all_day=bool(all_day))
+    recurrence_raw = payload.get('recurrence') or payload.get('rrule')
+    if recurrence_raw:
+        regla = parse_rrule(recurrence_raw, fecha_inicio)
+        ev.recurrencia_freq = regla.freq
+        ev.recurrencia_intervalo = regla.interval
+        ev.recurrencia_hasta = regla.until
+        ev.recurrencia_count = regla.count
+        ev.recurrencia_excepciones = [d.isoformat() for d in regla.exceptions] or None
+    return ev
@@ -0,0 +1,226 @@
+"""
+Consultas de eventos del calendario por rango de fechas
+
+Centraliza el filtrado de `Evento` por ventana [start, end) para que
+`events_api` y `calendar_view` sólo carguen los eventos visibles, apoyándose
+en los índices compuestos (fecha_inicio, fecha_fin) del modelo.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Evento, EventoEliminado, EventoSalida
+from .recurrence import occurrence_dates, rule_from_values
+
+
+# Ventana máxima permitida para una consulta (evita escaneos de años completos)
+MAX_WINDOW_DAYS = 400
+
+# Margen con que se relee desde un token de sincronización (transacciones confirmadas tarde)
+SYNC_OVERLAP = datetime.timedelta(seconds=getattr(settings, 'EVENTS_SYNC_OVERLAP', 120))
+
+
+def parse_date_param(raw):
+    """Acepta 'YYYY-MM-DD' o un datetime ISO (como los que envía FullCalendar)."""
+    if raw in (None, ''):
+        return None
+    return datetime.date.fromisoformat(str(raw).strip()[:10])
+
+
+def default_window(today=None):
+    """Ventana por defecto: desde el mes anterior hasta el fin del mes siguiente."""
+    today = today or datetime.date.today()
+    first = today.replace(day=1)
+    start = (first - datetime.timedelta(days=1)).replace(day=1)
+    end = first
+    for _ in range(2):
+        end = (end + datetime.timedelta(days=32)).replace(day=1)
+    return start, end
+
+
+def parse_window(params):
+    """
+    Obtiene (start, end) desde un dict de parámetros GET.
+
+    `end` es exclusivo, igual que en FullCalendar. Lanza ValueError si las
+    fechas son inválidas o la ventana es demasiado grande.
+    """
+    try:
+        start = parse_date_param(params.get('start'))
+        end = parse_date_param(params.get('end'))
+    except ValueError:
+        raise ValueError('start/end inválidos, usar YYYY-MM-DD')
+    if start is None and end is None:
+        return default_window()
+    if start is None or end is None:
+        raise ValueError('start y end deben indicarse juntos')
+    if end <= start:
+        raise ValueError('end debe ser posterior a start')
+    if (end - start).days > MAX_WINDOW_DAYS:
+        raise ValueError(f'la ventana no puede superar {MAX_WINDOW_DAYS} días')
+    return start, end
+
+
+def overlap_q(start, end, prefix=''):
+    """
+    Condición de solapamiento con [start, end).
+
+    Un evento sin fecha_fin dura sólo su fecha_inicio. La condición se escribe
+    sin COALESCE para que ambas ramas puedan usar los índices compuestos.
+    Las series recurrentes se preseleccionan por su rango total
+    (fecha_inicio .. recurrencia_fin) y se expanden luego en Python.
+    `prefix` (p.ej. 'evento__') permite aplicarla desde un modelo relacionado.
+    """
+    def q(**kwargs):
+        return Q(**{prefix + k: v for k, v in kwargs.items()})
+
+    simple = q(recurrencia_freq__isnull=True) & q(fecha_inicio__lt=end) & (
+        q(fecha_inicio__gte=start, fecha_fin__isnull=True) | q(fecha_fin__gte=start)
+    )
+    serie = q(recurrencia_freq__isnull=False, fecha_inicio__lt=end) & (
+        q(recurrencia_fin__isnull=True) | q(recurrencia_fin__gte=start)
+    )
+    return simple | serie
+
+
+def events_in_range(start, end, project=None, assigned_to=None, tipo=None, queryset=None):
+    """Eventos que solapan [start, end), con filtros opcionales."""
+    qs = queryset if queryset is not None else Evento.objects.all()
+    qs = qs.filter(overlap_q(start, end))
+    if project:
+        qs = qs.filter(proyecto_id=project)
+    if assigned_to:
+        qs = qs.filter(asignados__id=assigned_to)
+    if tipo:
+        qs = qs.filter(tipo=tipo)
+    return qs.order_by('fecha_inicio', 'hora_inicio', 'id_evento')
+
+
+def parse_filters(params):
+    """Extrae los filtros opcionales project/assigned_to/type. Lanza ValueError si son inválidos."""
+    filtros = {}
+    for key, dest in (('project', 'project'), ('assigned_to', 'assigned_to')):
+        raw = params.get(key)
+        if raw not in (None, ''):
+            if not str(raw).isdigit():
+                raise ValueError(f'{key} inválido')
+            filtros[dest] = int(raw)
+    tipo = params.get('type')
+    if tipo:
+        filtros['tipo'] = tipo
+    return filtros
+
+
+# Columnas necesarias para serializar un evento (sin cargar FKs)
+EVENT_VALUES = ('id_evento', 'titulo', 'tipo', 'fecha_inicio', 'fecha_fin', 'hora_inicio', 'proyecto_id',
+                'recurrencia_freq', 'recurrencia_intervalo', 'recurrencia_hasta', 'recurrencia_count',
+                'recurrencia_excepciones')
+
+
+def expand_row(row, window):
+    """
+    Devuelve [(inicio, fin)] de las ocurrencias de una fila dentro de la ventana.
+
+    Para eventos simples es la propia fila; para series se usa la expansión
+    perezosa (y cacheada) de `recurrence.occurrence_dates`.
+    """
+    rule = rule_from_values(row['recurrencia_freq'], row['recurrencia_intervalo'], row['recurrencia_hasta'],
+                            row['recurrencia_count'], row['recurrencia_excepciones'])
+    if rule is None or window is None:
+        return [(row['fecha_inicio'], row['fecha_fin'])]
+    duracion = (row['fecha_fin'] - row['fecha_inicio']) if row['fecha_fin'] and row['fecha_fin'] >= row['fecha_inicio'] else None
+    fechas = occurrence_dates(row['fecha_inicio'], rule, window[0], window[1], duracion.days if duracion else 0)
+    return [(d, d + duracion if duracion is not None else None) for d in fechas]
+
+
+def assignee_ids_by_event(event_ids):
+    """{id_evento: [user_id, ...]} con una sola consulta sobre la tabla intermedia."""
+    through = Evento.asignados.through
+    result = {}
+    for evento_id, user_id in through.objects.filter(evento_id__in=event_ids).values_list('evento_id', 'user_id').order_by('evento_id', 'user_id'):
+        result.setdefault(evento_id, []).append(user_id)
+    return result
+
+
+def serialize_events(queryset, include_assignees=False, window=None):
+    """
+    Serializa eventos al formato JSON de events_api en un número constante de consultas.
+
+    Usa `.values()` (lee `proyecto_id` directamente, sin cargar el proyecto) y,
+    si se piden los asignados, una única consulta adicional sobre la M2M.
+    Si se indica `window` (start, end), las series recurrentes se expanden a
+    sus ocurrencias dentro de la ventana (marcadas con `recurring: true`).
+    """
+    rows = list(queryset.values(*EVENT_VALUES))
+    assignees = assignee_ids_by_event([r['id_evento'] for r in rows]) if include_assignees and rows else {}
+    data = []
+    for r in rows:
+        recurring = bool(r['recurrencia_freq'])
+        for inicio, fin in expand_row(r, window):
+            item = {
+                'id': r['id_evento'],
+                'title': r['titulo'],
+                'type': r['tipo'],
+                'start': inicio.isoformat(),
+                'end': fin.isoformat() if fin else None,
+                'time': r['hora_inicio'].strftime('%H:%M') if r['hora_inicio'] else None,
+                'project_id': r['proyecto_id'],
+            }
+            if recurring:
+                item['recurring'] = True
+            if include_assignees:
+                item['assigned_to'] = assignees.get(r['id_evento'], [])
+            data.append(item)
+    if window is not None:
+        data.sort(key=lambda e: (e['start'], e['time'] or '', e['id']))
+    return data
+
+
+# ===== Sincronización incremental =====
+
+def make_sync_token(moment=None):
+    """Token opaco de sincronización: marca de tiempo en microsegundos (UTC)."""
+    moment = moment or timezone.now()
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def parse_sync_token(token):
+    """Convierte un token de `make_sync_token` en datetime. Lanza ValueError si es inválido."""
+    token = str(token or '').strip()
+    if not token.isdigit():
+        raise ValueError('since inválido')
+    try:
+        return datetime.datetime.fromtimestamp(int(token) / 1_000_000, tz=datetime.timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        # fuera del rango de datetime (p. ej. '9' * 30)
+        raise ValueError('since inválido')
+
+
+def sync_changes(since, start, end, filtros=None, include_assignees=False):
+    """
+    Cambios desde `since` para la ventana [start, end): (eventos, ids_eliminados).
+
+    Se consulta desde `since - SYNC_OVERLAP`: una escritura cuya
+    fecha_modificacion es anterior al token pero que se confirmó después no se
+    pierde. Lo ya enviado puede repetirse; el cliente lo reemplaza por id.
+
+    Se informan como eliminados, además de los borrados reales, los eventos
+    de la ventana modificados que ya no cumplen los filtros (o ya no tienen
+    ocurrencias en ella) y los que se movieron fuera de la ventana
+    (`EventoSalida` con un rango que la solapaba).
+    """
+    filtros = filtros or {}
+    desde = since - SYNC_OVERLAP
+    visibles = events_in_range(start, end, **filtros).filter(fecha_modificacion__gte=desde)
+    events = serialize_events(visibles, include_assignees=include_assignees, window=(start, end))
+    vistos = {e['id'] for e in events}
+    sin_filtro = (Evento.objects.filter(overlap_q(start, end), fecha_modificacion__gte=desde)
+                  .exclude(id_evento__in=vistos).values_list('id_evento', flat=True))
+    salidas = (EventoSalida.objects.filter(fecha_salida__gte=desde, fecha_inicio__lt=end)
+               .filter(Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=start))
+               .exclude(id_evento__in=vistos).values_list('id_evento', flat=True))
+    borrados = EventoEliminado.objects.filter(fecha_eliminacion__gte=desde).values_list('id_evento', flat=True)
+    return events, sorted(set(sin_filtro) | set(salidas) | set(borrados))
@@ -0,0 +1,260 @@
+"""
+Geocodificador local (gazetteer) sin acceso a red
+
+Índice en memoria construido desde:
+
+- las direcciones ya geocodificadas de `Terrenos` y `ProyectosHabitacionales`
+  (dirección del terreno o nombre del proyecto, con su municipio),
+- un archivo CSV opcional de calles (settings.GAZETTEER_STREETS_FILE, columnas
+  direccion,municipio,latitud,longitud),
+- centroides de municipio, calculados como el promedio de los puntos
+  conocidos de cada municipio (`Municipios` no guarda coordenadas).
+
+La consulta ("calle, municipio[, región], Chile") se resuelve por clave
+exacta (calle, municipio) y luego por prefijo único; sólo esas coincidencias
+se tratan como aciertos definitivos. La similitud de trigramas puede devolver
+una calle vecina, por lo que se usa únicamente con `approximate=True`:
+geocoding.geocode la pide cuando el proveedor remoto falla, y
+GAZETTEER_FUZZY_FALLBACK la habilita siempre (útil en entornos sin red). Si la
+consulta es sólo un municipio se devuelve su centroide; con
+GAZETTEER_MUNICIPIO_FALLBACK también para calles desconocidas.
+geocoding.lookup_cached lo consulta antes que la caché persistente y el
+proveedor remoto.
+"""
+
+import bisect
+import csv
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .geocoding import normalize_address
+from .models import Municipios, ProyectosHabitacionales, Regiones, Terrenos
+
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_TTL = getattr(settings, 'GAZETTEER_TTL', 600)
+GAZETTEER_STREETS_FILE = getattr(settings, 'GAZETTEER_STREETS_FILE', None)
+GAZETTEER_MUNICIPIO_FALLBACK = getattr(settings, 'GAZETTEER_MUNICIPIO_FALLBACK', False)
+GAZETTEER_FUZZY_FALLBACK = getattr(settings, 'GAZETTEER_FUZZY_FALLBACK', False)
+GAZETTEER_BACKGROUND_REBUILD = getattr(settings, 'GAZETTEER_BACKGROUND_REBUILD', True)
+
+# Similitud de trigramas (Jaccard) mínima para aceptar una coincidencia aproximada
+MIN_SIMILARITY = 0.6
+
+
+def trigrams(text):
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    def __init__(self):
+        self._points = []                   # (calle, municipio, lat, lng)
+        self._exact = {}                    # (municipio, calle) -> índice
+        self._by_street = defaultdict(list)  # calle -> índices (cualquier municipio)
+        self._sorted = []                   # claves 'municipio|calle' ordenadas, para prefijos
+        self._sorted_idx = []
+        self._trigrams = defaultdict(list)  # trigrama -> índices
+        self._sizes = []                    # cantidad de trigramas por punto
+        self.municipios = {}                # municipio -> centroide
+        self.regiones = set()
+
+    def add(self, street, municipio, lat, lng):
+        street, municipio = normalize_address(street), normalize_address(municipio)
+        if not street or lat is None or lng is None or (municipio, street) in self._exact:
+            return
+        idx = len(self._points)
+        self._points.append((street, municipio, float(lat), float(lng)))
+        self._exact[(municipio, street)] = idx
+        self._by_street[street].append(idx)
+        grams = trigrams(street)
+        self._sizes.append(len(grams))
+        for g in grams:
+            self._trigrams[g].append(idx)
+
+    def finish(self, municipios=(), regiones=()):
+        """Ordena el índice de prefijos y calcula los centroides tras cargar los puntos."""
+        pairs = sorted((f'{m}|{s}', i) for i, (s, m, _, _) in enumerate(self._points))
+        self._sorted = [k for k, _ in pairs]
+        self._sorted_idx = [i for _, i in pairs]
+        sums = defaultdict(lambda: [0.0, 0.0, 0])
+        for _, m, lat, lng in self._points:
+            acc = sums[m]
+            acc[0] += lat
+            acc[1] += lng
+            acc[2] += 1
+        self.municipios = {m: (acc[0] / acc[2], acc[1] / acc[2]) for m, acc in sums.items() if m}
+        for m in municipios:
+            self.municipios.setdefault(normalize_address(m), None)
+        self.regiones = {normalize_address(r) for r in regiones}
+        return self
+
+    def __len__(self):
+        return len(self._points)
+
+    def _coords(self, idx):
+        return self._points[idx][2], self._points[idx][3]
+
+    def _parse(self, query):
+        """(calle, municipio) de la consulta; municipio '' si no se reconoce."""
+        parts = [p for p in normalize_address(query).split(', ') if p and p != 'chile' and p not in self.regiones]
+        if not parts:
+            return '', ''
+        for i in range(len(parts) - 1, 0, -1):
+            if parts[i] in self.municipios:
+                return ', '.join(parts[:i]), parts[i]
+        if len(parts) == 1 and parts[0] in self.municipios:
+            return '', parts[0]
+        return ', '.join(parts), ''
+
+    def _prefix(self, street, municipio):
+        key = f'{municipio}|{street}'
+        pos = bisect.bisect_left(self._sorted, key)
+        if pos < len(self._sorted) and self._sorted[pos].startswith(key):
+            # sólo si el prefijo identifica un único punto
+            if pos + 1 == len(self._sorted) or not self._sorted[pos + 1].startswith(key):
+                return self._sorted_idx[pos]
+        return None
+
+    def _fuzzy(self, street, municipio):
+        grams = trigrams(street)
+        shared = Counter()
+        for g in grams:
+            for idx in self._trigrams.get(g, ()):
+                shared[idx] += 1
+        best, best_sim = None, MIN_SIMILARITY
+        for idx, n in shared.items():
+            if municipio and self._points[idx][1] != municipio:
+                continue
+            sim = n / (len(grams) + self._sizes[idx] - n)
+            if sim > best_sim:
+                best, best_sim = idx, sim
+        return best
+
+    def lookup(self, query, approximate=False):
+        """(lat, lng) de la consulta, o None si el gazetteer no la conoce (trigramas sólo con `approximate`)."""
+        street, municipio = self._parse(query)
+        if not street:
+            return self.municipios.get(municipio) if municipio else None
+        idx = self._exact.get((municipio, street))
+        if idx is None and not municipio and len(self._by_street.get(street, ())) == 1:
+            idx = self._by_street[street][0]
+        if idx is None and municipio:
+            idx = self._prefix(street, municipio)
+        if idx is None and approximate:
+            idx = self._fuzzy(street, municipio)
+        if idx is not None:
+            return self._coords(idx)
+        if municipio and GAZETTEER_MUNICIPIO_FALLBACK:
+            return self.municipios.get(municipio)
+        return None
+
+
+def load_streets_file(gazetteer, path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            try:
+                gazetteer.add(row['direccion'], row.get('municipio'), float(row['latitud']), float(row['longitud']))
+            except (KeyError, TypeError, ValueError):
+                continue
+
+
+def build_gazetteer(streets_file=None):
+    gz = Gazetteer()
+    for row in (Terrenos.objects.filter(latitud__isnull=False, longitud__isnull=False)
+                .exclude(direccion__isnull=True)
+                .values_list('direccion', 'id_municipio__nombre_municipio', 'latitud', 'longitud')):
+        gz.add(*row)
+    proyectos = ProyectosHabitacionales.objects.filter(latitud__isnull=False, longitud__isnull=False)
+    for row in (proyectos.exclude(id_terreno__direccion__isnull=True)
+                .values_list('id_terreno__direccion', 'id_municipio__nombre_municipio', 'latitud', 'longitud')):
+        gz.add(*row)
+    for row in proyectos.values_list('nombre_proyecto', 'id_municipio__nombre_municipio', 'latitud', 'longitud'):
+        gz.add(*row)
+    streets_file = streets_file or GAZETTEER_STREETS_FILE
+    if streets_file:
+        load_streets_file(gz, streets_file)
+    return gz.finish(Municipios.objects.values_list('nombre_municipio', flat=True),
+                     Regiones.objects.values_list('nombre_region', flat=True))
+
+
+_current = None
+_built_at = 0.0
+_stale = True
+_rebuild_thread = None
+_lock = threading.Lock()
+
+
+def _rebuild():
+    global _current, _built_at, _rebuild_thread
+    try:
+        gz = build_gazetteer()
+        with _lock:
+            _current = gz
+            _built_at = time.monotonic()
+    except Exception:
+        # se sigue sirviendo el índice anterior; el próximo intento será en la siguiente consulta
+        logger.exception('No se pudo reconstruir el gazetteer')
+        with _lock:
+            _mark_stale()
+    finally:
+        with _lock:
+            _rebuild_thread = None
+        connection.close()
+
+
+def get_gazetteer():
+    """
+    Gazetteer del proceso.
+
+    La primera consulta lo construye; después, si fue invalidado o superó
+    GAZETTEER_TTL, se reconstruye en un hilo y mientras tanto se sigue
+    respondiendo con el índice anterior (GAZETTEER_BACKGROUND_REBUILD=False
+    reconstruye en la misma consulta).
+    """
+    global _current, _built_at, _stale, _rebuild_thread
+    with _lock:
+        if _current is None:
+            _stale = False
+            _current = build_gazetteer()
+            _built_at = time.monotonic()
+        elif _stale or time.monotonic() - _built_at > GAZETTEER_TTL:
+            _stale = False
+            if not GAZETTEER_BACKGROUND_REBUILD:
+                _current = build_gazetteer()
+                _built_at = time.monotonic()
+            elif _rebuild_thread is None:
+                _rebuild_thread = threading.Thread(target=_rebuild, name='gazetteer-rebuild', daemon=True)
+                _rebuild_thread.start()
+        return _current
+
+
+def _mark_stale():
+    global _stale
+    _stale = True
+
+
+def invalidate_gazetteer(*args, **kwargs):
+    """Receptor de señales: al confirmar la transacción, la próxima consulta reconstruye el índice."""
+    # la reconstrucción corre en otra conexión: sólo ve los cambios ya confirmados
+    transaction.on_commit(_mark_stale)
+
+
+def reset_gazetteer():
+    """Descarta el índice (la próxima consulta lo construye de inmediato)."""
+    global _current
+    with _lock:
+        _current = None
+
+
+def gazetteer_backend(query, approximate=None):
+    """Backend con la misma firma que los remotos: (lat, lng) o None."""
+    if approximate is None:
+        approximate = GAZETTEER_FUZZY_FALLBACK
+    return get_gazetteer().lookup(query, approximate=approximate)
@@ -0,0 +1,127 @@
+"""
+Geocodificación en segundo plano para las vistas de detalle
+
+Las vistas no deben bloquearse esperando al geocodificador remoto. Con
+`request_coordinates()` una vista consulta sólo las cachés (LRU y tabla); si
+no hay resultado, encola un trabajo y muestra un marcador de posición. Un hilo
+de fondo procesa la cola: geocodifica (pasando por la caché persistente) y
+escribe las coordenadas en las filas destino. Los trabajos se deduplican por
+dirección normalizada: pedir la misma dirección varias veces agrega destinos
+al trabajo pendiente en vez de crear otro.
+"""
+
+import logging
+import queue
+import threading
+from decimal import Decimal
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+
+from .geocoding import address_key, geocode, lookup_cached, normalize_address
+from .proyectos_geo import invalidate_geo_cache
+from .spatial import geohash_encode
+
+
+logger = logging.getLogger(__name__)
+
+
+class GeocodeJobQueue:
+    """Cola de trabajos de geocodificación con un hilo trabajador perezoso."""
+
+    def __init__(self, autostart=True):
+        self.autostart = autostart
+        self._queue = queue.Queue()
+        self._pending = {}  # clave de dirección -> (consulta, set de destinos)
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def enqueue(self, query, model, pk):
+        """Encola la geocodificación de `query` para la fila (`model`, `pk`). Devuelve True si creó un trabajo."""
+        key = address_key(normalize_address(query))
+        target = (model._meta.label, pk)
+        with self._lock:
+            if key in self._pending:
+                self._pending[key][1].add(target)
+                return False
+            self._pending[key] = (query, {target})
+        self._queue.put(key)
+        if self.autostart:
+            self._ensure_worker()
+        return True
+
+    def pending(self, query):
+        with self._lock:
+            return address_key(normalize_address(query)) in self._pending
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name='geocode-jobs', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            try:
+                self._process(key)
+            except Exception:
+                logger.exception('geocode job failed')
+            finally:
+                # el hilo vive indefinidamente: no retener conexiones caducadas
+                close_old_connections()
+                self._queue.task_done()
+
+    def _process(self, key):
+        with self._lock:
+            query, _ = self._pending.get(key, (None, None))
+        if query is None:
+            return
+        coords = geocode(query)
+        # los destinos agregados mientras se geocodificaba también se atienden
+        with self._lock:
+            _, targets = self._pending.pop(key, (None, set()))
+        if not coords:
+            return
+        lat, lng = Decimal(str(round(coords[0], 6))), Decimal(str(round(coords[1], 6)))
+        for label, pk in targets:
+            model = apps.get_model(label)
+            fields = {'latitud': lat, 'longitud': lng}
+            if any(f.name == 'celda_geo' for f in model._meta.fields):
+                # update() no pasa por save(): mantener aquí el índice espacial
+                fields['celda_geo'] = geohash_encode(lat, lng)
+            # no pisar coordenadas cargadas entre tanto por otra vía
+            if model.objects.filter(pk=pk, latitud__isnull=True).update(**fields) and 'celda_geo' in fields:
+                invalidate_geo_cache()
+
+    def drain(self):
+        """Procesa en el hilo actual todos los trabajos en cola (pruebas y comandos)."""
+        while True:
+            try:
+                key = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._process(key)
+            finally:
+                self._queue.task_done()
+
+
+jobs = GeocodeJobQueue(autostart=getattr(settings, 'GEOCODE_JOBS_AUTOSTART', True))
+
+
+def request_coordinates(query, obj):
+    """
+    Coordenadas de `query` sin bloquear: ('ok', (lat, lng)) si están en caché,
+    ('pending', None) si se encoló (o ya estaba encolado) un trabajo para `obj`,
+    ('none', None) si la caché ya sabe que no hay resultado.
+    """
+    if jobs.pending(query):
+        jobs.enqueue(query, type(obj), obj.pk)
+        return 'pending', None
+    found, coords = lookup_cached(query)
+    if found:
+        return ('ok', coords) if coords else ('none', None)
+    jobs.enqueue(query, type(obj), obj.pk)
+    return 'pending', None
@@ -0,0 +1,184 @@
+"""
+Pipeline de geocodificación masiva de proyectos
+
+Usado por el comando `geocode_projects`. El hilo principal recorre los
+proyectos por id, resuelve los aciertos de caché (geocoding.lookup_cached) y
+envía sólo las consultas remotas a un pool pequeño de hilos, con un límite de
+tasa tipo token bucket. Los hilos no tocan la base de datos: los resultados se
+guardan en la caché y en lotes de `bulk_update` desde el hilo principal. El
+último id procesado se guarda en un archivo de checkpoint para poder reanudar.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from decimal import Decimal
+
+from .geocoding import call_backend, get_backend, lookup_cached, project_address, remember
+from .models import ProyectosHabitacionales
+from .proyectos_geo import invalidate_geo_cache
+from .spatial import geohash_encode
+
+
+class TokenBucket:
+    """Limitador de tasa: `rate` fichas por segundo con ráfagas de hasta `capacity`."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError('rate debe ser positivo')
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta disponer de una ficha."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self.tokens = min(self.capacity, self.tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            self._sleep(wait_for)
+
+
+class Checkpoint:
+    """Último id procesado, persistido en un archivo JSON (sin archivo = sin checkpoint)."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path) as f:
+                return int(json.load(f).get('last_id') or 0)
+        except (ValueError, OSError):
+            return 0
+
+    def save(self, last_id):
+        if not self.path:
+            return
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'last_id': last_id}, f)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _valid(coords):
+    return coords is not None and -90 <= coords[0] <= 90 and -180 <= coords[1] <= 180
+
+
+class GeocodePipeline:
+    """
+    Geocodifica un queryset de proyectos con caché, concurrencia limitada y
+    actualizaciones por lotes. `log` recibe (nivel, mensaje).
+    """
+
+    def __init__(self, backend=None, rate=1.0, workers=2, batch_size=100, checkpoint=None,
+                 dry_run=False, log=None, bucket=None):
+        self.backend = backend or get_backend()
+        self.bucket = bucket or TokenBucket(rate, capacity=1)
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.dry_run = dry_run
+        self.log = log or (lambda level, msg: None)
+        self.stats = {'processed': 0, 'updated': 0, 'not_found': 0, 'remote': 0}
+        self._pending = []
+        self._order = deque()
+        self._done = set()
+        self._last_id = 0
+
+    def _result(self, proyecto, coords):
+        self.stats['processed'] += 1
+        self._done.add(proyecto.id_proyecto)
+        if not _valid(coords):
+            self.stats['not_found'] += 1
+            self.log('warning', f'No geocode result for {proyecto.id_proyecto}')
+            return
+        lat, lng = round(coords[0], 6), round(coords[1], 6)
+        if self.dry_run:
+            self.log('success', f'[DRY] {proyecto.id_proyecto} => {lat},{lng}')
+            return
+        proyecto.latitud = Decimal(str(lat))
+        proyecto.longitud = Decimal(str(lng))
+        proyecto.celda_geo = geohash_encode(lat, lng)
+        self._pending.append(proyecto)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if self._pending and not self.dry_run:
+            ProyectosHabitacionales.objects.bulk_update(self._pending, ['latitud', 'longitud', 'celda_geo'], batch_size=self.batch_size)
+            self.stats['updated'] += len(self._pending)
+            invalidate_geo_cache()
+            self.log('success', f'Updated {len(self._pending)} projects')
+        self._pending = []
+        # el checkpoint avanza sólo sobre el prefijo contiguo de ids ya terminados y guardados
+        while self._order and self._order[0] in self._done:
+            self._last_id = self._order.popleft()
+            self._done.discard(self._last_id)
+        if not self.dry_run and self._last_id:
+            self.checkpoint.save(self._last_id)
+
+    def _collect(self, inflight, block):
+        if not inflight:
+            return
+        done, _ = wait(list(inflight), timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            proyecto, query = inflight.pop(future)
+            estado, coords = future.result()
+            remember(query, estado, coords)
+            self._result(proyecto, coords)
+
+    def run(self, queryset, limit=0):
+        """
+        Procesa `queryset` en orden de id desde el checkpoint y devuelve las estadísticas.
+
+        Con `limit` el checkpoint se conserva para continuar en la siguiente ejecución.
+        """
+        desde = self.checkpoint.load()
+        qs = queryset.filter(id_proyecto__gt=desde).select_related('id_terreno', 'id_municipio').order_by('id_proyecto')
+        if limit:
+            qs = qs[:limit]
+        if desde:
+            self.log('notice', f'Resuming after project id {desde}')
+
+        inflight = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for proyecto in qs.iterator(chunk_size=self.batch_size):
+                self._order.append(proyecto.id_proyecto)
+                query = project_address(proyecto)
+                found, coords = lookup_cached(query)
+                if found:
+                    self._result(proyecto, coords)
+                else:
+                    # a lo más `workers` consultas en vuelo, emitidas al ritmo del token bucket
+                    while len(inflight) >= self.workers:
+                        self._collect(inflight, block=True)
+                    self.bucket.acquire()
+                    self.stats['remote'] += 1
+                    inflight[pool.submit(call_backend, self.backend, query)] = (proyecto, query)
+                self._collect(inflight, block=False)
+            while inflight:
+                self._collect(inflight, block=True)
+        self._flush()
+        if not limit and not self.dry_run:
+            # recorrido completo: la próxima ejecución vuelve a empezar desde el principio
+            self.checkpoint.reset()
+        return self.stats
@@ -0,0 +1,289 @@
+"""
+Geocodificación con caché persistente
+
+Todas las geocodificaciones (vistas de detalle, acción del admin y el
+comando geocode_projects) pasan por `geocode()`, que consulta en orden:
+
+1. el gazetteer local (gazetteer.py), sin red, si GEOCODE_GAZETTEER está activo
+   (sólo coincidencias exactas o por prefijo único),
+2. una caché LRU en memoria del proceso,
+3. la tabla `GeocodeCache` (clave = dirección normalizada), con TTL distinto
+   para resultados positivos, negativos (sin resultado) y errores,
+4. el geocodificador remoto (Nominatim por defecto, configurable con
+   `get_backend`); si falla, la coincidencia aproximada del gazetteer (no se
+   guarda en la caché).
+
+Las estadísticas de aciertos/fallos se acumulan por proceso (`geocode_stats`).
+"""
+
+import datetime
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import GeocodeCache
+
+
+# TTL (segundos) según el estado del resultado
+GEOCODE_TTL = getattr(settings, 'GEOCODE_TTL', 90 * 24 * 3600)
+GEOCODE_NEGATIVE_TTL = getattr(settings, 'GEOCODE_NEGATIVE_TTL', 7 * 24 * 3600)
+GEOCODE_ERROR_TTL = getattr(settings, 'GEOCODE_ERROR_TTL', 300)
+
+# Consultar primero el gazetteer local (ver gazetteer.py)
+GEOCODE_GAZETTEER = getattr(settings, 'GEOCODE_GAZETTEER', True)
+
+# Entradas máximas de la LRU en memoria
+GEOCODE_LRU_SIZE = getattr(settings, 'GEOCODE_LRU_SIZE', 2048)
+
+GEOCODER_USER_AGENT = 'sistema_habitacional'
+
+
+class GeocoderError(Exception):
+    """Error transitorio del geocodificador remoto (timeout, servicio no disponible)."""
+
+
+def nominatim_backend(query):
+    """Geocodificador por defecto: devuelve (lat, lng), None si no hay resultado, o lanza GeocoderError."""
+    from geopy.geocoders import Nominatim
+    from geopy.exc import GeocoderServiceError
+    try:
+        location = Nominatim(user_agent=GEOCODER_USER_AGENT).geocode(query, timeout=10)
+    except GeocoderServiceError as e:
+        raise GeocoderError(str(e))
+    if not location:
+        return None
+    return location.latitude, location.longitude
+
+
+def nominatim_url_backend(url):
+    """Backend Nominatim contra un servidor propio (p.ej. 'http://localhost:8080')."""
+    from urllib.parse import urlsplit
+    from geopy.geocoders import Nominatim
+    from geopy.exc import GeocoderServiceError
+    parts = urlsplit(url)
+    geolocator = Nominatim(user_agent=GEOCODER_USER_AGENT, domain=parts.netloc + parts.path.rstrip('/'),
+                           scheme=parts.scheme or 'http')
+
+    def backend(query):
+        try:
+            location = geolocator.geocode(query, timeout=10)
+        except GeocoderServiceError as e:
+            raise GeocoderError(str(e))
+        return (location.latitude, location.longitude) if location else None
+    return backend
+
+
+def get_backend(spec=None):
+    """
+    Resuelve el geocodificador a usar.
+
+    `spec` (o settings.GEOCODER_BACKEND): 'nominatim' o vacío para el servicio
+    público, una URL http(s) para un servidor compatible con Nominatim, o la
+    ruta punteada de un callable query -> (lat, lng) | None.
+    """
+    spec = spec or getattr(settings, 'GEOCODER_BACKEND', None)
+    if callable(spec):
+        return spec
+    if not spec or spec == 'nominatim':
+        # resolver en cada llamada permite reemplazarlo en pruebas
+        return lambda query: nominatim_backend(query)
+    if spec.startswith(('http://', 'https://')):
+        return nominatim_url_backend(spec)
+    from django.utils.module_loading import import_string
+    return import_string(spec)
+
+
+def normalize_address(text):
+    """Minúsculas, sin tildes y con espacios/comas colapsados: clave estable para la caché."""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(c for c in text if not unicodedata.combining(c)).lower()
+    text = re.sub(r'\s*,\s*', ', ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip(' ,')
+
+
+def address_key(normalized):
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+# ===== LRU en memoria y estadísticas =====
+
+_lru = OrderedDict()
+_lock = threading.Lock()
+_stats = {'local_hits': 0, 'lru_hits': 0, 'db_hits': 0, 'misses': 0, 'negative_hits': 0, 'errors': 0}
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def geocode_stats():
+    """Copia de las estadísticas del proceso, con la tasa de aciertos."""
+    with _lock:
+        stats = dict(_stats)
+    hits = stats['local_hits'] + stats['lru_hits'] + stats['db_hits']
+    total = hits + stats['misses']
+    stats['hit_rate'] = round(hits / total, 3) if total else 0.0
+    return stats
+
+
+def reset_geocode_stats():
+    with _lock:
+        for k in _stats:
+            _stats[k] = 0
+
+
+def clear_geocode_lru():
+    with _lock:
+        _lru.clear()
+
+
+def _lru_get(key):
+    with _lock:
+        entry = _lru.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= timezone.now():
+            del _lru[key]
+            return None
+        _lru.move_to_end(key)
+        return entry
+
+
+def _lru_put(key, coords, expires):
+    with _lock:
+        _lru[key] = (coords, expires)
+        _lru.move_to_end(key)
+        while len(_lru) > GEOCODE_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def _ttl(estado):
+    return {'ok': GEOCODE_TTL, 'sin_resultado': GEOCODE_NEGATIVE_TTL}.get(estado, GEOCODE_ERROR_TTL)
+
+
+def _coords(row):
+    if row.estado != 'ok' or row.latitud is None or row.longitud is None:
+        return None
+    return float(row.latitud), float(row.longitud)
+
+
+def _store(key, normalized, estado, coords):
+    lat, lng = coords if coords else (None, None)
+    GeocodeCache.objects.update_or_create(
+        clave=key,
+        defaults={
+            'direccion_normalizada': normalized,
+            'estado': estado,
+            'latitud': Decimal(str(round(lat, 6))) if lat is not None else None,
+            'longitud': Decimal(str(round(lng, 6))) if lng is not None else None,
+        },
+    )
+
+
+def lookup_cached(query):
+    """
+    Busca `query` sólo en fuentes locales (gazetteer, LRU y tabla): (encontrado, coords).
+
+    `coords` es None para resultados negativos/errores aún vigentes.
+    """
+    normalized = normalize_address(query)
+    if not normalized:
+        return True, None
+
+    if GEOCODE_GAZETTEER:
+        from .gazetteer import gazetteer_backend
+        coords = gazetteer_backend(query)
+        if coords:
+            _count('local_hits')
+            return True, (round(coords[0], 6), round(coords[1], 6))
+
+    key = address_key(normalized)
+
+    entry = _lru_get(key)
+    if entry is not None:
+        _count('lru_hits')
+        if entry[0] is None:
+            _count('negative_hits')
+        return True, entry[0]
+
+    row = GeocodeCache.objects.filter(clave=key).first()
+    if row is not None:
+        expires = row.fecha_actualizacion + datetime.timedelta(seconds=_ttl(row.estado))
+        if expires > timezone.now():
+            _count('db_hits')
+            coords = _coords(row)
+            if coords is None:
+                _count('negative_hits')
+            _lru_put(key, coords, expires)
+            return True, coords
+
+    _count('misses')
+    return False, None
+
+
+def call_backend(backend, query):
+    """Consulta remota sin tocar la base de datos (apta para hilos): (estado, coords)."""
+    try:
+        result = backend(query)
+    except GeocoderError:
+        return 'error', None
+    if not result:
+        return 'sin_resultado', None
+    return 'ok', (round(float(result[0]), 6), round(float(result[1]), 6))
+
+
+def remember(query, estado, coords):
+    """Guarda el resultado de una consulta remota en la tabla y en la LRU."""
+    normalized = normalize_address(query)
+    key = address_key(normalized)
+    if estado == 'error':
+        _count('errors')
+    _store(key, normalized, estado, coords)
+    _lru_put(key, coords, timezone.now() + datetime.timedelta(seconds=_ttl(estado)))
+
+
+def geocode(query, backend=None):
+    """
+    Coordenadas (lat, lng) de `query`, o None si no hay resultado o el servicio falló.
+
+    `backend` es un callable query -> (lat, lng) | None que lanza GeocoderError
+    ante fallos transitorios (por defecto el de `get_backend()`).
+    """
+    found, coords = lookup_cached(query)
+    if found:
+        return coords
+    estado, coords = call_backend(backend or get_backend(), query)
+    remember(query, estado, coords)
+    if estado == 'error' and GEOCODE_GAZETTEER:
+        from .gazetteer import gazetteer_backend
+        approximate = gazetteer_backend(query, approximate=True)
+        if approximate:
+            _count('local_hits')
+            return round(approximate[0], 6), round(approximate[1], 6)
+    return coords
+
+
+def address_query(direccion, municipio=None, region=None):
+    """Consulta de geocodificación para una dirección con su municipio y región."""
+    query = direccion
+    if municipio:
+        query += f", {municipio}"
+    if region:
+        query += f", {region}, Chile"
+    return query
+
+
+def project_address(proyecto):
+    """Consulta de geocodificación de un proyecto: dirección del terreno o, si falta, nombre del proyecto."""
+    municipio = proyecto.id_municipio.nombre_municipio if proyecto.id_municipio else ''
+    if proyecto.id_terreno and getattr(proyecto.id_terreno, 'direccion', None):
+        return f"{proyecto.id_terreno.direccion}, {municipio}, Chile"
+    return f"{proyecto.nombre_proyecto}, {municipio}, Chile"
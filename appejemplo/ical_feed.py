@@ -0,0 +1,180 @@
+"""
+Feed iCalendar (.ics) por usuario
+
+Cada usuario tiene una URL con token (HMAC de su id y su hash de contraseña,
+de modo que cambiar la contraseña revoca el enlace) que lista los eventos
+asignados o creados por él en una ventana móvil. El cuerpo se genera en
+streaming y se guarda en caché por ETag. El ETag se deriva de la base de
+datos con una sola consulta agregada sobre los eventos del feed (última
+fecha_modificacion, cantidad y suma de ids), de modo que cualquier alta,
+cambio, asignación o baja lo cambia en todos los procesos, sin depender de
+una caché compartida.
+"""
+
+import datetime
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from .events import overlap_q
+from .models import Evento
+from .recurrence import rule_from_values
+
+
+FEED_SALT = 'appejemplo.ical_feed'
+FEED_CACHE_TTL = 60 * 60
+
+# Ventana móvil del feed (días hacia atrás / hacia adelante desde hoy)
+FEED_DAYS_BACK = 30
+FEED_DAYS_AHEAD = 365
+
+FEED_VALUES = ('id_evento', 'titulo', 'descripcion', 'ubicacion', 'fecha_inicio', 'fecha_fin', 'hora_inicio',
+               'hora_fin', 'all_day', 'fecha_modificacion', 'recurrencia_freq', 'recurrencia_intervalo',
+               'recurrencia_hasta', 'recurrencia_count', 'recurrencia_excepciones')
+
+
+# ===== Token por usuario =====
+
+def feed_token(user):
+    digest = salted_hmac(FEED_SALT, f'{user.pk}:{user.password}').hexdigest()[:32]
+    return f'{user.pk}-{digest}'
+
+
+def user_from_feed_token(token):
+    """Usuario activo dueño del token, o None si es inválido."""
+    from django.contrib.auth.models import User
+    user_id, _, digest = str(token).partition('-')
+    if not user_id.isdigit() or not digest:
+        return None
+    user = User.objects.filter(pk=int(user_id), is_active=True).only('id', 'password').first()
+    if user is None or not constant_time_compare(feed_token(user), token):
+        return None
+    return user
+
+
+# ===== Caché y ETag =====
+
+def feed_version(user, today=None):
+    """Resumen del estado de los eventos del feed: cambia con cualquier alta, modificación o salida."""
+    agg = _user_feed_events(user, today).aggregate(
+        ultima=Max('fecha_modificacion'), cantidad=Count('id_evento'), ids=Sum('id_evento'))
+    ultima = agg['ultima'].isoformat() if agg['ultima'] else ''
+    return f"{ultima}:{agg['cantidad']}:{agg['ids'] or 0}"
+
+
+def feed_etag(user, today=None):
+    today = today or datetime.date.today()
+    raw = f'{user.pk}:{feed_version(user, today)}:{today.isoformat()}'
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def feed_cache_key(etag):
+    return f'ical_feed:body:{etag.strip(chr(34))}'
+
+
+# ===== Formato iCalendar (RFC 5545) =====
+
+def _escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    """Pliega líneas a 75 octetos como exige RFC 5545."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line + '\r\n'
+    parts = []
+    while data:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(data))
+        # no cortar en medio de un carácter multibyte
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _date(d):
+    return d.strftime('%Y%m%d')
+
+
+def _datetime(d, t):
+    return f'{_date(d)}T{t.strftime("%H%M%S")}'
+
+
+def _rrule(row):
+    rule = rule_from_values(row['recurrencia_freq'], row['recurrencia_intervalo'], row['recurrencia_hasta'],
+                            row['recurrencia_count'], row['recurrencia_excepciones'])
+    if rule is None:
+        return None, ()
+    parts = [f'FREQ={rule.freq.upper()}']
+    if rule.interval != 1:
+        parts.append(f'INTERVAL={rule.interval}')
+    if rule.count:
+        parts.append(f'COUNT={rule.count}')
+    if rule.until:
+        parts.append(f'UNTIL={_date(rule.until)}')
+    return ';'.join(parts), rule.exceptions
+
+
+def vevent_lines(row):
+    """Líneas de un VEVENT a partir de una fila `.values(*FEED_VALUES)`."""
+    inicio, fin = row['fecha_inicio'], row['fecha_fin'] or row['fecha_inicio']
+    timed = row['hora_inicio'] and not row['all_day']
+    yield 'BEGIN:VEVENT'
+    yield f'UID:evento-{row["id_evento"]}@appejemplo'
+    stamp = row['fecha_modificacion'] or datetime.datetime.now(datetime.timezone.utc)
+    yield f'DTSTAMP:{stamp.astimezone(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")}'
+    if timed:
+        yield f'DTSTART:{_datetime(inicio, row["hora_inicio"])}'
+        if row['hora_fin']:
+            yield f'DTEND:{_datetime(fin, row["hora_fin"])}'
+    else:
+        yield f'DTSTART;VALUE=DATE:{_date(inicio)}'
+        yield f'DTEND;VALUE=DATE:{_date(fin + datetime.timedelta(days=1))}'
+    rrule, exdates = _rrule(row)
+    if rrule:
+        yield f'RRULE:{rrule}'
+        for d in exdates:
+            yield f'EXDATE:{_datetime(d, row["hora_inicio"])}' if timed else f'EXDATE;VALUE=DATE:{_date(d)}'
+    yield f'SUMMARY:{_escape(row["titulo"])}'
+    if row['descripcion']:
+        yield f'DESCRIPTION:{_escape(row["descripcion"])}'
+    if row['ubicacion']:
+        yield f'LOCATION:{_escape(row["ubicacion"])}'
+    yield 'END:VEVENT'
+
+
+def _user_feed_events(user, today=None):
+    """Eventos asignados o creados por `user` que solapan la ventana móvil del feed."""
+    today = today or datetime.date.today()
+    start = today - datetime.timedelta(days=FEED_DAYS_BACK)
+    end = today + datetime.timedelta(days=FEED_DAYS_AHEAD)
+    asignados = Evento.asignados.through.objects.filter(user_id=user.pk).values('evento_id')
+    return Evento.objects.filter(overlap_q(start, end)).filter(Q(id_evento__in=asignados) | Q(creado_por_id=user.pk))
+
+
+def user_feed_queryset(user, today=None):
+    return _user_feed_events(user, today).order_by('fecha_inicio', 'id_evento').values(*FEED_VALUES)
+
+
+def iter_feed(user, today=None, chunk_size=200):
+    """Genera el calendario en fragmentos de texto (uno por evento, más cabecera y cierre)."""
+    yield _fold('BEGIN:VCALENDAR') + _fold('VERSION:2.0') + _fold('PRODID:-//appejemplo//calendario//ES') + \
+        _fold('CALSCALE:GREGORIAN') + _fold('X-WR-CALNAME:Eventos')
+    for row in user_feed_queryset(user, today).iterator(chunk_size=chunk_size):
+        yield ''.join(_fold(line) for line in vevent_lines(row))
+    yield _fold('END:VCALENDAR')
+
+
+def iter_feed_cached(user, cache_key, today=None):
+    """Igual que `iter_feed`, guardando el cuerpo completo en caché al terminar."""
+    chunks = []
+    for chunk in iter_feed(user, today):
+        chunks.append(chunk)
+        yield chunk
+    cache.set(cache_key, ''.join(chunks), FEED_CACHE_TTL)
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from appejemplo.boundaries import COMUNAS_GEOJSON, BoundaryIndex, assign_municipios
+from appejemplo.gazetteer import GAZETTEER_TTL
+
+
+class Command(BaseCommand):
+    help = ('Validate (or fix with --fix) municipio of projects and terrenos from their coordinates using commune boundaries. '
+            'Fixes are bulk updates: running web workers pick them up in the gazetteer only after GAZETTEER_TTL seconds')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', type=str, default='', help='GeoJSON with commune polygons (default: settings.COMUNAS_GEOJSON)')
+        parser.add_argument('--fix', action='store_true', help='Update id_municipio where it is missing or disagrees with the coordinates')
+        parser.add_argument('--only-missing', action='store_true', help='With --fix, only fill rows without municipio')
+
+    def handle(self, *args, **options):
+        path = options.get('file') or COMUNAS_GEOJSON
+        if not path:
+            raise CommandError('No boundaries file: use --file or settings.COMUNAS_GEOJSON')
+        try:
+            index = BoundaryIndex.from_file(path)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot load {path}: {e}')
+
+        self.stdout.write(self.style.NOTICE(f'Loaded {index.size} communes'))
+        if index.unmatched:
+            self.stdout.write(self.style.WARNING(f'{len(index.unmatched)} features without matching municipio: '
+                                                 + ', '.join(str(n) for n in index.unmatched[:10])))
+
+        stats = assign_municipios(index, fix=options['fix'], only_missing=options['only_missing'])
+        for model, s in stats.items():
+            self.stdout.write(f'{model}: ' + ', '.join(f'{k}={v}' for k, v in s.items()))
+        if not options['fix']:
+            self.stdout.write(self.style.NOTICE('Validation only; run with --fix to apply changes'))
+        elif any(s.get('updated') for s in stats.values()):
+            # el gazetteer vive en memoria de cada worker web; este proceso no puede invalidarlo
+            self.stdout.write(self.style.NOTICE(f'Web workers will see the new municipios within {GAZETTEER_TTL}s'))
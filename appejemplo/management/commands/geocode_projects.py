@@ -1,32 +1,35 @@
 from django.core.management.base import BaseCommand
 from django.db.models import Q
 from appejemplo.models import ProyectosHabitacionales
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
-import time
+from appejemplo.geocoding import geocode_stats, get_backend, reset_geocode_stats
+from appejemplo.geocode_pipeline import Checkpoint, GeocodePipeline
 
 
 class Command(BaseCommand):
-    help = 'Geocode ProyectosHabitacionales missing lat/long using Nominatim (batch)'
+    help = 'Geocode ProyectosHabitacionales missing lat/long (cached, rate-limited, concurrent, resumable)'
 
     def add_arguments(self, parser):
         parser.add_argument('--limit', type=int, default=0, help='Max number to process (0 = all)')
-        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to sleep between requests')
+        parser.add_argument('--rate', type=float, default=1.0, help='Max remote requests per second')
+        parser.add_argument('--sleep', type=float, default=None, help='Deprecated: seconds between requests (sets --rate to 1/sleep)')
+        parser.add_argument('--workers', type=int, default=2, help='Concurrent remote requests')
+        parser.add_argument('--batch-size', type=int, default=100, help='Projects saved per bulk_update')
+        parser.add_argument('--backend', type=str, default='', help="Geocoder: 'nominatim', a Nominatim-compatible URL or a dotted path to a callable")
+        parser.add_argument('--checkpoint', type=str, default='', help='File storing the last processed id (enables resume)')
+        parser.add_argument('--reset-checkpoint', action='store_true', help='Start from the beginning, discarding the checkpoint')
         parser.add_argument('--force', action='store_true', help='Overwrite existing coordinates')
         parser.add_argument('--dry-run', action='store_true', help="Don't save changes")
-        parser.add_argument('--verbose', '-v', action='store_true', help='Verbose output')
+        parser.add_argument('--verbose', action='store_true', help='Verbose output')
         parser.add_argument('--municipios', type=str, default='', help='Comma-separated list of municipio names to limit processing (case-insensitive, partial match)')
 
     def handle(self, *args, **options):
-        limit = options.get('limit') or 0
-        sleep = options.get('sleep') or 1.0
         force = options.get('force')
-        dry_run = options.get('dry_run')
         verbose = options.get('verbose')
+        rate = options.get('rate') or 1.0
+        if options.get('sleep'):
+            rate = 1.0 / options['sleep']
 
-        geolocator = Nominatim(user_agent='pjrEjemplo-geocode-cmd')
-
-        qs = ProyectosHabitacionales.objects.select_related('id_terreno', 'id_municipio')
+        qs = ProyectosHabitacionales.objects.all()
         if not force:
             qs = qs.filter(Q(latitud__isnull=True) | Q(longitud__isnull=True))
 
@@ -40,53 +43,34 @@ class Command(BaseCommand):
                     qmun |= Q(id_municipio__nombre_municipio__icontains=n)
                 qs = qs.filter(qmun)
 
-        total = qs.count()
-        self.stdout.write(self.style.NOTICE(f'Found {total} projects to process'))
-
-        if limit and limit > 0:
-            qs = qs[:limit]
-
-        processed = 0
-        updated = 0
-
-        for p in qs:
-            processed += 1
-            # Build a sensible query: prefer terreno.direccion, else proyecto+municipio
-            if p.id_terreno and getattr(p.id_terreno, 'direccion', None):
-                municipio = p.id_municipio.nombre_municipio if p.id_municipio else ''
-                qstr = f"{p.id_terreno.direccion}, {municipio}, Chile"
-            else:
-                municipio = p.id_municipio.nombre_municipio if p.id_municipio else ''
-                qstr = f"{p.nombre_proyecto}, {municipio}, Chile"
-
-            if verbose:
-                self.stdout.write(f'[{processed}] Geocoding {p.id_proyecto}: {qstr}')
-
-            try:
-                loc = geolocator.geocode(qstr, timeout=10)
-                if loc:
-                    lat = round(loc.latitude, 6)
-                    lon = round(loc.longitude, 6)
-                    if dry_run:
-                        self.stdout.write(self.style.SUCCESS(f"[DRY] {p.id_proyecto} => {lat},{lon}"))
-                    else:
-                        p.latitud = lat
-                        p.longitud = lon
-                        try:
-                            p.full_clean()
-                            p.save()
-                            updated += 1
-                            self.stdout.write(self.style.SUCCESS(f"Updated {p.id_proyecto} => {lat},{lon}"))
-                        except Exception as e:
-                            self.stdout.write(self.style.ERROR(f"Validation/save error for {p.id_proyecto}: {e}"))
-                else:
-                    self.stdout.write(self.style.WARNING(f"No geocode result for {p.id_proyecto} ({qstr})"))
-
-            except (GeocoderTimedOut, GeocoderUnavailable) as e:
-                self.stdout.write(self.style.ERROR(f"Geocoding error for {p.id_proyecto}: {e}"))
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"Unexpected error for {p.id_proyecto}: {e}"))
-
-            time.sleep(sleep)
-
-        self.stdout.write(self.style.SUCCESS(f"Processed {processed} projects, updated {updated}"))
+        checkpoint = Checkpoint(options.get('checkpoint') or None)
+        if options.get('reset_checkpoint'):
+            checkpoint.reset()
+
+        self.stdout.write(self.style.NOTICE(f'Found {qs.count()} projects to process'))
+
+        styles = {'success': self.style.SUCCESS, 'warning': self.style.WARNING, 'notice': self.style.NOTICE}
+
+        def log(level, msg):
+            if verbose or level == 'notice':
+                self.stdout.write(styles.get(level, str)(msg))
+
+        reset_geocode_stats()
+        pipeline = GeocodePipeline(
+            backend=get_backend(options.get('backend') or None),
+            rate=rate,
+            workers=options.get('workers') or 1,
+            batch_size=options.get('batch_size') or 100,
+            checkpoint=checkpoint,
+            dry_run=options.get('dry_run'),
+            log=log,
+        )
+        stats = pipeline.run(qs, limit=options.get('limit') or 0)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['processed']} projects, updated {stats['updated']}, "
+            f"not found {stats['not_found']}, remote requests {stats['remote']}"))
+        cache_stats = geocode_stats()
+        self.stdout.write(f"Geocode cache: lru_hits={cache_stats['lru_hits']} db_hits={cache_stats['db_hits']} "
+                          f"misses={cache_stats['misses']} negative_hits={cache_stats['negative_hits']} "
+                          f"errors={cache_stats['errors']} hit_rate={cache_stats['hit_rate']}")
@@ -0,0 +1,40 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from appejemplo.reminders import send_event_reminders
+
+
+class Command(BaseCommand):
+    help = 'Run periodic jobs (event reminders) in a loop'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=300, help='Seconds between runs')
+        parser.add_argument('--hours', type=float, default=24, help='Reminder horizon in hours')
+        parser.add_argument('--iterations', type=int, default=0, help='Stop after N runs (0 = run forever)')
+
+    def handle(self, *args, **options):
+        interval = options['interval']
+        horizon = datetime.timedelta(hours=options['hours'])
+        iterations = options['iterations']
+        run = 0
+        try:
+            while True:
+                run += 1
+                # conexiones largas pueden haberse cerrado entre ejecuciones
+                close_old_connections()
+                started = time.monotonic()
+                try:
+                    stats = send_event_reminders(horizon=horizon)
+                    self.stdout.write(self.style.SUCCESS(
+                        f"[{run}] reminders sent={stats['sent']} already_sent={stats['already_sent']} "
+                        f"({time.monotonic() - started:.2f}s)"))
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f'[{run}] reminder job failed: {e}'))
+                if iterations and run >= iterations:
+                    break
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Scheduler stopped'))
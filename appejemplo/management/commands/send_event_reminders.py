@@ -0,0 +1,22 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from appejemplo.reminders import BATCH_SIZE, send_event_reminders
+
+
+class Command(BaseCommand):
+    help = 'Create Notificacion reminders for event occurrences starting within the next --hours (idempotent)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help='Reminder horizon in hours')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Events processed per batch')
+        parser.add_argument('--dry-run', action='store_true', help="Don't save notifications")
+
+    def handle(self, *args, **options):
+        stats = send_event_reminders(horizon=datetime.timedelta(hours=options['hours']),
+                                     batch_size=options['batch_size'], dry_run=options['dry_run'])
+        prefix = '[DRY] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}events={stats['events']} occurrences={stats['occurrences']} sent={stats['sent']} "
+            f"already_sent={stats['already_sent']} skipped_without_profile={stats['skipped_without_profile']}"))
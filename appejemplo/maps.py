@@ -0,0 +1,119 @@
+"""
+Renderizado de mapas de las páginas de detalle
+
+`render_map` produce el HTML del mapa de un punto. Con el renderizador
+'folium' (por defecto) el HTML completo se cachea en memoria por
+(lat, lng, zoom, hash del popup) con una LRU acotada, porque construir el
+`folium.Map` cuesta decenas de milisegundos por vista. Con 'client' sólo se
+envía un contenedor con las coordenadas y un script mínimo que carga Leaflet
+en el navegador, de modo que la respuesta queda pequeña.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.html import escape
+
+
+# 'folium' (HTML generado en el servidor) o 'client' (Leaflet en el navegador)
+MAP_RENDERER = getattr(settings, 'MAP_RENDERER', 'folium')
+
+# Mapas Folium cacheados como máximo
+MAP_CACHE_SIZE = getattr(settings, 'MAP_CACHE_SIZE', 256)
+
+# Único marcado permitido en el texto de los popups (separa líneas)
+POPUP_SEPARATOR = '<br>'
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+CLIENT_MAP_SCRIPT = """<script>
+(function(){
+    var POPUP_SEPARATOR = '<br>';
+    if (window.__mapBootstrap) { window.__mapBootstrap(); return; }
+    function init(){
+        document.querySelectorAll('.map-client:not([data-ready])').forEach(function(el){
+            el.setAttribute('data-ready', '1');
+            var lat = parseFloat(el.dataset.lat), lng = parseFloat(el.dataset.lng);
+            var map = L.map(el).setView([lat, lng], parseInt(el.dataset.zoom, 10));
+            L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', { attribution: '&copy; OpenStreetMap contributors' }).addTo(map);
+            var marker = L.marker([lat, lng]).addTo(map);
+            if (el.dataset.popup) {
+                // texto del usuario: sólo se admite el separador <br> fijo, nunca HTML
+                var node = document.createElement('div');
+                el.dataset.popup.split(POPUP_SEPARATOR).forEach(function(line, i){
+                    if (i) node.appendChild(document.createElement('br'));
+                    node.appendChild(document.createTextNode(line));
+                });
+                marker.bindPopup(node);
+            }
+        });
+    }
+    window.__mapBootstrap = function(){ if (window.L) init(); };
+    var css = document.createElement('link');
+    css.rel = 'stylesheet'; css.href = 'https://unpkg.com/leaflet@1.9.4/dist/leaflet.css';
+    document.head.appendChild(css);
+    var js = document.createElement('script');
+    js.src = 'https://unpkg.com/leaflet@1.9.4/dist/leaflet.js';
+    js.onload = init;
+    document.head.appendChild(js);
+})();
+</script>"""
+
+
+def _key(lat, lng, zoom, popup_text):
+    popup_hash = hashlib.sha1(str(popup_text or '').encode('utf-8')).hexdigest()
+    return round(float(lat), 6), round(float(lng), 6), int(zoom), popup_hash
+
+
+def popup_html(popup_text):
+    """Escapa el texto del popup conservando sólo el separador POPUP_SEPARATOR."""
+    return POPUP_SEPARATOR.join(escape(part) for part in str(popup_text or '').split(POPUP_SEPARATOR))
+
+
+def _folium_html(lat, lng, popup_text, zoom):
+    import folium
+    mapa = folium.Map(location=[lat, lng], zoom_start=zoom)
+    folium.Marker([lat, lng], popup=popup_html(popup_text)).add_to(mapa)
+    return mapa._repr_html_()
+
+
+def client_map_html(lat, lng, popup_text, zoom=15, height=320):
+    """Contenedor con coordenadas + script que inicializa Leaflet en el navegador."""
+    return (f'<div class="map-client" style="height:{int(height)}px" data-lat="{float(lat):.6f}" '
+            f'data-lng="{float(lng):.6f}" data-zoom="{int(zoom)}" data-popup="{escape(popup_text or "")}"></div>'
+            + CLIENT_MAP_SCRIPT)
+
+
+def render_map(lat, lng, popup_text, zoom=15, renderer=None):
+    """HTML del mapa de un punto, o None si faltan coordenadas."""
+    if not lat or not lng:
+        return None
+    if (renderer or MAP_RENDERER) == 'client':
+        return client_map_html(lat, lng, popup_text, zoom)
+
+    key = _key(lat, lng, zoom, popup_text)
+    with _lock:
+        html = _cache.get(key)
+        if html is not None:
+            _cache.move_to_end(key)
+            return html
+    html = _folium_html(float(lat), float(lng), popup_text, int(zoom))
+    with _lock:
+        _cache[key] = html
+        _cache.move_to_end(key)
+        while len(_cache) > MAP_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return html
+
+
+def clear_map_cache():
+    with _lock:
+        _cache.clear()
+
+
+def map_cache_size():
+    with _lock:
+        return len(_cache)
@@ -5,9 +5,13 @@ Este módulo implementa el algoritmo de matching automático entre beneficiarios
 habitacionales basado en criterios socioeconómicos y de compatibilidad.
 """
 
+import math
+
+from django.conf import settings
 from django.db.models import Q, F, Case, When, Value, IntegerField
 from django.utils import timezone
 from .models import Beneficiarios, ProyectosHabitacionales, Postulaciones, Matching
+from .spatial import haversine_km, haversine_matrix
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,14 +38,69 @@ class MatchingAlgorithm:
         'Alta': (2000001, float('inf')),
     }
 
+    # Ubicación por distancia (opcional): el puntaje cae a la mitad cada
+    # distancia_media_km(). Sin coordenadas se usa la regla municipio/región.
+    # Ambos valores se leen de settings en cada llamada.
+    @staticmethod
+    def ubicacion_por_distancia():
+        return getattr(settings, 'MATCHING_DISTANCE_SCORE', False)
+
+    @staticmethod
+    def distancia_media_km():
+        return getattr(settings, 'MATCHING_DISTANCE_HALF_LIFE_KM', 20)
+
+    @staticmethod
+    def coordenadas_proyecto(proyecto):
+        """(lat, lng) del proyecto o, si no tiene, de su terreno; None si faltan."""
+        if proyecto.latitud is not None and proyecto.longitud is not None:
+            return proyecto.latitud, proyecto.longitud
+        terreno = proyecto.id_terreno
+        if terreno and terreno.latitud is not None and terreno.longitud is not None:
+            return terreno.latitud, terreno.longitud
+        return None
+
+    @staticmethod
+    def coordenadas_beneficiario(beneficiario):
+        if beneficiario.latitud is not None and beneficiario.longitud is not None:
+            return beneficiario.latitud, beneficiario.longitud
+        return None
+
+    @classmethod
+    def puntaje_ubicacion(cls, beneficiario, proyecto, distancia_km=None, por_distancia=None):
+        """
+        Puntaje de ubicación (0-100).
+
+        Con `por_distancia` (por defecto settings.MATCHING_DISTANCE_SCORE) y coordenadas
+        disponibles decae con la distancia; si no, 100 mismo municipio, 70 misma región.
+        """
+        if por_distancia is None:
+            por_distancia = cls.ubicacion_por_distancia()
+        if por_distancia:
+            if distancia_km is None:
+                a = cls.coordenadas_beneficiario(beneficiario)
+                b = cls.coordenadas_proyecto(proyecto)
+                if a and b:
+                    distancia_km = haversine_km(float(a[0]), float(a[1]), float(b[0]), float(b[1]))
+            if distancia_km is not None and not math.isnan(distancia_km):
+                return 100 * 0.5 ** (distancia_km / cls.distancia_media_km())
+
+        if beneficiario.id_municipio_id and proyecto.id_municipio_id:
+            if beneficiario.id_municipio_id == proyecto.id_municipio_id:
+                return 100
+            if beneficiario.id_municipio.id_region_id == proyecto.id_municipio.id_region_id:
+                return 70
+        return 0
+
     @classmethod
-    def calcular_compatibilidad(cls, beneficiario, proyecto):
+    def calcular_compatibilidad(cls, beneficiario, proyecto, distancia_km=None, por_distancia=None):
         """
         Calcula el puntaje de compatibilidad entre un beneficiario y un proyecto.
 
         Args:
             beneficiario: Instancia de Beneficiarios
             proyecto: Instancia de ProyectosHabitacionales
+            distancia_km: Distancia ya calculada entre ambos (opcional)
+            por_distancia: Puntuar la ubicación por distancia (opcional, ver puntaje_ubicacion)
 
         Returns:
             float: Puntaje de compatibilidad (0-100)
@@ -70,20 +129,16 @@ class MatchingAlgorithm:
         if beneficiario.numero_integrantes and proyecto.superficie_vivienda:
             # Ideal: 1 integrante por 40m² aproximadamente
             superficie_ideal = beneficiario.numero_integrantes * 40
-            ratio_superficie = min(proyecto.superficie_vivienda / superficie_ideal, 2.0)
+            ratio_superficie = min(float(proyecto.superficie_vivienda) / superficie_ideal, 2.0)
             puntaje += cls.PESOS['numero_integrantes'] * (ratio_superficie / 2.0) * 100
 
-        # 4. Ubicación (10%) - preferencia por región/municipio
-        if beneficiario.id_municipio and proyecto.id_municipio:
-            if beneficiario.id_municipio == proyecto.id_municipio:
-                puntaje += cls.PESOS['ubicacion'] * 100
-            elif beneficiario.id_municipio.id_region == proyecto.id_municipio.id_region:
-                puntaje += cls.PESOS['ubicacion'] * 70
+        # 4. Ubicación (10%) - distancia o, sin coordenadas, región/municipio
+        puntaje += cls.PESOS['ubicacion'] * cls.puntaje_ubicacion(beneficiario, proyecto, distancia_km, por_distancia)
 
         return min(puntaje, 100)  # Máximo 100 puntos
 
     @classmethod
-    def ejecutar_matching(cls, region_id=None, municipio_id=None, limite_proyectos=None):
+    def ejecutar_matching(cls, region_id=None, municipio_id=None, limite_proyectos=None, por_distancia=None):
         """
         Ejecuta el algoritmo de matching para una región o municipio específico.
 
@@ -91,6 +146,7 @@ class MatchingAlgorithm:
             region_id: ID de la región (opcional)
             municipio_id: ID del municipio (opcional)
             limite_proyectos: Número máximo de proyectos a procesar (opcional)
+            por_distancia: Puntuar la ubicación por distancia (opcional, por defecto settings.MATCHING_DISTANCE_SCORE)
 
         Returns:
             dict: Resultados del matching
@@ -124,6 +180,26 @@ class MatchingAlgorithm:
         if limite_proyectos:
             proyectos = proyectos[:limite_proyectos]
 
+        if por_distancia is None:
+            por_distancia = cls.ubicacion_por_distancia()
+        beneficiarios = list(beneficiarios.select_related('id_municipio'))
+        proyectos = list(proyectos.select_related('id_municipio', 'id_terreno'))
+
+        # Postulaciones rechazadas de todo el lote en una sola consulta
+        rechazadas = set(Postulaciones.objects.filter(
+            id_beneficiario__in=[b.pk for b in beneficiarios],
+            id_proyecto__in=[p.pk for p in proyectos],
+            estado_postulacion='Rechazada'
+        ).values_list('id_beneficiario_id', 'id_proyecto_id'))
+
+        # Distancias beneficiario x proyecto en una sola operación vectorizada
+        distancias = None
+        if por_distancia:
+            distancias = haversine_matrix(
+                [cls.coordenadas_beneficiario(b) for b in beneficiarios],
+                [cls.coordenadas_proyecto(p) for p in proyectos],
+            )
+
         resultados = {
             'procesados': 0,
             'matchings_creados': 0,
@@ -131,22 +207,20 @@ class MatchingAlgorithm:
             'detalles': []
         }
 
-        for beneficiario in beneficiarios:
+        for i, beneficiario in enumerate(beneficiarios):
             try:
                 mejores_matches = []
 
-                for proyecto in proyectos:
+                for j, proyecto in enumerate(proyectos):
                     # Verificar que no haya postulación previa rechazada
-                    postulacion_previa = Postulaciones.objects.filter(
-                        id_beneficiario=beneficiario,
-                        id_proyecto=proyecto,
-                        estado_postulacion='Rechazada'
-                    ).exists()
-
-                    if postulacion_previa:
+                    if (beneficiario.pk, proyecto.pk) in rechazadas:
                         continue
 
-                    compatibilidad = cls.calcular_compatibilidad(beneficiario, proyecto)
+                    compatibilidad = cls.calcular_compatibilidad(
+                        beneficiario, proyecto,
+                        distancia_km=distancias[i][j] if distancias else None,
+                        por_distancia=por_distancia,
+                    )
 
                     if compatibilidad >= 60:  # Umbral mínimo de compatibilidad
                         mejores_matches.append({
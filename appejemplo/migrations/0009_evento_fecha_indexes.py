@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0008_alter_empresasconstructoras_latitud_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['fecha_inicio', 'fecha_fin'], name='evento_inicio_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['fecha_fin', 'fecha_inicio'], name='evento_fin_inicio_idx'),
+        ),
+    ]
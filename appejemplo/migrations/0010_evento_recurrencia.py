@@ -0,0 +1,43 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0009_evento_fecha_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='recurrencia_count',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='recurrencia_excepciones',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='recurrencia_fin',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='recurrencia_freq',
+            field=models.CharField(blank=True, choices=[('daily', 'Diaria'), ('weekly', 'Semanal'), ('monthly', 'Mensual'), ('yearly', 'Anual')], max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='recurrencia_hasta',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='recurrencia_intervalo',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
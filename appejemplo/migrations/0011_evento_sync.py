@@ -0,0 +1,30 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0010_evento_recurrencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoEliminado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_evento', models.IntegerField(db_index=True)),
+                ('fecha_eliminacion', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'eventos_eliminados',
+                'managed': True,
+            },
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0011_evento_sync'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordatorioEnviado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha_ocurrencia', models.DateField()),
+                ('fecha_envio', models.DateTimeField(auto_now_add=True)),
+                ('evento', models.ForeignKey(db_column='id_evento', on_delete=django.db.models.deletion.CASCADE, to='appejemplo.evento')),
+                ('usuario', models.ForeignKey(db_column='id_usuario', on_delete=django.db.models.deletion.CASCADE, to='appejemplo.usuariossistema')),
+            ],
+            options={
+                'db_table': 'recordatorios_enviados',
+                'managed': True,
+                'constraints': [models.UniqueConstraint(fields=('evento', 'usuario', 'fecha_ocurrencia'), name='recordatorio_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0012_recordatorio_enviado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('direccion_normalizada', models.TextField()),
+                ('latitud', models.DecimalField(blank=True, decimal_places=10, max_digits=14, null=True)),
+                ('longitud', models.DecimalField(blank=True, decimal_places=10, max_digits=14, null=True)),
+                ('estado', models.CharField(choices=[('ok', 'OK'), ('sin_resultado', 'Sin resultado'), ('error', 'Error')], default='ok', max_length=20)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'geocode_cache',
+                'managed': True,
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0013_geocode_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='beneficiarios',
+            name='latitud',
+            field=models.DecimalField(blank=True, decimal_places=10, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='beneficiarios',
+            name='longitud',
+            field=models.DecimalField(blank=True, decimal_places=10, max_digits=14, null=True),
+        ),
+    ]
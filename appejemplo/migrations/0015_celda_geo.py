@@ -0,0 +1,40 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:38
+
+from django.db import migrations, models
+
+
+def calcular_celdas(apps, schema_editor):
+    from appejemplo.spatial import geohash_encode
+    for name in ('EmpresasConstructoras', 'ProyectosHabitacionales', 'Terrenos'):
+        model = apps.get_model('appejemplo', name)
+        rows = []
+        for obj in model.objects.filter(latitud__isnull=False, longitud__isnull=False).only('pk', 'latitud', 'longitud').iterator():
+            obj.celda_geo = geohash_encode(obj.latitud, obj.longitud)
+            rows.append(obj)
+        model.objects.bulk_update(rows, ['celda_geo'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0014_beneficiario_coordenadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresasconstructoras',
+            name='celda_geo',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='proyectoshabitacionales',
+            name='celda_geo',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='terrenos',
+            name='celda_geo',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.RunPython(calcular_celdas, migrations.RunPython.noop),
+    ]
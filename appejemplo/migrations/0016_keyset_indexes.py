@@ -0,0 +1,37 @@
+# Generated by Django 5.1.5 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0015_celda_geo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['timestamp', 'id_log'], name='log_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matching',
+            index=models.Index(fields=['fecha_matching', 'id_matching'], name='matching_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matching',
+            index=models.Index(fields=['puntaje_compatibilidad', 'id_matching'], name='matching_puntaje_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['fecha_envio', 'id_notificacion'], name='notificacion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postulaciones',
+            index=models.Index(fields=['fecha_postulacion', 'id_postulacion'], name='postulacion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postulaciones',
+            index=models.Index(fields=['puntaje_asignado', 'id_postulacion'], name='postulacion_puntaje_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0016_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='beneficiarios',
+            index=models.Index(fields=['estado_beneficiario'], name='beneficiario_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='beneficiarios',
+            index=models.Index(fields=['fecha_registro'], name='beneficiario_registro_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['tabla', 'timestamp'], name='log_tabla_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='logauditoria',
+            index=models.Index(fields=['id_usuario', 'timestamp'], name='log_usuario_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matching',
+            index=models.Index(fields=['id_proyecto', 'estado'], name='matching_proy_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='matching',
+            index=models.Index(fields=['estado', 'fecha_matching'], name='matching_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['id_usuario', 'leida'], name='notificacion_leida_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postulaciones',
+            index=models.Index(fields=['id_proyecto', 'estado_postulacion', 'fecha_postulacion'], name='postulacion_proy_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postulaciones',
+            index=models.Index(fields=['estado_postulacion', 'fecha_postulacion'], name='postulacion_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyectoshabitacionales',
+            index=models.Index(fields=['estado_proyecto'], name='proyecto_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyectoshabitacionales',
+            index=models.Index(fields=['fecha_inicio'], name='proyecto_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='terrenos',
+            index=models.Index(fields=['estado_terreno'], name='terreno_estado_idx'),
+        ),
+    ]
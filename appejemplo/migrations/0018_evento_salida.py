@@ -0,0 +1,27 @@
+# Generated by Django 5.1.5 on 2026-10-19 15:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appejemplo', '0017_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoSalida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('id_evento', models.IntegerField(db_index=True)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField(blank=True, null=True)),
+                ('fecha_salida', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'eventos_salidas',
+                'managed': True,
+            },
+        ),
+    ]
@@ -2,7 +2,8 @@ from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save, post_delete, m2m_changed
+from django.utils import timezone
 from django.dispatch import receiver
 
 class Regiones(models.Model):
@@ -51,10 +52,17 @@ class Beneficiarios(models.Model):
     puntaje_socioeconomico = models.IntegerField(blank=True, null=True)
     estado_beneficiario = models.CharField(max_length=50, blank=True, null=True)
     fecha_registro = models.DateField(blank=True, null=True)
+    # Coordenadas de la dirección (se completan por geocodificación en segundo plano)
+    latitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True)
+    longitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True)
 
     class Meta:
         managed = True
         db_table = 'beneficiarios'
+        indexes = [
+            models.Index(fields=['estado_beneficiario'], name='beneficiario_estado_idx'),
+            models.Index(fields=['fecha_registro'], name='beneficiario_registro_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} {self.apellidos}"
@@ -71,6 +79,8 @@ class EmpresasConstructoras(models.Model):
                                   validators=[MinValueValidator(-90.0), MaxValueValidator(90.0)])
     longitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True,
                                    validators=[MinValueValidator(-180.0), MaxValueValidator(180.0)])
+    # geohash de (latitud, longitud) para búsquedas por cercanía; ver spatial.py
+    celda_geo = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False)
     certificacion_industrializada = models.IntegerField(blank=True, null=True)
     años_experiencia = models.IntegerField(blank=True, null=True)
     capacidad_construccion_anual = models.IntegerField(blank=True, null=True)
@@ -110,6 +120,8 @@ class Terrenos(models.Model):
     coordenadas_gps = models.CharField(max_length=50, blank=True, null=True)
     latitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True)
     longitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True)
+    # geohash de (latitud, longitud) para búsquedas por cercanía; ver spatial.py
+    celda_geo = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False)
     servicios_agua = models.IntegerField(blank=True, null=True)
     servicios_electricidad = models.IntegerField(blank=True, null=True)
     servicios_alcantarillado = models.IntegerField(blank=True, null=True)
@@ -122,6 +134,9 @@ class Terrenos(models.Model):
     class Meta:
         managed = True
         db_table = 'terrenos'
+        indexes = [
+            models.Index(fields=['estado_terreno'], name='terreno_estado_idx'),
+        ]
 
     def __str__(self):
         return self.direccion
@@ -136,6 +151,8 @@ class ProyectosHabitacionales(models.Model):
     id_terreno = models.ForeignKey('Terrenos', models.DO_NOTHING, db_column='id_terreno', blank=True, null=True)
     latitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True)
     longitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True)
+    # geohash de (latitud, longitud) para búsquedas por cercanía; ver spatial.py
+    celda_geo = models.CharField(max_length=12, blank=True, null=True, db_index=True, editable=False)
     numero_viviendas = models.IntegerField(blank=True, null=True)
     tipo_vivienda = models.CharField(max_length=100, blank=True, null=True)
     superficie_vivienda = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True)
@@ -149,6 +166,10 @@ class ProyectosHabitacionales(models.Model):
     class Meta:
         managed = True
         db_table = 'proyectos_habitacionales'
+        indexes = [
+            models.Index(fields=['estado_proyecto'], name='proyecto_estado_idx'),
+            models.Index(fields=['fecha_inicio'], name='proyecto_inicio_idx'),
+        ]
 
     def __str__(self):
         return self.nombre_proyecto
@@ -190,6 +211,12 @@ class Postulaciones(models.Model):
     class Meta:
         managed = True
         db_table = 'postulaciones'
+        indexes = [
+            models.Index(fields=['fecha_postulacion', 'id_postulacion'], name='postulacion_fecha_idx'),
+            models.Index(fields=['puntaje_asignado', 'id_postulacion'], name='postulacion_puntaje_idx'),
+            models.Index(fields=['id_proyecto', 'estado_postulacion', 'fecha_postulacion'], name='postulacion_proy_estado_idx'),
+            models.Index(fields=['estado_postulacion', 'fecha_postulacion'], name='postulacion_estado_idx'),
+        ]
 
     def __str__(self):
         return f"Postulación {self.id_postulacion}"
@@ -247,6 +274,11 @@ class LogAuditoria(models.Model):
     class Meta:
         managed = True
         db_table = 'log_auditoria'
+        indexes = [
+            models.Index(fields=['timestamp', 'id_log'], name='log_timestamp_idx'),
+            models.Index(fields=['tabla', 'timestamp'], name='log_tabla_idx'),
+            models.Index(fields=['id_usuario', 'timestamp'], name='log_usuario_idx'),
+        ]
 
     def __str__(self):
         return f"{self.accion} - {self.timestamp}"
@@ -264,6 +296,10 @@ class Notificacion(models.Model):
     class Meta:
         managed = True
         db_table = 'notificacion'
+        indexes = [
+            models.Index(fields=['fecha_envio', 'id_notificacion'], name='notificacion_fecha_idx'),
+            models.Index(fields=['id_usuario', 'leida'], name='notificacion_leida_idx'),
+        ]
 
     def __str__(self):
         return f"Notificación {self.tipo} - {self.id_usuario.username}"
@@ -280,6 +316,12 @@ class Matching(models.Model):
     class Meta:
         managed = True
         db_table = 'matching'
+        indexes = [
+            models.Index(fields=['fecha_matching', 'id_matching'], name='matching_fecha_idx'),
+            models.Index(fields=['puntaje_compatibilidad', 'id_matching'], name='matching_puntaje_idx'),
+            models.Index(fields=['id_proyecto', 'estado'], name='matching_proy_estado_idx'),
+            models.Index(fields=['estado', 'fecha_matching'], name='matching_estado_idx'),
+        ]
 
     def __str__(self):
         return f"Matching {self.id_beneficiario.nombre} - {self.id_proyecto.nombre_proyecto}"
@@ -301,13 +343,179 @@ class Evento(models.Model):
     all_day = models.BooleanField(default=False)
     creado_por = models.ForeignKey(User, models.SET_NULL, db_column='creado_por', blank=True, null=True, related_name='eventos_creados')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # Última modificación (sincronización incremental del calendario)
+    fecha_modificacion = models.DateTimeField(auto_now=True, db_index=True)
+    # Recurrencia (subconjunto de RRULE). Una serie es una sola fila; las ocurrencias se expanden al consultar.
+    recurrencia_freq = models.CharField(max_length=10, blank=True, null=True,
+                                        choices=(('daily', 'Diaria'), ('weekly', 'Semanal'), ('monthly', 'Mensual'), ('yearly', 'Anual')))
+    recurrencia_intervalo = models.PositiveIntegerField(default=1)
+    recurrencia_hasta = models.DateField(blank=True, null=True)
+    recurrencia_count = models.PositiveIntegerField(blank=True, null=True)
+    recurrencia_excepciones = models.JSONField(blank=True, null=True)  # lista de fechas ISO excluidas
+    # Fecha de fin de la última ocurrencia (calculada al guardar; NULL = serie sin fin)
+    recurrencia_fin = models.DateField(blank=True, null=True, editable=False)
 
     class Meta:
         managed = True
         db_table = 'eventos'
+        indexes = [
+            # consultas por ventana de fechas del calendario (events_api)
+            models.Index(fields=['fecha_inicio', 'fecha_fin'], name='evento_inicio_fin_idx'),
+            models.Index(fields=['fecha_fin', 'fecha_inicio'], name='evento_fin_inicio_idx'),
+        ]
 
     def __str__(self):
         return f"{self.titulo} ({self.fecha_inicio})"
+
+    @property
+    def regla_recurrencia(self):
+        """Regla de recurrencia como `recurrence.Rule`, o None si es un evento simple."""
+        from .recurrence import rule_from_values
+        return rule_from_values(self.recurrencia_freq, self.recurrencia_intervalo, self.recurrencia_hasta,
+                                self.recurrencia_count, self.recurrencia_excepciones)
+
+    def actualizar_recurrencia_fin(self):
+        """Recalcula recurrencia_fin para poder filtrar series por ventana con SQL."""
+        from .recurrence import series_end
+        self.recurrencia_freq = self.recurrencia_freq or None
+        self.recurrencia_fin = series_end(self.fecha_inicio, self.fecha_fin, self.regla_recurrencia)
+
+    def rango_fechas(self):
+        """(desde, hasta) de todas sus ocurrencias; hasta None = serie sin fin."""
+        if self.recurrencia_freq:
+            return self.fecha_inicio, self.recurrencia_fin
+        return self.fecha_inicio, self.fecha_fin or self.fecha_inicio
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # rango guardado, para registrar la salida si save() mueve el evento
+        if {'fecha_inicio', 'fecha_fin', 'recurrencia_freq', 'recurrencia_fin'} <= set(field_names):
+            instance._rango_guardado = instance.rango_fechas()
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.actualizar_recurrencia_fin()
+        anterior = getattr(self, '_rango_guardado', None)
+        super().save(*args, **kwargs)
+        rango = self.rango_fechas()
+        if anterior is not None and anterior != rango:
+            EventoSalida.objects.create(id_evento=self.pk, fecha_inicio=anterior[0], fecha_fin=anterior[1])
+        self._rango_guardado = rango
+
+
+class EventoSalida(models.Model):
+    """
+    Rango de fechas que abandonó un evento al cambiar sus fechas, para que la
+    sincronización incremental informe su salida sólo a las ventanas afectadas.
+    """
+    id_evento = models.IntegerField(db_index=True)
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField(blank=True, null=True)  # NULL = serie sin fin
+    fecha_salida = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        managed = True
+        db_table = 'eventos_salidas'
+
+    def __str__(self):
+        return f"Evento {self.id_evento} salió de {self.fecha_inicio}..{self.fecha_fin} ({self.fecha_salida})"
+
+
+class EventoEliminado(models.Model):
+    """Marca de borrado de un evento, para informar eliminaciones en la sincronización incremental."""
+    id_evento = models.IntegerField(db_index=True)
+    fecha_eliminacion = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        managed = True
+        db_table = 'eventos_eliminados'
+
+    def __str__(self):
+        return f"Evento {self.id_evento} eliminado ({self.fecha_eliminacion})"
+
+
+class GeocodeCache(models.Model):
+    """Resultado de geocodificación por dirección normalizada (incluye resultados negativos)."""
+    ESTADOS = (('ok', 'OK'), ('sin_resultado', 'Sin resultado'), ('error', 'Error'))
+
+    clave = models.CharField(max_length=64, unique=True)  # sha256 de la dirección normalizada
+    direccion_normalizada = models.TextField()
+    latitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True)
+    longitud = models.DecimalField(max_digits=14, decimal_places=10, blank=True, null=True)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='ok')
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True
+        db_table = 'geocode_cache'
+
+    def __str__(self):
+        return f"{self.direccion_normalizada} ({self.estado})"
+
+
+class VersionCache(models.Model):
+    """Versión de un conjunto de datos cacheado, compartida por todos los procesos (parte de la clave de caché)."""
+    clave = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = 'versiones_cache'
+
+    def __str__(self):
+        return f"{self.clave} v{self.version}"
+
+
+class RecordatorioEnviado(models.Model):
+    """Marca de recordatorio enviado (evento, usuario, ocurrencia) para que el envío sea idempotente."""
+    evento = models.ForeignKey(Evento, models.CASCADE, db_column='id_evento')
+    usuario = models.ForeignKey(UsuariosSistema, models.CASCADE, db_column='id_usuario')
+    fecha_ocurrencia = models.DateField()
+    fecha_envio = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = True
+        db_table = 'recordatorios_enviados'
+        constraints = [
+            models.UniqueConstraint(fields=['evento', 'usuario', 'fecha_ocurrencia'], name='recordatorio_unico'),
+        ]
+
+    def __str__(self):
+        return f"Recordatorio evento {self.evento_id} -> {self.usuario_id} ({self.fecha_ocurrencia})"
+
+
+@receiver(pre_save, sender=ProyectosHabitacionales)
+@receiver(pre_save, sender=Terrenos)
+@receiver(pre_save, sender=EmpresasConstructoras)
+def actualizar_celda_geo(sender, instance, **kwargs):
+    from .spatial import geohash_encode
+    instance.celda_geo = geohash_encode(instance.latitud, instance.longitud)
+
+
+@receiver(post_delete, sender=Evento)
+def registrar_evento_eliminado(sender, instance, **kwargs):
+    EventoEliminado.objects.create(id_evento=instance.pk)
+
+
+@receiver(m2m_changed, sender=Evento.asignados.through)
+def marcar_evento_modificado(sender, instance, action, reverse, pk_set, **kwargs):
+    """Cambiar los asignados cuenta como modificación del evento (no pasa por save())."""
+    if not reverse:
+        if action not in ('post_add', 'post_remove', 'post_clear'):
+            return
+        ids = [instance.pk]
+    elif action in ('post_add', 'post_remove'):
+        ids = list(pk_set or ())
+    elif action == 'pre_clear':
+        # al limpiar desde el usuario pk_set no está disponible: leer los eventos antes de borrar
+        ids = list(instance.evento_set.values_list('pk', flat=True))
+    else:
+        return
+    if ids:
+        Evento.objects.filter(pk__in=ids).update(fecha_modificacion=timezone.now())
+
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
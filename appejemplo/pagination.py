@@ -0,0 +1,216 @@
+"""
+Paginación por keyset (cursor) para colecciones grandes de la API
+
+`PageNumberPagination` ejecuta un COUNT(*) y un OFFSET creciente en cada
+página: las páginas profundas son cada vez más lentas y las inserciones
+desplazan los resultados entre páginas. `KeysetPagination` ordena por el
+primer campo de orden de la vista (`ordering` / `?ordering=`) más la clave
+primaria como desempate y pide "lo que sigue a (valor, pk)", de modo que con
+el índice (campo, pk) cada página cuesta lo mismo sin importar su
+profundidad.
+
+Respuesta: `{"next", "previous", "results"}`; el total exacto sólo se
+calcula si se pide con `?count=1`. Los NULL del campo de orden se tratan
+como el menor valor (último en orden descendente, primero en ascendente).
+
+`SizedPageNumberPagination` conserva la paginación por número de página
+(`count`, `?page=`) y sólo agrega `?page_size=`, para las colecciones cuyos
+clientes dependen de ese formato.
+"""
+
+import base64
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+TRUE_VALUES = ('1', 'true', 'si', 'sí', 'yes')
+
+
+class SizedPageNumberPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class KeysetPagination(BasePagination):
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    # ===== parámetros =====
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_ordering(self, queryset, view):
+        """(campo, descendente) según el orden ya aplicado por OrderingFilter o el `ordering` de la vista."""
+        terms = list(queryset.query.order_by) or list(getattr(view, 'ordering', None) or [])
+        term = terms[0] if terms and isinstance(terms[0], str) else '-pk'
+        descending = term.startswith('-')
+        name = term.lstrip('-')
+        opts = queryset.model._meta
+        if name == 'pk':
+            return opts.pk, descending
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            return opts.pk, descending
+        if not field.concrete or field.is_relation:
+            return opts.pk, descending
+        return field, descending
+
+    # ===== cursor =====
+
+    @staticmethod
+    def _dump_value(value):
+        if isinstance(value, (datetime.date, datetime.time)):
+            return value.isoformat()
+        if isinstance(value, decimal.Decimal):
+            return str(value)
+        return value
+
+    def encode_cursor(self, obj, reverse=False):
+        payload = {
+            'o': self.ordering_term,
+            'v': None if self.field.primary_key else self._dump_value(getattr(obj, self.field.attname)),
+            'k': obj.pk,
+            'r': int(reverse),
+        }
+        raw = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode().rstrip('=')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, raw)
+
+    def decode_cursor(self, request):
+        """(valor, pk, reversa) del cursor recibido, o None; NotFound si es inválido o de otro orden."""
+        raw = request.query_params.get(self.cursor_query_param)
+        if not raw:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(raw + '=' * (-len(raw) % 4)))
+            if payload['o'] != self.ordering_term:
+                raise ValueError
+            pk = self.model._meta.pk.to_python(payload['k'])
+            value = payload['v']
+            if value is not None:
+                value = self.field.to_python(value)
+            return value, pk, bool(payload['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    # ===== consulta =====
+
+    def _order_by(self, descending):
+        name = self.field.name
+        if self.field.primary_key:
+            return ['-pk' if descending else 'pk']
+        if self.field.null:
+            expr = F(name).desc(nulls_last=True) if descending else F(name).asc(nulls_first=True)
+        else:
+            expr = F(name).desc() if descending else F(name).asc()
+        return [expr, '-pk' if descending else 'pk']
+
+    def _after(self, value, pk, descending):
+        """Filas que siguen a (valor, pk) en el orden indicado."""
+        op = 'lt' if descending else 'gt'
+        if self.field.primary_key:
+            return Q(**{f'pk__{op}': pk})
+        name = self.field.name
+        if value is None:
+            condition = Q(**{f'{name}__isnull': True, f'pk__{op}': pk})
+            if not descending:
+                condition |= Q(**{f'{name}__isnull': False})
+            return condition
+        condition = Q(**{f'{name}__{op}': value}) | Q(**{name: value, f'pk__{op}': pk})
+        if descending and self.field.null:
+            condition |= Q(**{f'{name}__isnull': True})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset, view)
+        self.ordering_term = ('-' if self.descending else '') + ('pk' if self.field.primary_key else self.field.name)
+        cursor = self.decode_cursor(request)
+        self.reverse = bool(cursor and cursor[2])
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in TRUE_VALUES:
+            self.count = queryset.count()
+
+        # en reversa (página anterior) se recorre el orden invertido y luego se da vuelta la página
+        descending = self.descending != self.reverse
+        qs = queryset.order_by(*self._order_by(descending))
+        if cursor:
+            qs = qs.filter(self._after(cursor[0], cursor[1], descending))
+        rows = list(qs[:self.page_size + 1])
+        self.has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+        self.has_cursor = cursor is not None
+        return self.page
+
+    # ===== respuesta =====
+
+    def get_next_link(self):
+        if not self.page:
+            return None
+        if self.reverse or self.has_more:
+            return self.encode_cursor(self.page[-1])
+        return None
+
+    def get_previous_link(self):
+        if not self.page:
+            if self.has_cursor:
+                return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+            return None
+        if (self.reverse and self.has_more) or (not self.reverse and self.has_cursor):
+            return self.encode_cursor(self.page[0], reverse=True)
+        return None
+
+    def get_paginated_response(self, data):
+        body = {}
+        if self.count is not None:
+            body['count'] = self.count
+        body['next'] = self.get_next_link()
+        body['previous'] = self.get_previous_link()
+        body['results'] = data
+        return Response(body)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'description': 'Cursor de paginación (tomado de `next`/`previous`).', 'schema': {'type': 'string'}},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'description': 'Resultados por página.', 'schema': {'type': 'integer'}},
+            {'name': self.count_query_param, 'required': False, 'in': 'query',
+             'description': 'Incluir el total exacto (`count=1`).', 'schema': {'type': 'boolean'}},
+        ]
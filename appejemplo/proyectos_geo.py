@@ -0,0 +1,130 @@
+"""
+GeoJSON compacto de proyectos para el mapa del listado
+
+`/api/proyectos/geo/?bbox=oeste,sur,este,norte&zoom=z` devuelve sólo id,
+nombre, estado y coordenadas (las del proyecto o, si faltan, las de su
+terreno). Con zoom <= CLUSTER_MAX_ZOOM los proyectos se agrupan en el
+servidor por celdas de una grilla (un GROUP BY), de modo que una vista de
+todo Chile transfiere unos cientos de features en vez del listado completo.
+
+Las respuestas se cachean por (bbox ajustado a la grilla de teselas, zoom);
+cualquier cambio de proyectos o terrenos cambia la versión de la caché. La
+versión se guarda en la base de datos (`VersionCache`), no en la caché del
+proceso, para que todos los workers dejen de servir el GeoJSON anterior.
+"""
+
+import json
+import math
+import time
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, F, FloatField, Max, Min
+from django.db.models.functions import Cast, Coalesce, Floor
+
+from .models import ProyectosHabitacionales, VersionCache
+
+
+# Sobre este zoom se envían los proyectos individuales
+CLUSTER_MAX_ZOOM = 12
+
+# Celdas de agrupación por tesela (256 px / 4 = celdas de ~64 px)
+CELLS_PER_TILE = 4
+
+GEO_CACHE_TTL = 300
+GEO_VERSION_KEY = 'proyectos_geo:version'
+
+# Decimales de las coordenadas (~1 m)
+COORD_DECIMALS = 5
+
+
+def geo_version():
+    return VersionCache.objects.filter(clave=GEO_VERSION_KEY).values_list('version', flat=True).first() or 0
+
+
+def invalidate_geo_cache(*args, **kwargs):
+    """Receptor de señales (y llamada directa tras update()/bulk_update de coordenadas)."""
+    VersionCache.objects.update_or_create(clave=GEO_VERSION_KEY, defaults={'version': time.time_ns()})
+
+
+def parse_bbox(value):
+    """'oeste,sur,este,norte' -> tupla de floats; vacío = todo el mundo. ValueError si es inválido."""
+    if not value:
+        return -180.0, -90.0, 180.0, 90.0
+    try:
+        west, south, east, north = (float(v) for v in value.split(','))
+    except ValueError:
+        raise ValueError('bbox debe ser oeste,sur,este,norte')
+    # Leaflet entrega límites fuera de rango al alejarse: se recortan al mundo
+    west, east = max(-180.0, west), min(180.0, east)
+    south, north = max(-90.0, south), min(90.0, north)
+    if west >= east or south >= north:
+        raise ValueError('bbox inválido')
+    return west, south, east, north
+
+
+def parse_zoom(value, default=6):
+    try:
+        zoom = int(value) if value not in (None, '') else default
+    except (TypeError, ValueError):
+        raise ValueError('zoom inválido')
+    return max(0, min(zoom, 20))
+
+
+def tile_bbox(bbox, zoom):
+    """Ajusta el bbox hacia afuera a la grilla de teselas del zoom: pocas claves de caché por vista."""
+    step = 360.0 / (2 ** zoom)
+    west, south, east, north = bbox
+    return (max(-180.0, math.floor(west / step) * step), max(-90.0, math.floor(south / step) * step),
+            min(180.0, math.ceil(east / step) * step), min(90.0, math.ceil(north / step) * step))
+
+
+def _located(queryset):
+    return queryset.annotate(
+        geo_lat=Cast(Coalesce('latitud', 'id_terreno__latitud'), FloatField()),
+        geo_lng=Cast(Coalesce('longitud', 'id_terreno__longitud'), FloatField()),
+    ).filter(geo_lat__isnull=False, geo_lng__isnull=False)
+
+
+def _point(lng, lat, properties):
+    return {'type': 'Feature', 'properties': properties,
+            'geometry': {'type': 'Point',
+                         'coordinates': [round(float(lng), COORD_DECIMALS), round(float(lat), COORD_DECIMALS)]}}
+
+
+def features(bbox, zoom, queryset=None):
+    """Features GeoJSON (puntos y clusters) de los proyectos dentro de `bbox`."""
+    west, south, east, north = bbox
+    qs = _located(queryset if queryset is not None else ProyectosHabitacionales.objects.all()).filter(
+        geo_lat__gte=south, geo_lat__lte=north, geo_lng__gte=west, geo_lng__lte=east)
+
+    if zoom > CLUSTER_MAX_ZOOM:
+        return [_point(r['geo_lng'], r['geo_lat'], {'id': r['id_proyecto'], 'nombre': r['nombre_proyecto'],
+                                                     'estado': r['estado_proyecto']})
+                for r in qs.values('id_proyecto', 'nombre_proyecto', 'estado_proyecto', 'geo_lat', 'geo_lng')]
+
+    cell = 360.0 / (2 ** zoom) / CELLS_PER_TILE
+    rows = (qs.annotate(gx=Floor((F('geo_lng') - west) / cell), gy=Floor((F('geo_lat') - south) / cell))
+            .values('gx', 'gy')
+            .annotate(n=Count('id_proyecto'), lat=Avg('geo_lat'), lng=Avg('geo_lng'), pid=Min('id_proyecto'),
+                      nombre=Max('nombre_proyecto'), estado=Max('estado_proyecto'))
+            .order_by())
+    result = []
+    for r in rows:
+        if r['n'] == 1:
+            # un único proyecto en la celda: Min/Max son sus propios valores
+            result.append(_point(r['lng'], r['lat'], {'id': r['pid'], 'nombre': r['nombre'], 'estado': r['estado']}))
+        else:
+            result.append(_point(r['lng'], r['lat'], {'cluster': True, 'count': r['n']}))
+    return result
+
+
+def geojson_body(bbox, zoom):
+    """Cuerpo JSON (bytes) de la respuesta, cacheado por (bbox de teselas, zoom, versión)."""
+    bbox = tile_bbox(bbox, zoom)
+    key = 'proyectos_geo:%s:%d:%s' % (geo_version(), zoom, ','.join('%.6f' % v for v in bbox))
+    body = cache.get(key)
+    if body is None:
+        body = json.dumps({'type': 'FeatureCollection', 'bbox': list(bbox), 'zoom': zoom,
+                           'features': features(bbox, zoom)}, separators=(',', ':')).encode('utf-8')
+        cache.set(key, body, GEO_CACHE_TTL)
+    return body
@@ -0,0 +1,175 @@
+"""
+Reglas de recurrencia para eventos del calendario
+
+Implementa un subconjunto de RRULE (RFC 5545): FREQ (daily, weekly, monthly,
+yearly), INTERVAL, UNTIL, COUNT y fechas de excepción (EXDATE). Una serie se
+guarda como una sola fila de `Evento` y sus ocurrencias se expanden de forma
+perezosa, sólo para la ventana pedida, con una caché por regla.
+"""
+
+import calendar
+import datetime
+from collections import namedtuple
+from functools import lru_cache
+
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+
+# Tope de ocurrencias generadas por expansión (protege ventanas patológicas)
+MAX_OCCURRENCES = 1000
+
+# Máximo COUNT aceptado en una regla
+MAX_COUNT = 10000
+
+# Máximo horizonte de UNTIL, en años desde el inicio de la serie
+MAX_UNTIL_YEARS = 100
+
+Rule = namedtuple('Rule', ['freq', 'interval', 'until', 'count', 'exceptions'])
+
+
+def _add_months(d, months):
+    """Suma meses; devuelve None si el día no existe en el mes destino (se omite, como en RRULE)."""
+    total = d.month - 1 + months
+    year, month = d.year + total // 12, total % 12 + 1
+    if d.day > calendar.monthrange(year, month)[1]:
+        return None
+    return d.replace(year=year, month=month)
+
+
+def _iter_dates(dtstart, rule, from_date):
+    """
+    Genera fechas de inicio de la serie (sin excepciones) a partir de ~from_date.
+
+    Para daily/weekly salta directamente a la primera ocurrencia relevante;
+    monthly/yearly itera desde dtstart porque los días inexistentes se omiten
+    y, con COUNT, hay que contar sólo las fechas válidas.
+    """
+    if rule.freq in ('daily', 'weekly'):
+        step = rule.interval * (7 if rule.freq == 'weekly' else 1)
+        n = max(0, -(-(from_date - dtstart).days // step))
+        while rule.count is None or n < rule.count:
+            yield dtstart + datetime.timedelta(days=n * step)
+            n += 1
+        return
+    months = rule.interval * (12 if rule.freq == 'yearly' else 1)
+    k = generated = 0
+    while rule.count is None or generated < rule.count:
+        d = _add_months(dtstart, k * months)
+        k += 1
+        if d is None:
+            continue
+        generated += 1
+        yield d
+
+
+@lru_cache(maxsize=2048)
+def occurrence_dates(dtstart, rule, window_start, window_end, duration_days=0):
+    """
+    Fechas de inicio de las ocurrencias que solapan [window_start, window_end).
+
+    Cacheado por (regla, ventana): la regla incluye todos sus parámetros, por
+    lo que editar la serie produce una clave nueva y no hace falta invalidar.
+    """
+    exceptions = set(rule.exceptions or ())
+    desde = window_start - datetime.timedelta(days=duration_days)
+    result = []
+    for d in _iter_dates(dtstart, rule, desde):
+        if d >= window_end or (rule.until and d > rule.until):
+            break
+        if d >= desde and d not in exceptions:
+            result.append(d)
+            if len(result) >= MAX_OCCURRENCES:
+                break
+    return tuple(result)
+
+
+def last_occurrence(dtstart, rule):
+    """Fecha de inicio de la última ocurrencia, o None si la serie no termina."""
+    if rule.count is None and rule.until is None:
+        return None
+    if rule.freq in ('daily', 'weekly'):
+        step = rule.interval * (7 if rule.freq == 'weekly' else 1)
+        n = rule.count - 1 if rule.count is not None else None
+        if rule.until:
+            hasta = (rule.until - dtstart).days // step
+            n = hasta if n is None else min(n, hasta)
+        return dtstart + datetime.timedelta(days=n * step) if n >= 0 else None
+    last = None
+    for d in _iter_dates(dtstart, rule, dtstart):
+        if rule.until and d > rule.until:
+            break
+        last = d
+    return last
+
+
+def parse_rrule(raw, dtstart=None):
+    """
+    Convierte un dict {'freq','interval','until','count','exceptions'} o un
+    string 'FREQ=WEEKLY;INTERVAL=2;COUNT=10' en `Rule`. Lanza ValueError si es inválido.
+
+    `until` no puede superar MAX_UNTIL_YEARS desde `dtstart` (o desde hoy si no se indica).
+    """
+    if isinstance(raw, str):
+        parts = {}
+        for chunk in raw.strip().removeprefix('RRULE:').split(';'):
+            if chunk.strip():
+                key, _, value = chunk.partition('=')
+                parts[key.strip().lower()] = value.strip()
+        raw = parts
+    if not isinstance(raw, dict):
+        raise ValueError('recurrencia inválida')
+
+    freq = str(raw.get('freq') or '').lower()
+    if freq not in FREQUENCIES:
+        raise ValueError(f'freq debe ser uno de {", ".join(FREQUENCIES)}')
+    try:
+        interval = int(raw['interval']) if raw.get('interval') not in (None, '') else 1
+        count = int(raw['count']) if raw.get('count') not in (None, '') else None
+        until = raw.get('until') or None
+        if until:
+            until = str(until)
+            until = datetime.date.fromisoformat(until[:10] if '-' in until else f'{until[:4]}-{until[4:6]}-{until[6:8]}')
+        exceptions = tuple(sorted(datetime.date.fromisoformat(str(x)[:10]) for x in (raw.get('exceptions') or [])))
+    except (TypeError, ValueError):
+        raise ValueError('recurrencia inválida: interval/count/until/exceptions')
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError('interval y count deben ser positivos')
+    if count is not None and count > MAX_COUNT:
+        raise ValueError(f'count no puede superar {MAX_COUNT}')
+    if until:
+        base = dtstart or datetime.date.today()
+        if until > datetime.date(min(base.year + MAX_UNTIL_YEARS, datetime.MAXYEAR), 12, 31):
+            raise ValueError(f'until no puede superar {MAX_UNTIL_YEARS} años desde el inicio')
+    return Rule(freq, interval, until, count, exceptions)
+
+
+def rule_from_values(freq, interval, until, count, exceptions):
+    """Construye `Rule` desde las columnas de `Evento` (None si no hay frecuencia)."""
+    if not freq:
+        return None
+    excepciones = []
+    for x in exceptions or ():
+        excepciones.append(x if isinstance(x, datetime.date) else datetime.date.fromisoformat(str(x)[:10]))
+    if isinstance(until, str):
+        until = datetime.date.fromisoformat(until[:10])
+    return Rule(freq, interval or 1, until, count, tuple(sorted(excepciones)))
+
+
+def series_end(fecha_inicio, fecha_fin, rule):
+    """
+    Fecha de fin de la última ocurrencia de la serie.
+
+    Devuelve None para eventos simples (no se usa) y para series sin fin.
+    """
+    if rule is None or fecha_inicio is None:
+        return None
+    if isinstance(fecha_inicio, str):
+        fecha_inicio = datetime.date.fromisoformat(fecha_inicio)
+    if isinstance(fecha_fin, str):
+        fecha_fin = datetime.date.fromisoformat(fecha_fin)
+    if rule.count is None and rule.until is None:
+        return None
+    # una serie sin ocurrencias (until < inicio) se acota a su fecha de inicio
+    last = last_occurrence(fecha_inicio, rule) or fecha_inicio
+    duracion = (fecha_fin - fecha_inicio) if fecha_fin and fecha_fin >= fecha_inicio else datetime.timedelta(0)
+    return last + duracion
@@ -0,0 +1,166 @@
+"""
+Recordatorios de eventos del calendario
+
+Busca las ocurrencias de eventos que comienzan dentro de una ventana de
+tiempo (índice sobre fecha_inicio), resuelve los asignados de cada lote con
+una sola consulta sobre la M2M y crea las `Notificacion` con bulk_create.
+La tabla `RecordatorioEnviado` marca (evento, usuario, ocurrencia) ya
+notificados, de modo que volver a ejecutar nunca duplica recordatorios.
+"""
+
+import datetime
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Evento, Notificacion, RecordatorioEnviado
+from .recurrence import occurrence_dates, rule_from_values
+
+
+# Anticipación por defecto de los recordatorios
+DEFAULT_HORIZON = datetime.timedelta(hours=24)
+
+# Eventos procesados por lote (cada lote cuesta un número fijo de consultas)
+BATCH_SIZE = 1000
+
+REMINDER_VALUES = ('id_evento', 'titulo', 'fecha_inicio', 'fecha_fin', 'hora_inicio', 'recurrencia_freq',
+                   'recurrencia_intervalo', 'recurrencia_hasta', 'recurrencia_count', 'recurrencia_excepciones')
+
+
+def _occurrences_in_window(row, desde, hasta):
+    """Fechas de ocurrencia de `row` cuyo inicio (fecha + hora) cae en [desde, hasta)."""
+    hora = row['hora_inicio'] or datetime.time.min
+    rule = rule_from_values(row['recurrencia_freq'], row['recurrencia_intervalo'], row['recurrencia_hasta'],
+                            row['recurrencia_count'], row['recurrencia_excepciones'])
+    if rule is None:
+        dias = (row['fecha_inicio'],)
+    else:
+        dias = occurrence_dates(row['fecha_inicio'], rule, desde.date(), hasta.date() + datetime.timedelta(days=1))
+    return [d for d in dias if desde <= datetime.datetime.combine(d, hora) < hasta]
+
+
+def _mensaje(row, fecha):
+    texto = f'Recordatorio: "{row["titulo"]}" el {fecha.strftime("%d/%m/%Y")}'
+    if row['hora_inicio']:
+        texto += f' a las {row["hora_inicio"].strftime("%H:%M")}'
+    return texto
+
+
+def upcoming_events(desde, hasta):
+    """Eventos (values) con alguna ocurrencia que comienza en [desde, hasta), por fecha_inicio indexada."""
+    start, end = desde.date(), hasta.date() + datetime.timedelta(days=1)
+    simples = Q(recurrencia_freq__isnull=True, fecha_inicio__gte=start, fecha_inicio__lt=end)
+    series = Q(recurrencia_freq__isnull=False, fecha_inicio__lt=end) & (
+        Q(recurrencia_fin__isnull=True) | Q(recurrencia_fin__gte=start)
+    )
+    return Evento.objects.filter(simples | series).order_by('id_evento').values(*REMINDER_VALUES)
+
+
+def _process_batch(rows, desde, hasta, stats, dry_run):
+    ocurrencias = {}
+    for row in rows:
+        dias = _occurrences_in_window(row, desde, hasta)
+        if dias:
+            ocurrencias[row['id_evento']] = (row, dias)
+    if not ocurrencias:
+        return
+    stats['occurrences'] += sum(len(d) for _, d in ocurrencias.values())
+
+    # asignados del lote (auth.User -> UsuariosSistema vía el perfil) en una consulta
+    destinatarios = defaultdict(list)
+    through = Evento.asignados.through
+    for evento_id, us_id in (through.objects.filter(evento_id__in=list(ocurrencias))
+                             .values_list('evento_id', 'user__userprofile__usuariosistema_id')):
+        if us_id is None:
+            stats['skipped_without_profile'] += 1
+        else:
+            destinatarios[evento_id].append(us_id)
+
+    if dry_run:
+        stats['sent'] += len(_pending_reminders(ocurrencias, destinatarios, desde, hasta, stats)[1])
+        return
+    with transaction.atomic():
+        # bloquear los eventos del lote (donde el motor lo soporta) serializa ejecuciones simultáneas
+        list(Evento.objects.select_for_update().filter(id_evento__in=list(destinatarios))
+             .order_by('id_evento').values_list('id_evento', flat=True))
+        marcas, notificaciones = _pending_reminders(ocurrencias, destinatarios, desde, hasta, stats)
+        # marca y notificación en la misma transacción: o quedan ambas o ninguna; sólo se notifican
+        # las marcas que esta ejecución insertó (otra pudo dejar alguna después de nuestra lectura)
+        insertadas = _insert_markers(marcas)
+        stats['already_sent'] += len(marcas) - len(insertadas)
+        notificaciones = [n for i, n in enumerate(notificaciones) if i in insertadas]
+        stats['sent'] += len(notificaciones)
+        if notificaciones:
+            Notificacion.objects.bulk_create(notificaciones, batch_size=BATCH_SIZE)
+
+
+def _insert_markers(marcas):
+    """
+    Inserta las marcas por bloques y devuelve los índices insertados; un
+    bloque con marcas ya existentes se reintenta fila por fila.
+    """
+    insertadas = set()
+    for start in range(0, len(marcas), BATCH_SIZE):
+        bloque = marcas[start:start + BATCH_SIZE]
+        try:
+            with transaction.atomic():
+                RecordatorioEnviado.objects.bulk_create(bloque)
+            insertadas.update(range(start, start + len(bloque)))
+        except IntegrityError:
+            for offset, marca in enumerate(bloque):
+                try:
+                    with transaction.atomic():
+                        marca.save(force_insert=True)
+                    insertadas.add(start + offset)
+                except IntegrityError:
+                    continue
+    return insertadas
+
+
+def _sent_markers(evento_ids, desde, hasta):
+    return set(RecordatorioEnviado.objects
+               .filter(evento_id__in=evento_ids, fecha_ocurrencia__gte=desde.date(), fecha_ocurrencia__lte=hasta.date())
+               .values_list('evento_id', 'usuario_id', 'fecha_ocurrencia'))
+
+
+def _pending_reminders(ocurrencias, destinatarios, desde, hasta, stats):
+    """(marcas, notificaciones) de las ocurrencias aún no notificadas."""
+    enviados = _sent_markers(list(destinatarios), desde, hasta)
+    marcas, notificaciones = [], []
+    for evento_id, usuarios in destinatarios.items():
+        row, dias = ocurrencias[evento_id]
+        for fecha in dias:
+            for us_id in dict.fromkeys(usuarios):
+                if (evento_id, us_id, fecha) in enviados:
+                    stats['already_sent'] += 1
+                    continue
+                marcas.append(RecordatorioEnviado(evento_id=evento_id, usuario_id=us_id, fecha_ocurrencia=fecha))
+                notificaciones.append(Notificacion(id_usuario_id=us_id, tipo='Recordatorio', canal='In-App',
+                                                   mensaje=_mensaje(row, fecha)))
+    return marcas, notificaciones
+
+
+def send_event_reminders(now=None, horizon=DEFAULT_HORIZON, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Crea los recordatorios de las ocurrencias que comienzan en [now, now + horizon).
+
+    Devuelve estadísticas: events, occurrences, sent, already_sent, skipped_without_profile.
+    """
+    now = now or timezone.now()
+    if timezone.is_aware(now):
+        # fechas y horas de Evento se guardan en hora local, sin zona
+        now = timezone.localtime(now).replace(tzinfo=None)
+    desde, hasta = now, now + horizon
+    stats = {'events': 0, 'occurrences': 0, 'sent': 0, 'already_sent': 0, 'skipped_without_profile': 0}
+    batch = []
+    for row in upcoming_events(desde, hasta).iterator(chunk_size=batch_size):
+        stats['events'] += 1
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _process_batch(batch, desde, hasta, stats, dry_run)
+            batch = []
+    if batch:
+        _process_batch(batch, desde, hasta, stats, dry_run)
+    return stats
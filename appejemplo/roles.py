@@ -0,0 +1,117 @@
+"""
+Resolución de roles de usuario
+
+Obtiene (id, nombre para mostrar, rol canónico) para muchos usuarios con una
+sola consulta con JOIN sobre UserProfile y UsuariosSistema, en vez de dos
+consultas perezosas por usuario. Los resultados se guardan en una caché en
+proceso de TTL corto que además se invalida al guardar usuarios o perfiles.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+
+
+UserRole = namedtuple('UserRole', ['id', 'display', 'role', 'raw_role'])
+
+# Segundos que una entrada permanece en caché (configurable en settings)
+ROLE_CACHE_TTL = getattr(settings, 'ROLE_CACHE_TTL', 30)
+
+_lock = threading.Lock()
+_by_user = {}          # user_id -> (expira, UserRole)
+_active_ids = None     # (expira, [user_id, ...]) en orden de username
+
+
+def canonical_role(raw):
+    """Normaliza un rol a las claves canónicas usadas por frontend/backend."""
+    if not raw:
+        return None
+    try:
+        r = str(raw).strip().lower()
+    except Exception:
+        return None
+    role_map = {
+        'empresa_constructora': 'empresa',
+        'empresa': 'empresa',
+        'beneficiario': 'beneficiario',
+        'beneficiarios': 'beneficiario',
+        'jefe_proyecto': 'jefe_proyecto',
+        'jefe': 'jefe_proyecto',
+        'ministro': 'ministro',
+        'admin': 'admin',
+        'superuser': 'admin',
+        'usuario': 'usuario',
+    }
+    return role_map.get(r, r)
+
+
+def _fetch(queryset):
+    """Una sola consulta: User LEFT JOIN userprofile LEFT JOIN usuarios_sistema."""
+    rows = queryset.values_list(
+        'id', 'username', 'first_name', 'last_name',
+        'userprofile__usuariosistema__tipo_usuario', 'userprofile__tipo_usuario',
+    )
+    result = []
+    for uid, username, first, last, us_tipo, up_tipo in rows:
+        # preferir UsuariosSistema.tipo_usuario (más granular) y luego UserProfile.tipo_usuario
+        raw = us_tipo or up_tipo
+        display = f"{first} {last}".strip() or username
+        result.append(UserRole(uid, display, canonical_role(raw), raw))
+    return result
+
+
+def _store(roles, now):
+    expira = now + ROLE_CACHE_TTL
+    for r in roles:
+        _by_user[r.id] = (expira, r)
+
+
+def user_roles(user_ids):
+    """
+    Devuelve {user_id: UserRole} para los ids indicados.
+
+    Los ids inexistentes no aparecen en el resultado. Sólo se consulta la base
+    de datos (una vez) por los ids que no estén vigentes en caché.
+    """
+    ids = set(int(i) for i in user_ids)
+    now = time.monotonic()
+    found = {}
+    with _lock:
+        for uid in ids:
+            entry = _by_user.get(uid)
+            if entry and entry[0] > now:
+                found[uid] = entry[1]
+    missing = ids - set(found)
+    if missing:
+        fetched = _fetch(User.objects.filter(id__in=missing))
+        with _lock:
+            _store(fetched, now)
+        found.update((r.id, r) for r in fetched)
+    return found
+
+
+def active_user_roles():
+    """Lista de UserRole de todos los usuarios activos, ordenada por username."""
+    global _active_ids
+    now = time.monotonic()
+    with _lock:
+        if _active_ids and _active_ids[0] > now:
+            cached = [_by_user.get(uid) for uid in _active_ids[1]]
+            if all(e and e[0] > now for e in cached):
+                return [e[1] for e in cached]
+    roles = _fetch(User.objects.filter(is_active=True).order_by('username'))
+    with _lock:
+        _store(roles, now)
+        _active_ids = (now + ROLE_CACHE_TTL, [r.id for r in roles])
+    return roles
+
+
+def invalidate_role_cache(*args, **kwargs):
+    """Vacía la caché (se conecta a post_save/post_delete de usuarios y perfiles)."""
+    global _active_ids
+    with _lock:
+        _by_user.clear()
+        _active_ids = None
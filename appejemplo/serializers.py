@@ -1,44 +1,48 @@
 from rest_framework import serializers
 from .models import *
+from .sparse_fields import SparseFieldsSerializerMixin
 
-class RegionesSerializer(serializers.ModelSerializer):
+class RegionesSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Regiones
         fields = '__all__'
 
 
-class MunicipiosSerializer(serializers.ModelSerializer):
+class MunicipiosSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     nombre_region = serializers.CharField(source='id_region.nombre_region', read_only=True)
     
     class Meta:
         model = Municipios
         fields = '__all__'
+        expandable = {'region': ('id_region', RegionesSerializer)}
 
 
-class BeneficiariosSerializer(serializers.ModelSerializer):
+class BeneficiariosSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     nombre_completo = serializers.ReadOnlyField()
     nombre_municipio = serializers.CharField(source='id_municipio.nombre_municipio', read_only=True)
     
     class Meta:
         model = Beneficiarios
         fields = '__all__'
+        expandable = {'municipio': ('id_municipio', MunicipiosSerializer)}
 
 
-class EmpresasConstructorasSerializer(serializers.ModelSerializer):
+class EmpresasConstructorasSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = EmpresasConstructoras
         fields = '__all__'
 
 
-class TerrenosSerializer(serializers.ModelSerializer):
+class TerrenosSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     nombre_municipio = serializers.CharField(source='id_municipio.nombre_municipio', read_only=True)
     
     class Meta:
         model = Terrenos
         fields = '__all__'
+        expandable = {'municipio': ('id_municipio', MunicipiosSerializer)}
 
 
-class ProyectosHabitacionalesSerializer(serializers.ModelSerializer):
+class ProyectosHabitacionalesSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     nombre_municipio = serializers.CharField(source='id_municipio.nombre_municipio', read_only=True)
     razon_social_empresa = serializers.CharField(source='id_empresa_constructora.razon_social', read_only=True)
     direccion_terreno = serializers.CharField(source='id_terreno.direccion', read_only=True)
@@ -50,6 +54,11 @@ class ProyectosHabitacionalesSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProyectosHabitacionales
         fields = '__all__'
+        expandable = {
+            'municipio': ('id_municipio', MunicipiosSerializer),
+            'empresa': ('id_empresa_constructora', EmpresasConstructorasSerializer),
+            'terreno': ('id_terreno', TerrenosSerializer),
+        }
 
     def create(self, validated_data):
         # Si el request proviene de un usuario empresa, forzamos la asociación
@@ -67,13 +76,17 @@ class ProyectosHabitacionalesSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class PostulacionesSerializer(serializers.ModelSerializer):
+class PostulacionesSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     nombre_beneficiario = serializers.CharField(source='id_beneficiario.nombre_completo', read_only=True)
     nombre_proyecto = serializers.CharField(source='id_proyecto.nombre_proyecto', read_only=True)
     
     class Meta:
         model = Postulaciones
         fields = '__all__'
+        expandable = {
+            'beneficiario': ('id_beneficiario', BeneficiariosSerializer),
+            'proyecto': ('id_proyecto', ProyectosHabitacionalesSerializer),
+        }
         extra_kwargs = {
             # permitir actualización parcial a través de la API
             'estado_postulacion': {'required': False},
@@ -88,37 +101,44 @@ class PostulacionesSerializer(serializers.ModelSerializer):
         return value
 
 
-class InstitucionesSerializer(serializers.ModelSerializer):
+class InstitucionesSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Instituciones
         fields = '__all__'
 
 
-class UsuariosSistemaSerializer(serializers.ModelSerializer):
+class UsuariosSistemaSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     nombre_institucion = serializers.CharField(source='id_institucion.nombre_institucion', read_only=True)
 
     class Meta:
         model = UsuariosSistema
         fields = '__all__'
+        expandable = {'institucion': ('id_institucion', InstitucionesSerializer)}
         extra_kwargs = {'password_hash': {'write_only': True}}
 
 
-class LogAuditoriaSerializer(serializers.ModelSerializer):
+class LogAuditoriaSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = LogAuditoria
         fields = '__all__'
+        expandable = {'usuario': ('id_usuario', UsuariosSistemaSerializer)}
 
 
-class NotificacionSerializer(serializers.ModelSerializer):
+class NotificacionSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Notificacion
         fields = '__all__'
+        expandable = {'usuario': ('id_usuario', UsuariosSistemaSerializer)}
 
 
-class MatchingSerializer(serializers.ModelSerializer):
+class MatchingSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     nombre_beneficiario = serializers.CharField(source='id_beneficiario.nombre_completo', read_only=True)
     nombre_proyecto = serializers.CharField(source='id_proyecto.nombre_proyecto', read_only=True)
 
     class Meta:
         model = Matching
         fields = '__all__'
+        expandable = {
+            'beneficiario': ('id_beneficiario', BeneficiariosSerializer),
+            'proyecto': ('id_proyecto', ProyectosHabitacionalesSerializer),
+        }
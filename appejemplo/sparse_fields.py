@@ -0,0 +1,148 @@
+"""
+Campos dispersos (`?fields=`) y expansión de relaciones (`?expand=`) en la API
+
+- `?fields=id_proyecto,nombre_proyecto` limita la representación a esos
+  campos; `empresa.razon_social` expande la relación `empresa` con sólo ese
+  campo.
+- `?expand=empresa,terreno` agrega el objeto relacionado completo bajo ese
+  nombre (las relaciones expandibles se declaran en `Meta.expandable` del
+  serializer como `nombre: (campo_fk, SerializerClass)`).
+
+El viewset deriva el `only()`/`select_related()` del queryset de los campos
+que efectivamente se serializan, de modo que una consulta angosta también
+genera un SQL angosto. Sólo aplica a métodos de lectura; las escrituras
+validan y devuelven el serializer completo.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def parse_field_list(raw):
+    """'a, b,,c' (o una lista) -> ['a', 'b', 'c'] (sin duplicados, en orden)."""
+    if not raw:
+        return []
+    items = raw if isinstance(raw, (list, tuple)) else str(raw).split(',')
+    names = []
+    for name in items:
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+class SparseFieldsSerializerMixin:
+    """Acepta `fields=` y `expand=` (listas o texto separado por comas) al construir el serializer."""
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, expand = parse_field_list(fields), parse_field_list(expand)
+        if not fields and not expand:
+            return
+
+        top, nested = [], {}
+        for name in fields:
+            head, _, rest = name.partition('.')
+            if rest:
+                nested.setdefault(head, []).append(rest)
+            else:
+                top.append(head)
+
+        expandable = getattr(self.Meta, 'expandable', {})
+        expanded = list(expand) + [name for name in nested if name not in expand]
+        unknown = [name for name in expanded if name not in expandable]
+        if unknown:
+            raise serializers.ValidationError({'expand': f"No se puede expandir: {', '.join(unknown)}"})
+        for name in expanded:
+            source, serializer_class = expandable[name]
+            self.fields[name] = serializer_class(source=source, read_only=True, fields=nested.get(name))
+
+        if top or nested:
+            unknown = [name for name in top if name not in self.fields]
+            if unknown:
+                raise serializers.ValidationError({'fields': f"Campos desconocidos: {', '.join(unknown)}"})
+            keep = set(top) | set(expanded)
+            for name in list(self.fields):
+                if name not in keep:
+                    self.fields.pop(name)
+
+
+# ===== queryset =====
+
+def _all_columns(model, prefix):
+    return {prefix + f.name for f in model._meta.concrete_fields}
+
+
+def _plan(serializer, model, prefix, related, only):
+    for field in serializer.fields.values():
+        if field.write_only or isinstance(field, (serializers.ManyRelatedField, serializers.ListSerializer)):
+            continue
+        attrs = field.source_attrs
+        if not attrs:
+            # source='*': el campo puede leer cualquier atributo
+            only.update(_all_columns(model, prefix))
+            continue
+        current, path = model, prefix
+        for i, attr in enumerate(attrs):
+            last = i == len(attrs) - 1
+            try:
+                model_field = current._meta.get_field(attr)
+            except FieldDoesNotExist:
+                # propiedad o método: no se sabe qué columnas usa; si el atributo
+                # no existe el serializer omite el campo y no hay nada que cargar
+                if hasattr(current, attr):
+                    only.update(_all_columns(current, path))
+                break
+            if not model_field.concrete:
+                # relación inversa / m2m: la resuelve su propia consulta
+                break
+            if model_field.is_relation and (not last or isinstance(field, serializers.BaseSerializer)):
+                related.add(path + attr)
+                only.add(path + attr)
+                current, path = model_field.related_model, f'{path}{attr}__'
+                if last:
+                    _plan(field, current, path, related, only)
+                continue
+            only.add(path + attr)
+            break
+
+
+def queryset_plan(serializer, model):
+    """(select_related, only) necesarios para serializar con `serializer` instancias de `model`."""
+    related, only = set(), set()
+    _plan(serializer, model, '', related, only)
+    return related, only
+
+
+class SparseFieldsViewSetMixin:
+    """Pasa `?fields=`/`?expand=` al serializer y recorta el queryset de lectura en consecuencia."""
+
+    def _sparse_params(self):
+        request = getattr(self, 'request', None)
+        if request is None or request.method not in SAFE_METHODS:
+            return None, None
+        return request.query_params.get('fields'), request.query_params.get('expand')
+
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self._sparse_params()
+        if fields or expand:
+            kwargs.setdefault('fields', fields)
+            kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields, expand = self._sparse_params()
+        if not (fields or expand):
+            return queryset
+        related, only = queryset_plan(self.get_serializer(), queryset.model)
+        # los campos de orden se cargan siempre (cursor de paginación)
+        ordering = list(getattr(self, 'ordering', None) or [])
+        ordering_fields = getattr(self, 'ordering_fields', None)
+        if isinstance(ordering_fields, (list, tuple)):
+            ordering += list(ordering_fields)
+        concrete = {f.name for f in queryset.model._meta.concrete_fields}
+        only.update(name.lstrip('-') for name in ordering if name.lstrip('-') in concrete)
+        queryset = queryset.select_related(None).select_related(*related)
+        return queryset.only(*only) if only else queryset
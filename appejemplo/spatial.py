@@ -0,0 +1,162 @@
+"""
+Índice espacial por celdas geohash (sin PostGIS)
+
+Los modelos con latitud/longitud guardan además `celda_geo`, el geohash de
+precisión `GEOHASH_PRECISION` de sus coordenadas (indexado, se mantiene al
+guardar). Una búsqueda por radio:
+
+1. calcula las celdas (a la precisión adecuada al radio) que cubren el
+   rectángulo envolvente del círculo y filtra por rangos de prefijo sobre el
+   índice de `celda_geo` (funciona igual en SQLite y MySQL),
+2. filtra por el rectángulo envolvente en latitud/longitud,
+3. refina con la distancia haversine exacta y ordena por distancia.
+"""
+
+import math
+
+from django.db.models import Q
+
+
+GEOHASH_PRECISION = 7
+EARTH_RADIUS_KM = 6371.0088
+
+# Máximo de celdas por consulta; se baja la precisión hasta no superarlo
+MAX_CELLS = 32
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Geohash de (lat, lng); None si faltan coordenadas."""
+    if lat is None or lng is None:
+        return None
+    lat, lng = float(lat), float(lng)
+    lat_lo, lat_hi, lng_lo, lng_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch, lng_lo = ch * 2 + 1, mid
+            else:
+                ch, lng_hi = ch * 2, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = ch * 2 + 1, mid
+            else:
+                ch, lat_hi = ch * 2, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return ''.join(chars)
+
+
+def cell_size_deg(precision):
+    """(alto, ancho) en grados de una celda geohash de `precision` caracteres."""
+    total = 5 * precision
+    lng_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat, lng, radius_km):
+    """(lat_min, lat_max, lng_min, lng_max) que contiene el círculo."""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlng = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return max(-90.0, lat - dlat), min(90.0, lat + dlat), max(-180.0, lng - dlng), min(180.0, lng + dlng)
+
+
+def covering_cells(bbox, max_cells=MAX_CELLS):
+    """Prefijos geohash que cubren el rectángulo, con la mayor precisión que no exceda `max_cells`."""
+    lat_min, lat_max, lng_min, lng_max = bbox
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        h, w = cell_size_deg(precision)
+        rows = math.floor(lat_max / h) - math.floor(lat_min / h) + 1
+        cols = math.floor(lng_max / w) - math.floor(lng_min / w) + 1
+        if rows * cols <= max_cells or precision == 1:
+            break
+    cells = set()
+    lat = lat_min
+    while True:
+        lng = lng_min
+        while True:
+            cells.add(geohash_encode(lat, lng, precision))
+            if lng >= lng_max:
+                break
+            lng = min(lng + w, lng_max)
+        if lat >= lat_max:
+            break
+        lat = min(lat + h, lat_max)
+    return sorted(cells)
+
+
+def cells_q(cells, field='celda_geo'):
+    """OR de rangos [prefijo, prefijo + '{') — usa el índice en cualquier backend (a diferencia de LIKE)."""
+    q = Q()
+    for c in cells:
+        # '{' es el carácter siguiente a 'z', el último del alfabeto geohash
+        q |= Q(**{f'{field}__gte': c, f'{field}__lt': c + '{'})
+    return q
+
+
+def within_radius(queryset, lat, lng, radius_km, fields=(), lat_field='latitud', lng_field='longitud'):
+    """
+    Filas de `queryset` (como dicts con `fields`) a menos de `radius_km` de
+    (lat, lng), ordenadas por distancia y con la clave 'distancia_km'.
+    """
+    bbox = bounding_box(lat, lng, radius_km)
+    qs = queryset.filter(cells_q(covering_cells(bbox))).filter(**{
+        f'{lat_field}__gte': bbox[0], f'{lat_field}__lte': bbox[1],
+        f'{lng_field}__gte': bbox[2], f'{lng_field}__lte': bbox[3],
+    })
+    results = []
+    for row in qs.values(*fields, lat_field, lng_field):
+        d = haversine_km(lat, lng, float(row[lat_field]), float(row[lng_field]))
+        if d <= radius_km:
+            row['distancia_km'] = round(d, 3)
+            results.append(row)
+    results.sort(key=lambda r: r['distancia_km'])
+    return results
+
+
+def k_nearest(queryset, lat, lng, k, fields=(), start_km=1.0, max_km=2000.0, **kwargs):
+    """Las `k` filas más cercanas, ampliando el radio (x4) hasta encontrarlas o llegar a `max_km`."""
+    radius = start_km
+    while True:
+        results = within_radius(queryset, lat, lng, radius, fields=fields, **kwargs)
+        if len(results) >= k or radius >= max_km:
+            return results[:k]
+        radius = min(radius * 4, max_km)
+
+
+def haversine_matrix(points_a, points_b):
+    """
+    Distancias (km) entre cada punto de `points_a` y cada uno de `points_b`
+    (listas de (lat, lng) o None) como lista de filas; NaN donde falten
+    coordenadas. Se calcula vectorizado con numpy (dependencia del proyecto).
+    """
+    nan = float('nan')
+    a = [(float(p[0]), float(p[1])) if p else (nan, nan) for p in points_a]
+    b = [(float(p[0]), float(p[1])) if p else (nan, nan) for p in points_b]
+    if not a or not b:
+        return [[] for _ in a]
+    try:
+        import numpy as np
+    except ImportError:  # respaldo si numpy no está instalado
+        return [[haversine_km(la, lo, lb, lob) if la == la and lb == lb else nan for lb, lob in b] for la, lo in a]
+    lat1, lng1 = np.radians(np.array(a)).T
+    lat2, lng2 = np.radians(np.array(b)).T
+    h = (np.sin((lat2[None, :] - lat1[:, None]) / 2) ** 2
+         + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin((lng2[None, :] - lng1[:, None]) / 2) ** 2)
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))).tolist()
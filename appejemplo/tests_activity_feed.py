@@ -0,0 +1,48 @@
+import datetime
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework.test import APIClient
+
+from .activity_feed import ActivityFeed
+from .models import Beneficiarios, Postulaciones, ProyectosHabitacionales
+
+
+class ActivityFeedTests(TestCase):
+    def setUp(self):
+        hoy = datetime.date(2025, 6, 10)
+        self.benef = Beneficiarios.objects.create(rut='1-9', nombre='Ana', apellidos='Rojas', fecha_registro=hoy - datetime.timedelta(days=3))
+        Beneficiarios.objects.create(rut='2-7', nombre='Sin', apellidos='Fecha')
+        self.proyecto = ProyectosHabitacionales.objects.create(nombre_proyecto='Villa Sur', fecha_inicio=hoy - datetime.timedelta(days=1))
+        Postulaciones.objects.create(id_beneficiario=self.benef, id_proyecto=self.proyecto, fecha_postulacion=hoy)
+        Postulaciones.objects.create(id_beneficiario=None, id_proyecto=None, fecha_postulacion=hoy - datetime.timedelta(days=3))
+
+    def test_feed_is_single_query_and_ordered(self):
+        with self.assertNumQueries(1):
+            actividades = ActivityFeed.obtener(limite=10)
+        self.assertEqual([a['tipo'] for a in actividades], ['postulacion', 'proyecto', 'postulacion', 'beneficiario'])
+        self.assertEqual(actividades[0]['descripcion'], 'Nueva postulación de Ana Rojas para Villa Sur')
+        self.assertEqual(actividades[2]['descripcion'], 'Nueva postulación de Beneficiario no especificado para Proyecto no especificado')
+        self.assertEqual(actividades[3]['icon'], 'person-plus')
+
+    def test_keyset_pagination_walks_whole_feed(self):
+        completo = ActivityFeed.obtener(limite=10)
+        vistos = []
+        cursor = None
+        while True:
+            pagina = ActivityFeed.obtener(limite=1, antes_de=cursor)
+            if not pagina:
+                break
+            vistos.extend(pagina)
+            cursor = pagina[-1]['cursor']
+        self.assertEqual([(a['tipo'], a['id']) for a in vistos], [(a['tipo'], a['id']) for a in completo])
+
+    def test_api_returns_next_cursor(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('feeduser', password='x'))
+        r = client.get('/api/actividad/', {'limit': 2})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.data['results']), 2)
+        r2 = client.get('/api/actividad/', {'limit': 2, 'before': r.data['next_cursor']})
+        self.assertEqual([a['tipo'] for a in r2.data['results']], ['postulacion', 'beneficiario'])
+        self.assertEqual(client.get('/api/actividad/', {'before': 'basura'}).status_code, 400)
@@ -0,0 +1,141 @@
+import random
+import threading
+from unittest import mock
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase
+
+from . import address_index
+from .address_index import AddressIndex
+from .models import EmpresasConstructoras, Municipios, ProyectosHabitacionales, Terrenos
+
+
+class AddressIndexTests(SimpleTestCase):
+    def test_prefix_word_start_and_ranking(self):
+        index = AddressIndex()
+        index.update_record(('t', 1), 'Avenida Irarrázaval 3000', 'Ñuñoa', -33.45, -70.6)
+        index.update_record(('t', 2), 'Avenida Grecia 100', 'Ñuñoa')
+        index.update_record(('p', 1), 'Avenida Grecia 100', 'Ñuñoa')
+        index.update_record(('e', 1), 'Los Aromos 45', None)
+        self.assertEqual([e['direccion'] for e in index.suggest('aven')], ['Avenida Grecia 100', 'Avenida Irarrázaval 3000'])
+        hit = index.suggest('IRARRAZ')[0]
+        self.assertEqual((hit['direccion'], hit['municipio'], hit['latitud']), ('Avenida Irarrázaval 3000', 'Ñuñoa', -33.45))
+        self.assertEqual(index.suggest('aromos')[0]['direccion'], 'Los Aromos 45')
+        self.assertEqual(index.suggest('xyz'), [])
+
+    def test_incremental_move_and_remove(self):
+        index = AddressIndex()
+        index.update_record(('t', 1), 'Calle Uno 1', 'Maipú')
+        index.update_record(('t', 1), 'Calle Dos 2', 'Maipú')
+        self.assertEqual([e['direccion'] for e in index.suggest('calle')], ['Calle Dos 2'])
+        index.update_record(('t', 2), 'Calle Dos 2', 'Maipú')
+        index.remove_record(('t', 1))
+        self.assertEqual(index.suggest('calle dos')[0]['peso'], 1)
+        index.remove_record(('t', 2))
+        self.assertEqual(index.suggest('calle'), [])
+        self.assertEqual(index.root.children, {})
+
+    def test_top_k_matches_brute_force(self):
+        rnd = random.Random(4)
+        words = ['alameda', 'avenida', 'los', 'pasaje', 'camino', 'real', 'norte', 'sur', 'aromos', 'pinos']
+        index, expected = AddressIndex(), {}
+        for i in range(3000):
+            addr = ' '.join(rnd.choice(words) for _ in range(3)) + f' {rnd.randint(1, 60)}'
+            index.update_record(('t', i), addr, refresh=False)
+            expected[addr] = expected.get(addr, 0) + 1
+        index.finish()
+        for q in ['a', 'al', 'avenida los', 'pinos', 'camino real norte 1', 'sur sur sur']:
+            matches = [k for k in expected
+                       if any(k[s:].startswith(q) for s in address_index._word_starts(k))]
+            top = sorted(matches, key=lambda k: (-expected[k], k))[:address_index.TOP_K]
+            self.assertEqual([e['clave'] for e in index.suggest(q)], top, q)
+
+    def test_large_index_lookup(self):
+        index = AddressIndex()
+        for i in range(5000):
+            index.update_record(('t', i), f'Calle Número {i} Poniente', refresh=False)
+        index.finish()
+        results = [e['direccion'] for e in index.suggest('calle numero 12')]
+        self.assertEqual(len(results), address_index.TOP_K)
+        self.assertTrue(all(r.startswith('Calle Número 12') for r in results))
+
+
+class AutocompleteEndpointTests(TestCase):
+    url = '/api/direcciones/autocompletar/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='autocompletar')
+        municipio = Municipios.objects.create(nombre_municipio='Ñuñoa')
+        cls.terreno = Terrenos.objects.create(direccion='Avenida Irarrázaval 3000', id_municipio=municipio,
+                                              latitud=Decimal('-33.454'), longitud=Decimal('-70.601'))
+        EmpresasConstructoras.objects.create(razon_social='E', direccion='Avenida Matta 50')
+        ProyectosHabitacionales.objects.create(nombre_proyecto='P', id_terreno=cls.terreno, id_municipio=municipio)
+
+    def setUp(self):
+        address_index.reset_index()
+        self.addCleanup(address_index.reset_index)
+        self.client.force_login(self.user)
+
+    def get(self, q):
+        r = self.client.get(self.url, {'q': q})
+        self.assertEqual(r.status_code, 200)
+        return r.json()['results']
+
+    def test_suggestions_and_incremental_updates(self):
+        results = self.get('avenida')
+        self.assertEqual([r['direccion'] for r in results], ['Avenida Irarrázaval 3000', 'Avenida Matta 50'])
+        self.assertEqual(results[0]['municipio'], 'Ñuñoa')
+        self.assertEqual(results[0]['latitud'], -33.454)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Terrenos.objects.create(direccion='Avenida Ossa 10')
+        self.assertIn('Avenida Ossa 10', [r['direccion'] for r in self.get('ossa')])
+        self.terreno.direccion = 'Pasaje Sin Salida 1'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.terreno.save()
+        # el proyecto del terreno también pasa a la dirección nueva
+        self.assertEqual([r['direccion'] for r in self.get('pasaje')], ['Pasaje Sin Salida 1'])
+        self.assertEqual(address_index.get_index().suggest('pasaje')[0]['peso'], 2)
+        self.assertEqual(self.get('irarr'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            EmpresasConstructoras.objects.all().delete()
+        self.assertEqual(self.get('matta'), [])
+
+    def test_rolled_back_changes_are_not_suggested(self):
+        self.get('avenida')
+        with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Terrenos.objects.create(direccion='Avenida Fantasma 1')
+                raise RuntimeError
+        self.assertEqual(self.get('fantasma'), [])
+
+    def test_expired_index_is_rebuilt_in_background(self):
+        old = address_index.get_index()
+        new = AddressIndex().finish()
+        release = threading.Event()
+
+        def slow_build():
+            release.wait(5)
+            return new
+
+        with mock.patch.object(address_index, 'ADDRESS_INDEX_TTL', -1), \
+                mock.patch.object(address_index, 'build_index', slow_build):
+            self.assertIs(address_index.get_index(), old)
+            thread = address_index._rebuild_thread
+            self.assertIsNotNone(thread)
+            # cambios llegados durante la reconstrucción se reaplican al índice nuevo
+            with self.captureOnCommitCallbacks(execute=True):
+                EmpresasConstructoras.objects.create(razon_social='F', direccion='Camino Nuevo 5')
+            self.assertEqual(self.get('camino')[0]['direccion'], 'Camino Nuevo 5')
+            release.set()
+            thread.join(5)
+        self.assertIs(address_index.get_index(), new)
+        self.assertEqual(self.get('camino')[0]['direccion'], 'Camino Nuevo 5')
+
+    def test_short_query_and_login(self):
+        self.assertEqual(self.get('a'), [])
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url, {'q': 'avenida'}).status_code, 302)
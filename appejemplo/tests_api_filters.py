@@ -0,0 +1,85 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import Beneficiarios, LogAuditoria, Municipios, Postulaciones, ProyectosHabitacionales, Regiones
+
+
+class FieldFilterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        norte = Regiones.objects.create(nombre_region='Norte')
+        sur = Regiones.objects.create(nombre_region='Sur')
+        cls.proyecto_n = ProyectosHabitacionales.objects.create(
+            nombre_proyecto='N', id_municipio=Municipios.objects.create(nombre_municipio='Arica', id_region=norte))
+        cls.proyecto_s = ProyectosHabitacionales.objects.create(
+            nombre_proyecto='S', id_municipio=Municipios.objects.create(nombre_municipio='Osorno', id_region=sur))
+        cls.norte = norte
+        beneficiario = Beneficiarios.objects.create(rut='1-9', nombre='Ana')
+        estados = ['Pendiente', 'Aprobada', 'Rechazada']
+        for i in range(30):
+            Postulaciones.objects.create(
+                id_beneficiario=beneficiario, id_proyecto=cls.proyecto_n if i % 2 else cls.proyecto_s,
+                estado_postulacion=estados[i % 3], fecha_postulacion=datetime.date(2026, 1, 1) + datetime.timedelta(days=i))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def ids(self, url, **params):
+        response = self.client.get(url, dict(params, page_size=100))
+        self.assertEqual(response.status_code, 200, response.content)
+        return {r['id_postulacion'] for r in response.json()['results']}
+
+    def expected(self, **filters):
+        return set(Postulaciones.objects.filter(**filters).values_list('pk', flat=True))
+
+    def test_exact_in_and_range(self):
+        url = '/api/postulaciones/'
+        self.assertEqual(
+            self.ids(url, proyecto=self.proyecto_n.pk, estado='Aprobada',
+                     fecha_postulacion_desde='2026-01-05', fecha_postulacion_hasta='2026-01-20'),
+            self.expected(id_proyecto=self.proyecto_n, estado_postulacion='Aprobada',
+                          fecha_postulacion__range=('2026-01-05', '2026-01-20')))
+        self.assertEqual(self.ids(url, estado='Aprobada,Rechazada'),
+                         self.expected(estado_postulacion__in=['Aprobada', 'Rechazada']))
+        self.assertEqual(self.ids(url, region=self.norte.pk), self.expected(id_proyecto=self.proyecto_n))
+        self.assertEqual(len(self.ids(url)), 30)
+
+    def test_invalid_values(self):
+        self.assertEqual(self.client.get('/api/postulaciones/', {'proyecto': 'abc'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/postulaciones/', {'fecha_postulacion_desde': '2026-13-01'}).status_code, 400)
+
+    def test_datetime_upper_bound_includes_day(self):
+        today = timezone.localdate()
+        LogAuditoria.objects.create(accion='crear', tabla='proyectos')
+        LogAuditoria.objects.create(accion='crear', tabla='terrenos')
+        data = self.client.get('/api/log-auditoria/', {'tabla': 'proyectos', 'timestamp_hasta': today.isoformat()}).json()
+        self.assertEqual([r['tabla'] for r in data['results']], ['proyectos'])
+        data = self.client.get('/api/log-auditoria/', {'timestamp_desde': (today + datetime.timedelta(days=1)).isoformat()}).json()
+        self.assertEqual(data['results'], [])
+
+    def test_query_plan_uses_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('EXPLAIN QUERY PLAN es propio de SQLite')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get('/api/postulaciones/', {
+                'proyecto': self.proyecto_n.pk, 'estado': 'Aprobada',
+                'fecha_postulacion_desde': '2026-01-05', 'fecha_postulacion_hasta': '2026-01-20'})
+        sql = [q['sql'] for q in ctx.captured_queries if 'FROM "postulaciones"' in q['sql']][-1]
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('postulacion_proy_estado_idx', plan)
+        self.assertNotIn('SCAN postulaciones', plan.replace('"', ''))
+
+    def test_beneficiarios_keep_page_number_pagination(self):
+        for i in range(3):
+            Beneficiarios.objects.create(rut=f'{i + 2}-K', nombre=f'B{i}')
+        data = self.client.get('/api/beneficiarios/', {'page_size': 2, 'page': 2}).json()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNone(data['next'])
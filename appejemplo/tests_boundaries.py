@@ -0,0 +1,110 @@
+import json
+import math
+import os
+import random
+import tempfile
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from . import boundaries
+from .boundaries import BandedPolygon, BoundaryIndex, STRTree
+from .models import EmpresasConstructoras, Municipios, ProyectosHabitacionales, Regiones, Terrenos
+
+
+def square(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+
+def circle(cx, cy, r, n=2000):
+    return [[cx + r * math.cos(2 * math.pi * i / n), cy + r * math.sin(2 * math.pi * i / n)] for i in range(n)]
+
+
+class GeometryTests(SimpleTestCase):
+    def test_str_tree_matches_linear_scan(self):
+        rnd = random.Random(1)
+        boxes = []
+        for i in range(500):
+            x, y = rnd.uniform(-75, -66), rnd.uniform(-55, -17)
+            boxes.append(((x, y, x + rnd.uniform(0, 1), y + rnd.uniform(0, 1)), i))
+        tree = STRTree(boxes)
+        for _ in range(200):
+            x, y = rnd.uniform(-75, -66), rnd.uniform(-55, -17)
+            expected = {v for (a, b, c, d), v in boxes if a <= x <= c and b <= y <= d}
+            self.assertEqual(set(tree.query_point(x, y)), expected)
+        self.assertEqual(STRTree([]).query_point(0, 0), [])
+
+    def test_polygon_with_hole_and_many_vertices(self):
+        donut = BandedPolygon([circle(0, 0, 10), circle(0, 0, 3)])
+        self.assertGreater(donut.n_bands, 100)
+        self.assertTrue(donut.contains(5, 5))
+        self.assertFalse(donut.contains(1, 1))
+        self.assertFalse(donut.contains(9, 9))
+        rnd = random.Random(2)
+        for _ in range(500):
+            x, y = rnd.uniform(-11, 11), rnd.uniform(-11, 11)
+            d = math.hypot(x, y)
+            if abs(d - 10) > 0.01 and abs(d - 3) > 0.01:
+                self.assertEqual(donut.contains(x, y), 3 < d < 10, (x, y))
+
+
+class AssignMunicipiosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        region = Regiones.objects.create(nombre_region='Norte')
+        cls.a = Municipios.objects.create(nombre_municipio='Comuna Á', codigo_municipio='01101', id_region=region)
+        cls.b = Municipios.objects.create(nombre_municipio='Comuna B', id_region=region)
+        cls.geojson = {'type': 'FeatureCollection', 'features': [
+            {'type': 'Feature', 'properties': {'cut': '1101'},
+             'geometry': {'type': 'Polygon', 'coordinates': [square(-71, -34, -70, -33)]}},
+            {'type': 'Feature', 'properties': {'nombre': 'comuna b'},
+             'geometry': {'type': 'MultiPolygon', 'coordinates': [[square(-70, -34, -69, -33)],
+                                                                   [square(-73, -30, -72, -29)]]}},
+            {'type': 'Feature', 'properties': {'nombre': 'Desconocida'},
+             'geometry': {'type': 'Polygon', 'coordinates': [square(0, 0, 1, 1)]}},
+        ]}
+        # dentro de A pero con B / dentro de B sin municipio / fuera de todo / correcto
+        cls.p1 = ProyectosHabitacionales.objects.create(nombre_proyecto='1', latitud=-33.5, longitud=-70.5, id_municipio=cls.b)
+        cls.p2 = ProyectosHabitacionales.objects.create(nombre_proyecto='2', latitud=-29.5, longitud=-72.5)
+        cls.p3 = ProyectosHabitacionales.objects.create(nombre_proyecto='3', latitud=-20.0, longitud=-70.0, id_municipio=cls.a)
+        cls.p4 = ProyectosHabitacionales.objects.create(nombre_proyecto='4', latitud=-33.5, longitud=-69.5, id_municipio=cls.b)
+        Terrenos.objects.create(direccion='T', latitud=Decimal('-33.2'), longitud=Decimal('-70.2'))
+        EmpresasConstructoras.objects.create(razon_social='E', latitud=Decimal('-33.2'), longitud=Decimal('-69.2'))
+
+    def test_index_locates_points_and_reports_unmatched_features(self):
+        index = BoundaryIndex.from_geojson(self.geojson)
+        region = self.a.id_region_id
+        self.assertEqual(index.locate(-33.5, -70.5), (self.a.pk, region))
+        self.assertEqual(index.locate(-29.5, -72.5), (self.b.pk, region))
+        self.assertIsNone(index.locate(-20, -70))
+        self.assertEqual(index.unmatched, ['Desconocida'])
+
+    def test_validate_then_fix(self):
+        index = BoundaryIndex.from_geojson(self.geojson)
+        stats = boundaries.assign_municipios(index)
+        self.assertEqual(stats['ProyectosHabitacionales'],
+                         {'total': 4, 'outside': 1, 'ok': 1, 'missing': 1, 'mismatch': 1, 'updated': 0})
+        self.assertEqual(stats['EmpresasConstructoras'], {'total': 1, 'outside': 0, 'located': 1})
+        self.p1.refresh_from_db()
+        self.assertEqual(self.p1.id_municipio_id, self.b.pk)
+
+        stats = boundaries.assign_municipios(index, fix=True, only_missing=True)
+        self.assertEqual(stats['ProyectosHabitacionales']['updated'], 1)
+        stats = boundaries.assign_municipios(index, fix=True)
+        self.assertEqual(stats['ProyectosHabitacionales']['updated'], 1)
+        self.assertEqual(stats['Terrenos']['updated'], 0)
+        self.assertEqual(
+            dict(ProyectosHabitacionales.objects.values_list('nombre_proyecto', 'id_municipio')),
+            {'1': self.a.pk, '2': self.b.pk, '3': self.a.pk, '4': self.b.pk})
+
+    def test_command(self):
+        fd, path = tempfile.mkstemp(suffix='.geojson')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.geojson, f)
+        out = StringIO()
+        call_command('assign_municipios', file=path, fix=True, stdout=out)
+        self.assertIn('ProyectosHabitacionales: total=4', out.getvalue())
+        self.assertIn('Terrenos: total=1, outside=0, ok=0, missing=1, mismatch=0, updated=1', out.getvalue())
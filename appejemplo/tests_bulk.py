@@ -0,0 +1,110 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import Beneficiarios, Municipios, Postulaciones, ProyectosHabitacionales
+
+
+class BulkWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='carga')
+        cls.municipio = Municipios.objects.create(nombre_municipio='Maipú')
+        cls.proyecto = ProyectosHabitacionales.objects.create(nombre_proyecto='Villa Norte')
+        cls.existente = Beneficiarios.objects.create(rut='1-9', nombre='Ana')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def beneficiarios(self, n, start=100):
+        return [{'rut': f'{start + i}-K', 'nombre': f'Persona {i}', 'id_municipio': self.municipio.pk}
+                for i in range(n)]
+
+    def test_bulk_create_uses_batched_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post('/api/beneficiarios/', self.beneficiarios(300), format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        data = response.json()
+        self.assertEqual((data['total'], data['correctos'], data['fallidos']), (300, 300, 0))
+        created = Beneficiarios.objects.filter(rut='105-K').get()
+        self.assertEqual(data['resultados'][5], {'id': created.pk, 'indice': 5, 'estado': 201})
+        self.assertEqual(created.id_municipio_id, self.municipio.pk)
+        self.assertLess(len(ctx.captured_queries), 10)
+
+    def test_bulk_costs_far_fewer_queries_than_individual_calls(self):
+        with CaptureQueriesContext(connection) as single:
+            self.client.post('/api/beneficiarios/', self.beneficiarios(1)[0], format='json')
+        with CaptureQueriesContext(connection) as bulk:
+            response = self.client.post('/api/beneficiarios/', self.beneficiarios(400, 1000), format='json')
+        self.assertEqual(response.status_code, 201)
+        # 400 altas individuales costarían 400 veces las consultas de una; el lote, unos pocos INSERT por bloque
+        self.assertGreater(len(single.captured_queries), 1)
+        self.assertLess(len(bulk.captured_queries), 20)
+
+    def test_database_errors_are_not_exposed(self):
+        with mock.patch('appejemplo.models.Beneficiarios.objects.bulk_create',
+                        side_effect=DatabaseError('UNIQUE constraint failed: beneficiarios.rut')), \
+                self.assertLogs('appejemplo.bulk', 'ERROR'):
+            response = self.client.post('/api/beneficiarios/', self.beneficiarios(2), format='json')
+        self.assertEqual(response.status_code, 400)
+        errores = response.json()['resultados'][0]['errores']
+        self.assertEqual(errores, {'non_field_errors': ['No se pudo guardar el elemento.']})
+
+    def test_atomic_rejects_whole_batch(self):
+        items = self.beneficiarios(3)
+        items[1]['rut'] = '1-9'                 # ya existe
+        items[2]['id_municipio'] = 999999       # no existe
+        items.append(dict(items[0]))            # repetido en el lote
+        response = self.client.post('/api/beneficiarios/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        estados = [r['estado'] for r in response.json()['resultados']]
+        self.assertEqual(estados, [424, 400, 400, 400])
+        self.assertEqual(Beneficiarios.objects.count(), 1)
+
+    def test_partial_commits_valid_items(self):
+        items = self.beneficiarios(3)
+        items[1]['rut'] = '1-9'
+        response = self.client.post('/api/beneficiarios/?atomico=0', items, format='json')
+        self.assertEqual(response.status_code, 207)
+        data = response.json()
+        self.assertEqual((data['correctos'], data['fallidos']), (2, 1))
+        self.assertIn('rut', data['resultados'][1]['errores'])
+        self.assertEqual(Beneficiarios.objects.count(), 3)
+
+    def test_bulk_patch(self):
+        postulaciones = [Postulaciones.objects.create(id_beneficiario=self.existente, id_proyecto=self.proyecto,
+                                                      estado_postulacion='Pendiente') for _ in range(3)]
+        items = [
+            {'id_postulacion': postulaciones[0].pk, 'estado_postulacion': 'Aprobada', 'fecha_asignacion': '2026-03-01'},
+            {'id_postulacion': postulaciones[1].pk, 'estado_postulacion': 'Inventado'},
+            {'estado_postulacion': 'Aprobada'},
+            {'id_postulacion': 999999, 'estado_postulacion': 'Aprobada'},
+            {'id_postulacion': postulaciones[2].pk, 'puntaje_asignado': 7},
+        ]
+        response = self.client.patch('/api/postulaciones/', items, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Postulaciones.objects.filter(estado_postulacion='Aprobada').exists())
+
+        response = self.client.patch('/api/postulaciones/?atomico=0', items, format='json')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['estado'] for r in response.json()['resultados']], [200, 400, 400, 400, 200])
+        for p in postulaciones:
+            p.refresh_from_db()
+        self.assertEqual((p.estado_postulacion, p.puntaje_asignado), ('Pendiente', 7))
+        self.assertEqual(postulaciones[0].estado_postulacion, 'Aprobada')
+        self.assertEqual(postulaciones[0].fecha_asignacion, datetime.date(2026, 3, 1))
+        self.assertEqual(postulaciones[1].estado_postulacion, 'Pendiente')
+
+    def test_single_object_and_login_required(self):
+        response = self.client.post('/api/beneficiarios/', {'rut': '2-7', 'nombre': 'Luis'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['rut'], '2-7')
+        self.assertEqual(self.client.patch('/api/postulaciones/', {'a': 1}, format='json').status_code, 400)
+        anonimo = APIClient()
+        self.assertEqual(anonimo.post('/api/beneficiarios/', self.beneficiarios(2), format='json').status_code, 401)
@@ -0,0 +1,55 @@
+import datetime
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+
+from . import calendar_stats
+from .models import Evento
+
+
+class CalendarStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('statsuser', password='testpass')
+        self.other = User.objects.create(username='otro')
+        d = datetime.date
+        self.today = d(2025, 6, 15)
+        Evento.objects.create(titulo='Hoy', fecha_inicio=d(2025, 6, 15), tipo='task')
+        Evento.objects.create(titulo='Futuro', fecha_inicio=d(2025, 6, 20), tipo='meeting')
+        Evento.objects.create(titulo='Vencido', fecha_inicio=d(2025, 6, 1), fecha_fin=d(2025, 6, 10), tipo='task')
+        Evento.objects.create(titulo='Mismo dia', fecha_inicio=d(2025, 6, 20), tipo='task')
+        ev = Evento.objects.create(titulo='Semanal', fecha_inicio=d(2025, 6, 2), tipo='meeting',
+                                   recurrencia_freq='weekly', recurrencia_count=3)
+        ev.asignados.add(self.user, self.other)
+        Evento.objects.get(titulo='Hoy').asignados.add(self.user)
+
+    def test_header_counters_in_one_query(self):
+        with self.assertNumQueries(1):
+            counters = calendar_stats.header_counters(self.today)
+        self.assertEqual(counters, {'total_events': 5, 'upcoming_events': 3, 'overdue_events': 1, 'today_events': 1})
+
+    def test_breakdowns(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(calendar_stats.by_type(), {'task': 3, 'meeting': 2})
+        with self.assertNumQueries(1):
+            rows = calendar_stats.by_assignee()
+        self.assertEqual(rows[0], {'user_id': self.user.id, 'username': 'statsuser', 'total': 2})
+        self.assertEqual(calendar_stats.by_type(datetime.date(2025, 6, 18), datetime.date(2025, 7, 1)),
+                         {'task': 1, 'meeting': 1})
+
+    def test_heatmap_groups_by_day_and_expands_series(self):
+        with self.assertNumQueries(2):
+            days = calendar_stats.heatmap(datetime.date(2025, 6, 1), datetime.date(2025, 7, 1))
+        self.assertEqual(days, {'2025-06-01': 1, '2025-06-02': 1, '2025-06-09': 1, '2025-06-15': 1,
+                                '2025-06-16': 1, '2025-06-20': 2})
+
+    def test_endpoints(self):
+        client = Client()
+        client.login(username='statsuser', password='testpass')
+        res = client.get('/api/events/heatmap/', {'start': '2025-06-10', 'end': '2025-06-21'})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['days'], {'2025-06-15': 1, '2025-06-16': 1, '2025-06-20': 2})
+        self.assertEqual(client.get('/api/events/heatmap/', {'start': 'x', 'end': 'y'}).status_code, 400)
+        res = client.get('/api/events/stats/')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()['by_type'], {'task': 3, 'meeting': 2})
+        self.assertEqual(res.json()['counters']['total_events'], 5)
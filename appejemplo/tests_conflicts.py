@@ -0,0 +1,121 @@
+import datetime
+import json
+import random
+
+from django.test import TestCase, SimpleTestCase, Client
+from django.contrib.auth.models import User
+
+from .conflicts import IntervalTree, candidate_from_payload, conflicts_for_event
+from .models import Evento
+
+
+class IntervalTreeTests(SimpleTestCase):
+    def test_matches_brute_force(self):
+        rnd = random.Random(7)
+        items = []
+        for i in range(300):
+            a = rnd.randint(0, 1000)
+            items.append((a, a + rnd.randint(1, 50), i))
+        tree = IntervalTree(items)
+        for _ in range(200):
+            s = rnd.randint(0, 1000)
+            e = s + rnd.randint(1, 30)
+            expected = sorted(it for it in items if it[0] < e and it[1] > s)
+            self.assertEqual(sorted(tree.overlapping(s, e)), expected)
+
+    def test_add_matches_brute_force(self):
+        rnd = random.Random(11)
+        tree, items = IntervalTree(), []
+        for i in range(400):
+            a = rnd.randint(0, 1000)
+            items.append((a, a + rnd.randint(1, 50), i))
+            tree.add(*items[-1])
+            if i % 37 == 0:
+                s = rnd.randint(0, 1000)
+                self.assertEqual(sorted(tree.overlapping(s, s + 20)),
+                                 sorted(it for it in items if it[0] < s + 20 and it[1] > s))
+        self.assertEqual(len(tree), 400)
+
+    def test_half_open_and_empty(self):
+        self.assertEqual(IntervalTree([]).overlapping(0, 10), [])
+        tree = IntervalTree([(0, 5, 'a'), (5, 10, 'b')])
+        self.assertEqual([x[2] for x in tree.overlapping(5, 6)], ['b'])
+
+
+class ConflictDetectionTests(TestCase):
+    def setUp(self):
+        d, t = datetime.date, datetime.time
+        self.admin = User.objects.create_user('confadmin', password='testpass', is_staff=True)
+        self.ana = User.objects.create(username='ana')
+        self.beto = User.objects.create(username='beto')
+        self.reunion = Evento.objects.create(titulo='Reunión', fecha_inicio=d(2025, 6, 10),
+                                             hora_inicio=t(9), hora_fin=t(10, 30))
+        self.reunion.asignados.add(self.ana)
+        self.semanal = Evento.objects.create(titulo='Semanal', fecha_inicio=d(2025, 6, 2), hora_inicio=t(15),
+                                             hora_fin=t(16), recurrencia_freq='weekly')
+        self.semanal.asignados.add(self.beto)
+        self.feriado = Evento.objects.create(titulo='Terreno', fecha_inicio=d(2025, 6, 20), fecha_fin=d(2025, 6, 21))
+        self.feriado.asignados.add(self.beto)
+        self.client = Client()
+        self.client.login(username='confadmin', password='testpass')
+
+    def candidate(self, **payload):
+        return candidate_from_payload(payload)
+
+    def test_time_overlap_and_adjacency(self):
+        ev = self.candidate(start='2025-06-10', time='10:00', end_time='11:00')
+        with self.assertNumQueries(1):
+            conflicts = conflicts_for_event(ev, [self.ana.id, self.beto.id])
+        self.assertEqual([(c['user_id'], c['event_id']) for c in conflicts], [(self.ana.id, self.reunion.pk)])
+        ev = self.candidate(start='2025-06-10', time='10:30', end_time='11:00')
+        self.assertEqual(conflicts_for_event(ev, [self.ana.id]), [])
+
+    def test_recurring_and_multi_day(self):
+        ev = self.candidate(start='2025-06-23', time='15:30')
+        conflicts = conflicts_for_event(ev, [self.beto.id])
+        self.assertEqual([c['start'] for c in conflicts], ['2025-06-23T15:00:00'])
+        ev = self.candidate(start='2025-06-21', time='08:00')
+        self.assertEqual([c['event_id'] for c in conflicts_for_event(ev, [self.beto.id])], [self.feriado.pk])
+        serie = self.candidate(start='2025-06-01', time='09:30', recurrence={'freq': 'daily', 'count': 15})
+        self.assertEqual([c['event_id'] for c in conflicts_for_event(serie, [self.ana.id])], [self.reunion.pk])
+
+    def test_preflight_endpoint(self):
+        res = self.client.post('/api/events/conflicts/', json.dumps(
+            {'start': '2025-06-10', 'time': '09:30', 'assigned_to': [self.ana.id, self.beto.id]}),
+            content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(res.json()['ok'])
+        self.assertEqual(res.json()['conflicts'][0]['title'], 'Reunión')
+        res = self.client.get('/api/events/conflicts/', {'start': '2025-06-10', 'time': '09:30',
+                                                          'assigned_to': self.ana.id, 'exclude': self.reunion.pk})
+        self.assertTrue(res.json()['ok'])
+        self.assertEqual(self.client.get('/api/events/conflicts/', {'start': '2025-06-10'}).status_code, 400)
+
+    def test_create_with_check_conflicts(self):
+        payload = {'title': 'Choque', 'start': '2025-06-10', 'time': '09:00', 'assigned_to': [self.ana.id]}
+        res = self.client.post('/api/events/', json.dumps(dict(payload, check_conflicts=True)),
+                               content_type='application/json')
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.json()['conflicts'][0]['event_id'], self.reunion.pk)
+        self.assertFalse(Evento.objects.filter(titulo='Choque').exists())
+        res = self.client.post('/api/events/', json.dumps(payload), content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        res = self.client.post('/api/events/', json.dumps([dict(payload, title='Otro', check_conflicts='1')]),
+                               content_type='application/json')
+        self.assertEqual(res.json()['errors'][0]['status'], 409)
+
+    def test_batch_items_conflict_with_each_other(self):
+        items = [
+            {'title': 'Primera', 'start': '2025-06-12', 'time': '09:00', 'end_time': '10:00', 'assigned_to': [self.ana.id]},
+            {'title': 'Segunda', 'start': '2025-06-12', 'time': '09:30', 'assigned_to': [self.ana.id, self.beto.id],
+             'check_conflicts': True},
+            {'title': 'Tercera', 'start': '2025-06-12', 'time': '10:00', 'assigned_to': [self.ana.id],
+             'check_conflicts': True},
+        ]
+        res = self.client.post('/api/events/', json.dumps(items), content_type='application/json')
+        self.assertEqual(res.status_code, 400)
+        errors = res.json()['errors']
+        self.assertEqual([(e['index'], e['status']) for e in errors], [(1, 409)])
+        conflict = errors[0]['details'][0]
+        self.assertEqual((conflict['user_id'], conflict['batch_index'], conflict['title']), (self.ana.id, 0, 'Primera'))
+        self.assertFalse(Evento.objects.filter(titulo='Primera').exists())
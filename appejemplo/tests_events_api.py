@@ -0,0 +1,213 @@
+import datetime
+import json
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+
+from . import events
+from .events import events_in_range, serialize_events
+from .models import Evento, ProyectosHabitacionales
+
+
+class EventsWindowTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('calendaruser', password='testpass')
+        self.other = User.objects.create_user('otheruser', password='testpass')
+        self.proj = ProyectosHabitacionales.objects.create(nombre_proyecto='Proyecto Ventana')
+        d = datetime.date
+        self.antes = Evento.objects.create(titulo='Antes', fecha_inicio=d(2025, 5, 20), fecha_fin=d(2025, 5, 31))
+        self.cruza = Evento.objects.create(titulo='Cruza', fecha_inicio=d(2025, 5, 28), fecha_fin=d(2025, 6, 2), tipo='task')
+        self.dentro = Evento.objects.create(titulo='Dentro', fecha_inicio=d(2025, 6, 15), tipo='meeting', proyecto=self.proj)
+        self.despues = Evento.objects.create(titulo='Despues', fecha_inicio=d(2025, 7, 1))
+        self.dentro.asignados.add(self.other)
+        self.client = Client()
+        self.client.login(username='calendaruser', password='testpass')
+
+    def get_titles(self, **params):
+        res = self.client.get('/api/events/', params)
+        self.assertEqual(res.status_code, 200, res.content)
+        return [e['title'] for e in res.json()['events']]
+
+    def test_only_overlapping_events_are_returned(self):
+        self.assertEqual(self.get_titles(start='2025-06-01', end='2025-07-01'), ['Cruza', 'Dentro'])
+
+    def test_accepts_fullcalendar_datetimes(self):
+        self.assertEqual(self.get_titles(start='2025-06-01T00:00:00-04:00', end='2025-07-01T00:00:00-04:00'), ['Cruza', 'Dentro'])
+
+    def test_optional_filters(self):
+        self.assertEqual(self.get_titles(start='2025-05-01', end='2025-08-01', type='meeting'), ['Dentro'])
+        self.assertEqual(self.get_titles(start='2025-05-01', end='2025-08-01', project=self.proj.pk), ['Dentro'])
+        self.assertEqual(self.get_titles(start='2025-05-01', end='2025-08-01', assigned_to=self.other.pk), ['Dentro'])
+
+    def test_invalid_window_is_rejected(self):
+        for params in ({'start': '2025-06-01'}, {'start': 'x', 'end': 'y'}, {'start': '2025-06-02', 'end': '2025-06-01'},
+                       {'start': '2020-01-01', 'end': '2025-01-01'}, {'start': '2025-06-01', 'end': '2025-07-01', 'project': 'abc'}):
+            self.assertEqual(self.client.get('/api/events/', params).status_code, 400, params)
+
+    def test_post_still_creates_event(self):
+        res = self.client.post('/api/events/', json.dumps({'title': 'Nuevo', 'start': '2025-06-10'}), content_type='application/json')
+        self.assertEqual(res.status_code, 200)
+        self.assertIn('Nuevo', self.get_titles(start='2025-06-01', end='2025-07-01'))
+
+
+class EventSerializationQueryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('serialuser', password='testpass')
+        self.projects = [ProyectosHabitacionales.objects.create(nombre_proyecto=f'P{i}') for i in range(5)]
+        for i in range(30):
+            ev = Evento.objects.create(titulo=f'E{i}', fecha_inicio=datetime.date(2025, 6, 1 + i % 28),
+                                       proyecto=self.projects[i % 5], hora_inicio=datetime.time(9, 30))
+            if i % 2:
+                ev.asignados.add(self.user)
+        self.window = (datetime.date(2025, 6, 1), datetime.date(2025, 7, 1))
+
+    def test_constant_queries_without_fk_loads(self):
+        with self.assertNumQueries(1):
+            events = serialize_events(events_in_range(*self.window))
+        self.assertEqual(len(events), 30)
+        self.assertEqual(events[0]['time'], '09:30')
+        self.assertIn(events[0]['project_id'], [p.pk for p in self.projects])
+        self.assertNotIn('assigned_to', events[0])
+
+    def test_assignees_in_one_extra_query(self):
+        with self.assertNumQueries(2):
+            events = serialize_events(events_in_range(*self.window), include_assignees=True)
+        by_title = {e['title']: e for e in events}
+        self.assertEqual(by_title['E1']['assigned_to'], [self.user.id])
+        self.assertEqual(by_title['E2']['assigned_to'], [])
+
+    def test_api_includes_assignees_on_request(self):
+        client = Client()
+        client.login(username='serialuser', password='testpass')
+        res = client.get('/api/events/', {'start': '2025-06-01', 'end': '2025-07-01', 'include_assignees': '1'})
+        by_title = {e['title']: e for e in res.json()['events']}
+        self.assertEqual(by_title['E1']['assigned_to'], [self.user.id])
+
+
+class EventCreationBulkTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('bulkadmin', password='testpass', is_staff=True)
+        self.jefes = []
+        for i in range(50):
+            u = User.objects.create(username=f'jefe{i}')
+            u.userprofile.tipo_usuario = 'jefe_proyecto'
+            u.userprofile.save()
+            self.jefes.append(u)
+        self.proj = ProyectosHabitacionales.objects.create(nombre_proyecto='Masivo')
+        self.client = Client()
+        self.client.login(username='bulkadmin', password='testpass')
+
+    def post(self, payload):
+        return self.client.post('/api/events/', json.dumps(payload), content_type='application/json')
+
+    def test_many_assignees_cost_constant_queries(self):
+        payload = {'title': 'Tarea grande', 'start': '2025-06-01', 'type': 'task', 'project': self.proj.pk,
+                   'assigned_to': [u.id for u in self.jefes]}
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.post(payload)
+        self.assertEqual(res.status_code, 200, res.content)
+        self.assertLess(len(ctx.captured_queries), 20)
+        self.assertEqual(Evento.objects.get(pk=res.json()['id']).asignados.count(), 50)
+
+    def test_bulk_create_inserts_all_in_one_transaction(self):
+        items = [{'title': f'T{i}', 'start': f'2025-06-{i + 1:02d}', 'type': 'task', 'project': self.proj.pk,
+                  'assigned_to': [u.id for u in self.jefes[i:i + 5]]} for i in range(20)]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.post(items)
+        self.assertEqual(res.status_code, 201, res.content)
+        self.assertLess(len(ctx.captured_queries), 20)
+        ids = res.json()['ids']
+        self.assertEqual(len(ids), 20)
+        self.assertEqual(Evento.asignados.through.objects.filter(evento_id__in=ids).count(), 100)
+        self.assertEqual(sorted(Evento.objects.get(pk=ids[3]).asignados.values_list('id', flat=True)),
+                         [u.id for u in self.jefes[3:8]])
+
+    def test_bulk_create_reports_per_item_errors_and_saves_nothing(self):
+        items = [{'title': 'Ok', 'start': '2025-06-01'},
+                 {'start': '2025-06-02'},
+                 {'title': 'Proyecto malo', 'start': '2025-06-03', 'project': 999999},
+                 'no-objeto']
+        res = self.post(items)
+        self.assertEqual(res.status_code, 400)
+        errors = res.json()['errors']
+        self.assertEqual([e['index'] for e in errors], [1, 2, 3])
+        self.assertEqual(errors[0]['error'], 'title is required')
+        self.assertEqual(errors[1]['error'], 'proyecto no encontrado')
+        self.assertEqual(Evento.objects.count(), 0)
+
+
+class EventSyncTokenTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('syncuser', password='testpass')
+        d = datetime.date
+        self.a = Evento.objects.create(titulo='A', fecha_inicio=d(2025, 6, 5))
+        self.b = Evento.objects.create(titulo='B', fecha_inicio=d(2025, 6, 6))
+        self.c = Evento.objects.create(titulo='C', fecha_inicio=d(2025, 6, 7))
+        self.client = Client()
+        self.client.login(username='syncuser', password='testpass')
+        self.window = {'start': '2025-06-01', 'end': '2025-07-01'}
+        # sin margen de relectura, salvo en test_late_commit_is_not_missed
+        patcher = mock.patch.object(events, 'SYNC_OVERLAP', datetime.timedelta(0))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, **params):
+        res = self.client.get('/api/events/', dict(self.window, **params))
+        self.assertEqual(res.status_code, 200, res.content)
+        return res.json()
+
+    def test_delta_returns_only_changes(self):
+        lejano = Evento.objects.create(titulo='Lejano', fecha_inicio=datetime.date(2025, 10, 1))
+        token = self.get()['sync_token']
+        delta = self.get(since=token)
+        self.assertEqual((delta['events'], delta['deleted']), ([], []))
+
+        self.a.titulo = 'A editado'
+        self.a.save()
+        Evento.objects.create(titulo='D', fecha_inicio=datetime.date(2025, 6, 8))
+        b_id = self.b.pk
+        self.b.delete()
+        self.c.fecha_inicio = datetime.date(2025, 8, 1)
+        self.c.save()
+        # cambios fuera de la ventana no se informan
+        lejano.fecha_inicio = datetime.date(2025, 11, 1)
+        lejano.save()
+
+        delta = self.get(since=token)
+        self.assertTrue(delta['delta'])
+        self.assertEqual([e['title'] for e in delta['events']], ['A editado', 'D'])
+        self.assertEqual(delta['deleted'], sorted([b_id, self.c.pk]))
+        self.assertEqual(self.get(since=delta['sync_token'])['events'], [])
+
+    def test_late_commit_is_not_missed(self):
+        token = self.get()['sync_token']
+        # escritura con fecha_modificacion anterior al token, confirmada después de emitirlo
+        since = events.parse_sync_token(token)
+        Evento.objects.filter(pk=self.a.pk).update(titulo='Tardío', fecha_modificacion=since - datetime.timedelta(seconds=1))
+        self.assertEqual(self.get(since=token)['events'], [])
+        with mock.patch.object(events, 'SYNC_OVERLAP', datetime.timedelta(seconds=120)):
+            self.assertIn('Tardío', [e['title'] for e in self.get(since=token)['events']])
+
+    def test_filter_changes_are_reported_as_deleted(self):
+        self.a.tipo = 'visit'
+        self.a.save()
+        token = self.get(type='visit')['sync_token']
+        self.a.tipo = 'task'
+        self.a.save()
+        delta = self.get(since=token, type='visit')
+        self.assertEqual((delta['events'], delta['deleted']), ([], [self.a.pk]))
+
+    def test_assignment_changes_mark_event_modified(self):
+        token = self.get()['sync_token']
+        self.a.asignados.add(self.user)
+        self.assertEqual([e['id'] for e in self.get(since=token)['events']], [self.a.pk])
+        token = self.get()['sync_token']
+        self.user.evento_set.clear()
+        self.assertEqual([e['id'] for e in self.get(since=token)['events']], [self.a.pk])
+
+    def test_invalid_token(self):
+        self.assertEqual(self.client.get('/api/events/', dict(self.window, since='abc')).status_code, 400)
+        self.assertEqual(self.client.get('/api/events/', dict(self.window, since='9' * 30)).status_code, 400)
@@ -0,0 +1,115 @@
+import os
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import mock
+
+from django.test import TestCase
+
+from . import gazetteer, geocoding
+from .models import Municipios, ProyectosHabitacionales, Regiones, Terrenos
+
+
+class GazetteerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        region = Regiones.objects.create(nombre_region='Metropolitana')
+        cls.nunoa = Municipios.objects.create(nombre_municipio='Ñuñoa', id_region=region)
+        cls.maipu = Municipios.objects.create(nombre_municipio='Maipú', id_region=region)
+        Terrenos.objects.create(direccion='Avenida Irarrázaval 3000', id_municipio=cls.nunoa,
+                                latitud=Decimal('-33.4540'), longitud=Decimal('-70.6010'))
+        Terrenos.objects.create(direccion='Avenida Irarrázaval 3000', id_municipio=cls.maipu,
+                                latitud=Decimal('-33.5100'), longitud=Decimal('-70.7600'))
+        Terrenos.objects.create(direccion='Los Aromos 45', id_municipio=cls.nunoa,
+                                latitud=Decimal('-33.4600'), longitud=Decimal('-70.5900'))
+        ProyectosHabitacionales.objects.create(nombre_proyecto='Villa Los Pinos', id_municipio=cls.maipu,
+                                               latitud=Decimal('-33.5200'), longitud=Decimal('-70.7700'))
+
+    def setUp(self):
+        gazetteer.reset_gazetteer()
+        self.addCleanup(gazetteer.reset_gazetteer)
+        # los datos de TestCase no están confirmados: un hilo aparte no los vería
+        patcher = mock.patch.object(gazetteer, 'GAZETTEER_BACKGROUND_REBUILD', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        geocoding.clear_geocode_lru()
+        geocoding.reset_geocode_stats()
+
+    def test_exact_prefix_and_fuzzy_lookups(self):
+        gz = gazetteer.get_gazetteer()
+        self.assertEqual(gz.lookup('Avenida Irarrazaval 3000, Ñuñoa, Chile'), (-33.454, -70.601))
+        self.assertEqual(gz.lookup('avenida irarrázaval 3000, Maipú, Metropolitana, Chile'), (-33.51, -70.76))
+        # prefijo único dentro del municipio
+        self.assertEqual(gz.lookup('Los Aro, Ñuñoa'), (-33.46, -70.59))
+        # error de tipeo: trigramas, sólo si se pide una coincidencia aproximada
+        self.assertIsNone(gz.lookup('Avda Irarazaval 3000, Ñuñoa, Chile'))
+        self.assertEqual(gz.lookup('Avda Irarazaval 3000, Ñuñoa, Chile', approximate=True), (-33.454, -70.601))
+        self.assertEqual(gz.lookup('Villa Los Pinos, Maipú, Chile'), (-33.52, -70.77))
+        self.assertIsNone(gz.lookup('Calle Desconocida 1, Ñuñoa, Chile'))
+
+    def test_municipio_centroid(self):
+        gz = gazetteer.get_gazetteer()
+        lat, lng = gz.lookup('Ñuñoa, Metropolitana, Chile')
+        self.assertAlmostEqual(lat, -33.457)
+        self.assertAlmostEqual(lng, -70.5955)
+        with mock.patch.object(gazetteer, 'GAZETTEER_MUNICIPIO_FALLBACK', True):
+            self.assertAlmostEqual(gz.lookup('Calle Desconocida 1, Ñuñoa, Chile')[0], -33.457)
+
+    def test_streets_file(self):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write('direccion,municipio,latitud,longitud\nPasaje Sin Nombre 7,Maipú,-33.5,-70.75\nmala,fila,x,y\n')
+        gz = gazetteer.build_gazetteer(streets_file=path)
+        self.assertEqual(gz.lookup('Pasaje Sin Nombre 7, Maipú'), (-33.5, -70.75))
+
+    def test_geocode_uses_gazetteer_before_remote(self):
+        backend = mock.Mock(return_value=(1.0, 2.0))
+        self.assertEqual(geocoding.geocode('Los Aromos 45, Ñuñoa, Chile', backend=backend), (-33.46, -70.59))
+        backend.assert_not_called()
+        self.assertEqual(geocoding.geocode_stats()['local_hits'], 1)
+        # fallo del gazetteer: continúa al proveedor remoto
+        self.assertEqual(geocoding.geocode('Otra Calle 9, Ñuñoa, Chile', backend=backend), (1.0, 2.0))
+        backend.assert_called_once()
+
+    def test_fuzzy_match_does_not_skip_remote(self):
+        backend = mock.Mock(return_value=(1.0, 2.0))
+        self.assertEqual(geocoding.geocode('Avda Irarazaval 3000, Ñuñoa, Chile', backend=backend), (1.0, 2.0))
+        backend.assert_called_once()
+        # proveedor caído: se usa la coincidencia aproximada, sin guardarla como resultado
+        geocoding.clear_geocode_lru()
+        caido = mock.Mock(side_effect=geocoding.GeocoderError('timeout'))
+        self.assertEqual(geocoding.geocode('Avenida Irarazaval 3000, Ñuñoa, Chile', backend=caido), (-33.454, -70.601))
+        self.assertEqual(geocoding.lookup_cached('Avenida Irarazaval 3000, Ñuñoa, Chile'), (True, None))
+        with mock.patch.object(gazetteer, 'GAZETTEER_FUZZY_FALLBACK', True):
+            self.assertEqual(gazetteer.gazetteer_backend('Avda Irarazaval 3000, Ñuñoa'), (-33.454, -70.601))
+
+    def test_rebuilds_after_save(self):
+        self.assertIsNone(gazetteer.gazetteer_backend('Nueva 1, Maipú'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Terrenos.objects.create(direccion='Nueva 1', id_municipio=self.maipu,
+                                    latitud=Decimal('-33.53'), longitud=Decimal('-70.78'))
+        self.assertEqual(gazetteer.gazetteer_backend('Nueva 1, Maipú'), (-33.53, -70.78))
+        with self.assertNumQueries(0):
+            gazetteer.gazetteer_backend('Nueva 1, Maipú')
+
+    def test_background_rebuild_serves_previous_index(self):
+        old = gazetteer.get_gazetteer()
+        release = threading.Event()
+        new = gazetteer.Gazetteer().finish()
+
+        def slow_build():
+            release.wait(5)
+            return new
+
+        with mock.patch.object(gazetteer, 'GAZETTEER_BACKGROUND_REBUILD', True), \
+                mock.patch.object(gazetteer, 'build_gazetteer', slow_build):
+            with self.captureOnCommitCallbacks(execute=True):
+                gazetteer.invalidate_gazetteer()
+            self.assertIs(gazetteer.get_gazetteer(), old)
+            thread = gazetteer._rebuild_thread
+            self.assertIs(gazetteer.get_gazetteer(), old)
+            self.assertIs(gazetteer._rebuild_thread, thread)
+            release.set()
+            thread.join(5)
+        self.assertIs(gazetteer.get_gazetteer(), new)
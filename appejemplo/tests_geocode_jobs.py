@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.test import TestCase, Client
+
+from . import geocoding
+from .geocode_jobs import jobs
+from .models import Beneficiarios, Municipios, ProyectosHabitacionales, Regiones, Terrenos
+
+
+class BackgroundGeocodeTests(TestCase):
+    def setUp(self):
+        geocoding.clear_geocode_lru()
+        region = Regiones.objects.create(nombre_region='Metropolitana')
+        self.municipio = Municipios.objects.create(nombre_municipio='Ñuñoa', id_region=region)
+        self.terreno = Terrenos.objects.create(direccion='Irarrázaval 3000', id_municipio=self.municipio)
+        self.proyecto = ProyectosHabitacionales.objects.create(nombre_proyecto='Villa Sur', id_municipio=self.municipio,
+                                                               id_terreno=self.terreno)
+        self.beneficiario = Beneficiarios.objects.create(nombre='Ana', apellidos='Pérez', direccion='Irarrázaval 3000',
+                                                         id_municipio=self.municipio)
+        self.calls = []
+        patcher = mock.patch.object(jobs, 'autostart', False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.reset_queue)
+
+    def reset_queue(self):
+        # descartar trabajos pendientes sin ejecutarlos (no consultar el servicio real)
+        with mock.patch.object(geocoding, 'nominatim_backend', lambda query: None):
+            jobs.drain()
+
+    def backend(self, query):
+        self.calls.append(query)
+        return (-33.4543, -70.6011)
+
+    def test_views_render_placeholder_without_geocoding(self):
+        def fail(query):
+            raise AssertionError('la vista no debe geocodificar en la petición')
+        client = Client()
+        with mock.patch.object(geocoding, 'nominatim_backend', fail):
+            res = client.get(f'/proyectos/{self.proyecto.pk}/')
+            self.assertEqual(res.status_code, 200)
+            self.assertContains(res, 'Obteniendo la ubicación')
+            res = client.get(f'/beneficiarios/{self.beneficiario.pk}/')
+            self.assertEqual(res.status_code, 200)
+            self.assertContains(res, 'Obteniendo ubicación')
+
+        # misma dirección: un solo trabajo para ambos destinos
+        self.assertEqual(jobs._queue.qsize(), 1)
+        with mock.patch.object(geocoding, 'nominatim_backend', self.backend):
+            jobs.drain()
+        self.assertEqual(len(self.calls), 1)
+        self.terreno.refresh_from_db()
+        self.beneficiario.refresh_from_db()
+        self.assertEqual(float(self.terreno.latitud), -33.4543)
+        self.assertEqual(float(self.beneficiario.longitud), -70.6011)
+
+        res = client.get(f'/proyectos/{self.proyecto.pk}/')
+        self.assertNotContains(res, 'Obteniendo la ubicación')
+
+    def test_cached_address_is_used_immediately(self):
+        with mock.patch.object(geocoding, 'nominatim_backend', self.backend):
+            geocoding.geocode('Irarrázaval 3000, Ñuñoa, Metropolitana, Chile')
+        res = Client().get(f'/proyectos/{self.proyecto.pk}/')
+        self.assertNotContains(res, 'Obteniendo la ubicación')
+        self.assertEqual(jobs._queue.qsize(), 0)
+        self.terreno.refresh_from_db()
+        self.assertEqual(float(self.terreno.latitud), -33.4543)
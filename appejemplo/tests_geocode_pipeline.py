@@ -0,0 +1,131 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from . import geocoding
+from .geocode_pipeline import Checkpoint, GeocodePipeline, TokenBucket
+from .models import Municipios, ProyectosHabitacionales, Regiones
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_rate_is_respected(self):
+        clock = FakeClock()
+        bucket = TokenBucket(rate=4, capacity=1, clock=clock, sleep=clock.sleep)
+        for _ in range(9):
+            bucket.acquire()
+        self.assertAlmostEqual(clock.now, 2.0)
+
+
+class SlowBackend:
+    """Backend en memoria que registra la concurrencia máxima alcanzada."""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, query):
+        with self.lock:
+            self.calls.append(query)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if 'sin resultado' in query.lower():
+            return None
+        return (-33.0 - len(self.calls) / 1000, -70.5)
+
+
+class GeocodePipelineTests(TestCase):
+    def setUp(self):
+        geocoding.clear_geocode_lru()
+        geocoding.reset_geocode_stats()
+        region = Regiones.objects.create(nombre_region='Metropolitana')
+        self.municipio = Municipios.objects.create(nombre_municipio='Ñuñoa', id_region=region)
+        self.proyectos = [ProyectosHabitacionales.objects.create(nombre_proyecto=f'Proyecto {i}', id_municipio=self.municipio)
+                          for i in range(12)]
+        ProyectosHabitacionales.objects.create(nombre_proyecto='Sin resultado', id_municipio=self.municipio)
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, True)
+        self.checkpoint_path = os.path.join(self.tmp, 'geocode.checkpoint')
+
+    def pipeline(self, backend, **kwargs):
+        kwargs.setdefault('rate', 1000)
+        return GeocodePipeline(backend=backend, workers=3, batch_size=5, **kwargs)
+
+    def test_concurrent_bulk_updates(self):
+        backend = SlowBackend()
+        stats = self.pipeline(backend).run(ProyectosHabitacionales.objects.all())
+        self.assertEqual(stats, {'processed': 13, 'updated': 12, 'not_found': 1, 'remote': 13})
+        self.assertGreater(backend.max_active, 1)
+        self.assertLessEqual(backend.max_active, 3)
+        self.assertEqual(ProyectosHabitacionales.objects.filter(latitud__isnull=False).count(), 12)
+        # segunda pasada: todo sale de la caché, sin consultas remotas
+        stats = self.pipeline(backend).run(ProyectosHabitacionales.objects.all())
+        self.assertEqual(stats['remote'], 0)
+        self.assertEqual(len(backend.calls), 13)
+
+    def test_checkpoint_resume(self):
+        checkpoint = Checkpoint(self.checkpoint_path)
+        backend = SlowBackend(delay=0)
+        self.pipeline(backend, checkpoint=checkpoint).run(ProyectosHabitacionales.objects.all(), limit=5)
+        self.assertEqual(checkpoint.load(), self.proyectos[4].id_proyecto)
+        stats = self.pipeline(backend, checkpoint=checkpoint).run(ProyectosHabitacionales.objects.all())
+        self.assertEqual(stats['processed'], 8)
+        self.assertEqual(len(backend.calls), 13)
+        self.assertEqual(checkpoint.load(), 0)
+
+    def test_command_against_local_stub_server(self):
+        requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = parse_qs(urlsplit(self.path).query).get('q', [''])[0]
+                requests.append(query)
+                body = [] if 'Sin resultado' in query else [
+                    {'lat': '-33.45', 'lon': '-70.6', 'display_name': query, 'place_id': 1}]
+                data = json.dumps(body).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            out = StringIO()
+            call_command('geocode_projects', '--backend', f'http://127.0.0.1:{server.server_port}', '--rate', '200',
+                         '--workers', '2', '--batch-size', '4', stdout=out)
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIn('Processed 13 projects, updated 12', out.getvalue())
+        self.assertEqual(len(requests), 13)
+        self.assertEqual(float(ProyectosHabitacionales.objects.get(pk=self.proyectos[0].pk).latitud), -33.45)
@@ -0,0 +1,67 @@
+import datetime
+from unittest import mock
+
+from django.test import TestCase
+
+from . import geocoding
+from .geocoding import GeocoderError, geocode, geocode_stats, normalize_address
+from .models import GeocodeCache
+
+
+class FakeBackend:
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def __call__(self, query):
+        self.calls.append(query)
+        result = self.results.get(query)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class GeocodeCacheTests(TestCase):
+    def setUp(self):
+        geocoding.clear_geocode_lru()
+        geocoding.reset_geocode_stats()
+        self.backend = FakeBackend({
+            'Avenida Pedro de Valdivia 100, Ñuñoa': (-33.4412345678, -70.6098765432),
+            'Calle Inexistente 1': None,
+            'Caída': GeocoderError('timeout'),
+        })
+
+    def test_normalize_address(self):
+        self.assertEqual(normalize_address('  Avenida  Pedro de Valdivia 100 ,Ñuñoa, '),
+                         'avenida pedro de valdivia 100, nunoa')
+
+    def test_lru_then_db_then_remote(self):
+        coords = geocode('Avenida Pedro de Valdivia 100, Ñuñoa', backend=self.backend)
+        self.assertEqual(coords, (-33.441235, -70.609877))
+        self.assertEqual(len(self.backend.calls), 1)
+        # misma dirección con otra forma: la LRU responde sin consultas
+        with self.assertNumQueries(0):
+            self.assertEqual(geocode('avenida pedro de valdivia 100 , nunoa', backend=self.backend), coords)
+        geocoding.clear_geocode_lru()
+        with self.assertNumQueries(1):
+            self.assertEqual(geocode('AVENIDA PEDRO DE VALDIVIA 100, ÑUÑOA', backend=self.backend), coords)
+        self.assertEqual(len(self.backend.calls), 1)
+        stats = geocode_stats()
+        self.assertEqual((stats['lru_hits'], stats['db_hits'], stats['misses']), (1, 1, 1))
+
+    def test_negative_and_error_caching(self):
+        self.assertIsNone(geocode('Calle Inexistente 1', backend=self.backend))
+        self.assertIsNone(geocode('Calle Inexistente 1', backend=self.backend))
+        self.assertEqual(len(self.backend.calls), 1)
+        self.assertEqual(GeocodeCache.objects.get(direccion_normalizada='calle inexistente 1').estado, 'sin_resultado')
+        self.assertIsNone(geocode('Caída', backend=self.backend))
+        self.assertEqual(GeocodeCache.objects.get(direccion_normalizada='caida').estado, 'error')
+        self.assertEqual(geocode_stats()['errors'], 1)
+
+    def test_expired_entries_are_refreshed(self):
+        geocode('Calle Inexistente 1', backend=self.backend)
+        geocoding.clear_geocode_lru()
+        viejo = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+        GeocodeCache.objects.update(fecha_actualizacion=viejo)
+        geocode('Calle Inexistente 1', backend=self.backend)
+        self.assertEqual(len(self.backend.calls), 2)
@@ -0,0 +1,96 @@
+import datetime
+import json
+
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+
+from .ical_feed import feed_token, user_from_feed_token
+from .models import Evento
+
+
+class IcalFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('feeduser', password='testpass')
+        self.other = User.objects.create(username='ajeno')
+        today = datetime.date.today()
+        self.asignado = Evento.objects.create(titulo='Visita, obra; bloque A', fecha_inicio=today,
+                                              hora_inicio=datetime.time(9), hora_fin=datetime.time(10))
+        self.asignado.asignados.add(self.user)
+        Evento.objects.create(titulo='Creado', fecha_inicio=today + datetime.timedelta(days=3), creado_por=self.user,
+                              recurrencia_freq='weekly', recurrencia_count=4, recurrencia_excepciones=[])
+        Evento.objects.create(titulo='Ajeno', fecha_inicio=today, creado_por=self.other)
+        Evento.objects.create(titulo='Viejo', fecha_inicio=today - datetime.timedelta(days=400), creado_por=self.user)
+        self.url = f'/api/events/{feed_token(self.user)}.ics'
+        self.client = Client()
+
+    def body(self, response):
+        return b''.join(response.streaming_content).decode() if response.streaming else response.content.decode()
+
+    def test_token_roundtrip_and_revocation(self):
+        token = feed_token(self.user)
+        self.assertEqual(user_from_feed_token(token), self.user)
+        self.assertIsNone(user_from_feed_token(token[:-1] + ('0' if token[-1] != '0' else '1')))
+        self.user.set_password('otra')
+        self.user.save()
+        self.assertIsNone(user_from_feed_token(token))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_feed_lists_user_events(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/calendar'))
+        body = self.body(res)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('SUMMARY:Visita\\, obra\; bloque A', body)
+        self.assertIn('RRULE:FREQ=WEEKLY;COUNT=4', body)
+        self.assertIn('DTSTART:%s' % datetime.date.today().strftime('%Y%m%dT090000'), body)
+        self.assertNotIn('Ajeno', body)
+        self.assertNotIn('Viejo', body)
+
+    def test_etag_cache_and_invalidation(self):
+        first = self.client.get(self.url)
+        body = self.body(first)
+        etag = first['ETag']
+        # usuario del token y el agregado que da el ETag
+        with self.assertNumQueries(2):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        with self.assertNumQueries(2):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.content.decode(), body)
+
+        self.asignado.titulo = 'Cambiado'
+        self.asignado.save()
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertIn('SUMMARY:Cambiado', self.body(res))
+
+    def test_bulk_creation_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        User.objects.create_user('feedadmin', password='testpass', is_staff=True)
+        admin = Client()
+        admin.login(username='feedadmin', password='testpass')
+        self.user.userprofile.tipo_usuario = 'jefe_proyecto'
+        self.user.userprofile.save()
+        items = [{'title': f'Masivo {i}', 'start': datetime.date.today().isoformat(), 'assigned_to': [self.user.pk]}
+                 for i in range(3)]
+        res = admin.post('/api/events/', json.dumps(items), content_type='application/json')
+        self.assertEqual(res.status_code, 201, res.content)
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertIn('SUMMARY:Masivo 2', self.body(res))
+        # los eventos de otros usuarios no cambian este feed
+        etag = res['ETag']
+        Evento.objects.create(titulo='Otro', fecha_inicio=datetime.date.today(), creado_por=self.other)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_unassignment_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.asignado.asignados.remove(self.user)
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotIn('Visita', self.body(res))
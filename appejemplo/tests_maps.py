@@ -0,0 +1,48 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from . import maps
+
+
+class MapRenderingTests(SimpleTestCase):
+    def setUp(self):
+        maps.clear_map_cache()
+        self.addCleanup(maps.clear_map_cache)
+
+    def test_folium_html_is_cached_by_point_zoom_and_popup(self):
+        with mock.patch.object(maps, '_folium_html', side_effect=lambda *a: f'<map {a}>') as render:
+            first = maps.render_map(-33.45, -70.66, 'Proyecto A', renderer='folium')
+            self.assertEqual(maps.render_map(-33.4500001, -70.66, 'Proyecto A', renderer='folium'), first)
+            maps.render_map(-33.45, -70.66, 'Proyecto B', renderer='folium')
+            maps.render_map(-33.45, -70.66, 'Proyecto A', zoom=12, renderer='folium')
+        self.assertEqual(render.call_count, 3)
+
+    def test_cache_is_bounded(self):
+        with mock.patch.object(maps, 'MAP_CACHE_SIZE', 3), \
+                mock.patch.object(maps, '_folium_html', side_effect=lambda *a: 'x') as render:
+            for i in range(5):
+                maps.render_map(-33 - i / 10, -70.6, 'p', renderer='folium')
+            self.assertEqual(maps.map_cache_size(), 3)
+            maps.render_map(-33.0, -70.6, 'p', renderer='folium')
+        self.assertEqual(render.call_count, 6)
+
+    def test_real_folium_render(self):
+        html = maps.render_map(-33.45, -70.66, 'Proyecto', renderer='folium')
+        self.assertIn('leaflet', html.lower())
+
+    def test_client_renderer_only_sends_coordinates(self):
+        html = maps.render_map(-33.45, -70.66, 'Villa <b>Sur</b>', renderer='client')
+        self.assertIn('data-lat="-33.450000"', html)
+        self.assertIn('data-popup="Villa &lt;b&gt;Sur&lt;/b&gt;"', html)
+        self.assertLess(len(html), 3000)
+        self.assertIsNone(maps.render_map(None, -70.66, 'x'))
+
+    def test_popup_text_is_never_html(self):
+        self.assertEqual(maps.popup_html('Ana <img src=x onerror=alert(1)><br>Calle 1'),
+                         'Ana &lt;img src=x onerror=alert(1)&gt;<br>Calle 1')
+        html = maps.render_map(-33.45, -70.66, '<script>x</script><br>Calle 1', renderer='client')
+        # el navegador arma el popup con nodos de texto, no con el atributo como HTML
+        self.assertNotIn('bindPopup(el.dataset.popup)', html)
+        self.assertIn('createTextNode', html)
+        self.assertNotIn('<script>x', html)
@@ -0,0 +1,90 @@
+import math
+import sys
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import spatial
+from .matching_algorithm import MatchingAlgorithm
+from .models import Beneficiarios, Municipios, Postulaciones, ProyectosHabitacionales, Regiones, Terrenos
+
+
+class HaversineMatrixTests(SimpleTestCase):
+    A = [(-33.45, -70.66), None, (-36.82, -73.05)]
+    B = [(-33.0, -71.5), (-33.45, -70.66)]
+
+    def check(self, matrix):
+        self.assertEqual(len(matrix), 3)
+        self.assertAlmostEqual(matrix[0][0], spatial.haversine_km(-33.45, -70.66, -33.0, -71.5), places=6)
+        self.assertAlmostEqual(matrix[0][1], 0.0, places=6)
+        self.assertAlmostEqual(matrix[2][1], spatial.haversine_km(-36.82, -73.05, -33.45, -70.66), places=6)
+        self.assertTrue(all(math.isnan(d) for d in matrix[1]))
+
+    def test_vectorized(self):
+        self.check(spatial.haversine_matrix(self.A, self.B))
+
+    def test_pure_python_fallback(self):
+        with mock.patch.dict(sys.modules, {'numpy': None}):
+            self.check(spatial.haversine_matrix(self.A, self.B))
+
+
+class DistanceLocationScoreTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        region = Regiones.objects.create(nombre_region='Metropolitana')
+        cls.m1 = Municipios.objects.create(nombre_municipio='Santiago', id_region=region)
+        cls.m2 = Municipios.objects.create(nombre_municipio='Providencia', id_region=region)
+        cls.beneficiario = Beneficiarios.objects.create(
+            rut='1-9', nombre='Ana', apellidos='Soto', ingresos_familiares=1000000, numero_integrantes=2,
+            puntaje_socioeconomico=75, estado_beneficiario='Activo', id_municipio=cls.m1,
+            latitud=Decimal('-33.45'), longitud=Decimal('-70.66'))
+        comun = dict(tipo_vivienda='Media', precio_unitario=2000000, superficie_vivienda=80,
+                     numero_viviendas=10, estado_proyecto='Disponible')
+        # mismo municipio pero lejos / otro municipio pero a ~1 km (coordenadas del terreno)
+        cls.lejano = ProyectosHabitacionales.objects.create(
+            nombre_proyecto='Lejano', id_municipio=cls.m1, latitud=Decimal('-36.0'), longitud=Decimal('-71.5'), **comun)
+        terreno = Terrenos.objects.create(direccion='X', latitud=Decimal('-33.44'), longitud=Decimal('-70.66'))
+        cls.cercano = ProyectosHabitacionales.objects.create(
+            nombre_proyecto='Cercano', id_municipio=cls.m2, id_terreno=terreno, **comun)
+
+    def test_decay_and_fallback(self):
+        b = self.beneficiario
+        self.assertEqual(MatchingAlgorithm.puntaje_ubicacion(b, self.lejano, por_distancia=False), 100)
+        self.assertEqual(MatchingAlgorithm.puntaje_ubicacion(b, self.cercano, por_distancia=False), 70)
+        self.assertGreater(MatchingAlgorithm.puntaje_ubicacion(b, self.cercano, por_distancia=True), 95)
+        self.assertLess(MatchingAlgorithm.puntaje_ubicacion(b, self.lejano, por_distancia=True), 1)
+        self.assertAlmostEqual(
+            MatchingAlgorithm.puntaje_ubicacion(b, self.lejano, distancia_km=MatchingAlgorithm.distancia_media_km(),
+                                               por_distancia=True), 50)
+        b.latitud = None
+        self.assertEqual(MatchingAlgorithm.puntaje_ubicacion(b, self.cercano, por_distancia=True), 70)
+
+    def puntajes(self, **kwargs):
+        resultados = MatchingAlgorithm.ejecutar_matching(**kwargs)
+        self.assertEqual(resultados['errores'], 0)
+        return {d['proyecto']: d['compatibilidad'] for d in resultados['detalles']}
+
+    def test_batch_uses_distance_when_enabled(self):
+        self.assertGreater(self.puntajes(por_distancia=True)['Cercano'], 79)
+
+    def test_settings_are_read_at_call_time(self):
+        with override_settings(MATCHING_DISTANCE_SCORE=True):
+            self.assertGreater(self.puntajes()['Cercano'], 79)
+            self.assertLess(MatchingAlgorithm.puntaje_ubicacion(self.beneficiario, self.lejano), 1)
+            with override_settings(MATCHING_DISTANCE_HALF_LIFE_KM=10):
+                self.assertAlmostEqual(
+                    MatchingAlgorithm.puntaje_ubicacion(self.beneficiario, self.lejano, distancia_km=10), 50)
+        with override_settings(MATCHING_DISTANCE_SCORE=False):
+            self.assertEqual(MatchingAlgorithm.puntaje_ubicacion(self.beneficiario, self.lejano), 100)
+
+    def test_batch_falls_back_to_municipio_rule(self):
+        puntajes = self.puntajes(por_distancia=False)
+        self.assertAlmostEqual(puntajes['Lejano'] - puntajes['Cercano'], 3)
+
+    def test_rejected_postulacion_is_skipped_without_per_pair_queries(self):
+        Postulaciones.objects.create(id_beneficiario=self.beneficiario, id_proyecto=self.cercano,
+                                     estado_postulacion='Rechazada')
+        # beneficiarios, proyectos, rechazadas + get_or_create del único match (select, savepoint, insert, release)
+        with self.assertNumQueries(7):
+            self.assertEqual(list(self.puntajes(por_distancia=True)), ['Lejano'])
@@ -0,0 +1,98 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import Beneficiarios, LogAuditoria, Postulaciones
+
+
+class KeysetPaginationTests(TestCase):
+    url = '/api/postulaciones/'
+
+    @classmethod
+    def setUpTestData(cls):
+        beneficiario = Beneficiarios.objects.create(rut='1-9', nombre='Ana')
+        base = datetime.date(2026, 1, 1)
+        # fechas repetidas y nulas para ejercitar el desempate por pk
+        fechas = [base, base, None, base + datetime.timedelta(days=2), base, None, base + datetime.timedelta(days=1)] * 2
+        for i, fecha in enumerate(fechas):
+            Postulaciones.objects.create(id_beneficiario=beneficiario, fecha_postulacion=fecha, puntaje_asignado=i % 4)
+        rows = list(Postulaciones.objects.values_list('pk', 'fecha_postulacion', 'puntaje_asignado'))
+        cls.by_fecha = [pk for pk, f, _ in sorted(rows, key=lambda r: (r[1] is not None, r[1] or base, r[0]), reverse=True)]
+        cls.by_puntaje = [pk for pk, _, p in sorted(rows, key=lambda r: (r[2], r[0]))]
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url, params=None, key='next'):
+        pages, ids = 0, []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids.extend(r['id_postulacion'] for r in data['results'])
+            pages += 1
+            if not data[key]:
+                return ids, pages, data
+            response = self.client.get(data[key])
+
+    def test_walks_default_ordering(self):
+        ids, pages, last = self.walk(self.url, {'page_size': 3})
+        self.assertEqual(ids, self.by_fecha)
+        self.assertEqual(pages, 5)
+        self.assertNotIn('count', last)
+        _, _, first = self.walk(last['previous'], key='previous')
+        self.assertEqual([r['id_postulacion'] for r in first['results']], self.by_fecha[:3])
+
+    def test_previous_pages_mirror_next_pages(self):
+        forward = []
+        data = self.client.get(self.url, {'page_size': 4}).json()
+        forward.append([r['id_postulacion'] for r in data['results']])
+        while data['next']:
+            data = self.client.get(data['next']).json()
+            forward.append([r['id_postulacion'] for r in data['results']])
+        backward = [[r['id_postulacion'] for r in data['results']]]
+        while data['previous']:
+            data = self.client.get(data['previous']).json()
+            backward.append([r['id_postulacion'] for r in data['results']])
+        self.assertEqual(backward[::-1], forward)
+
+    def test_ordering_param_and_count_opt_in(self):
+        ids, _, _ = self.walk(self.url, {'page_size': 5, 'ordering': 'puntaje_asignado'})
+        self.assertEqual(ids, self.by_puntaje)
+        data = self.client.get(self.url, {'count': '1', 'page_size': 2}).json()
+        self.assertEqual(data['count'], len(self.by_fecha))
+        # un cursor de otro orden, o mal formado, se rechaza
+        other = self.client.get(self.url, {'page_size': 2, 'ordering': 'puntaje_asignado'}).json()['next']
+        cursor = other.split('cursor=')[1].split('&')[0]
+        self.assertEqual(self.client.get(self.url, {'cursor': cursor}).status_code, 404)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'xyz'}).status_code, 404)
+
+    def test_stable_under_inserts_and_no_count_or_offset(self):
+        data = self.client.get(self.url, {'page_size': 3}).json()
+        Postulaciones.objects.create(fecha_postulacion=datetime.date(2027, 1, 1))
+        with CaptureQueriesContext(connection) as ctx:
+            ids, _, _ = self.walk(data['next'])
+        seen = [r['id_postulacion'] for r in data['results']] + ids
+        self.assertEqual(seen, self.by_fecha)
+        sql = ' '.join(q['sql'] for q in ctx.captured_queries).upper()
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+
+class KeysetIndexTests(TestCase):
+    def test_log_pages_use_composite_index(self):
+        for _ in range(3):
+            LogAuditoria.objects.create(accion='x')
+        client = APIClient()
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(client.get('/api/log-auditoria/', {'page_size': 1}).json()['next'])
+        sql = [q['sql'] for q in ctx.captured_queries if 'log_auditoria' in q['sql']][-1]
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+            self.assertIn('log_timestamp_idx', plan)
+            self.assertNotIn('TEMP B-TREE', plan)
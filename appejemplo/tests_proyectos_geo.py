@@ -0,0 +1,77 @@
+import random
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from . import proyectos_geo
+from .models import ProyectosHabitacionales, Terrenos, VersionCache
+
+
+class ProyectosGeoTests(TestCase):
+    url = '/api/proyectos/geo/'
+
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(5)
+        ProyectosHabitacionales.objects.bulk_create([
+            ProyectosHabitacionales(nombre_proyecto=f'P{i}', estado_proyecto='Activo',
+                                    latitud=Decimal(str(round(rnd.uniform(-34, -33), 6))),
+                                    longitud=Decimal(str(round(rnd.uniform(-71, -70), 6))))
+            for i in range(200)
+        ])
+        terreno = Terrenos.objects.create(direccion='Costanera 1', latitud=Decimal('-41.4'), longitud=Decimal('-72.9'))
+        cls.sur = ProyectosHabitacionales.objects.create(nombre_proyecto='Sur', estado_proyecto='Disponible',
+                                                         id_terreno=terreno)
+        ProyectosHabitacionales.objects.create(nombre_proyecto='Sin coordenadas')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **params):
+        r = self.client.get(self.url, params)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r['Content-Type'], 'application/geo+json')
+        return r.json()
+
+    def test_low_zoom_is_clustered(self):
+        data = self.get(bbox='-76,-56,-66,-17', zoom=5)
+        clusters = [f for f in data['features'] if f['properties'].get('cluster')]
+        points = [f for f in data['features'] if not f['properties'].get('cluster')]
+        self.assertEqual(sum(f['properties']['count'] for f in clusters) + len(points), 201)
+        self.assertLess(len(data['features']), 10)
+        # el proyecto aislado del sur sale como punto, con las coordenadas de su terreno
+        sur = [f for f in points if f['properties']['id'] == self.sur.pk]
+        self.assertEqual(sur[0]['geometry']['coordinates'], [-72.9, -41.4])
+        self.assertEqual(sur[0]['properties'], {'id': self.sur.pk, 'nombre': 'Sur', 'estado': 'Disponible'})
+
+    def test_high_zoom_returns_individual_points_in_bbox(self):
+        data = self.get(bbox='-70.6,-33.6,-70.4,-33.4', zoom=15)
+        expected = ProyectosHabitacionales.objects.filter(latitud__gte=-33.6, latitud__lte=-33.4,
+                                                          longitud__gte=-70.6, longitud__lte=-70.4).count()
+        # el bbox se ajusta hacia afuera a la grilla de teselas
+        self.assertGreaterEqual(len(data['features']), expected)
+        self.assertTrue(all(set(f['properties']) == {'id', 'nombre', 'estado'} for f in data['features']))
+
+    def test_responses_are_cached_and_invalidated_on_save(self):
+        self.get(bbox='-76,-56,-66,-17', zoom=5)
+        # sólo se lee la versión compartida; el cuerpo sale de la caché
+        with self.assertNumQueries(1):
+            self.get(bbox='-75.9,-55.9,-66.1,-17.1', zoom=5)
+        ProyectosHabitacionales.objects.create(nombre_proyecto='Nuevo', latitud=-45.5, longitud=-72.0)
+        data = self.get(bbox='-76,-56,-66,-17', zoom=5)
+        self.assertIn('Nuevo', [f['properties'].get('nombre') for f in data['features']])
+
+    def test_version_is_shared_through_the_database(self):
+        self.get(bbox='-76,-56,-66,-17', zoom=5)
+        # otro worker invalida: la versión vive en la BD, no en la caché de este proceso
+        VersionCache.objects.update_or_create(clave=proyectos_geo.GEO_VERSION_KEY, defaults={'version': 1})
+        ProyectosHabitacionales.objects.bulk_create([ProyectosHabitacionales(nombre_proyecto='Otro worker', latitud=-45.5, longitud=-72.0)])
+        data = self.get(bbox='-76,-56,-66,-17', zoom=5)
+        self.assertIn('Otro worker', [f['properties'].get('nombre') for f in data['features']])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.client.get(self.url, {'bbox': '1,2,3'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'bbox': '-70,-33,-71,-34'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'zoom': 'x'}).status_code, 400)
+        self.assertEqual(proyectos_geo.parse_bbox('-200,-95,200,95'), (-180.0, -90.0, 180.0, 90.0))
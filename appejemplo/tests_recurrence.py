@@ -0,0 +1,69 @@
+import datetime
+import json
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+
+from .models import Evento
+from .recurrence import Rule, last_occurrence, occurrence_dates, parse_rrule
+
+d = datetime.date
+
+
+class RecurrenceRuleTests(TestCase):
+    def test_weekly_expansion_only_inside_window(self):
+        rule = Rule('weekly', 1, None, None, ())
+        fechas = occurrence_dates(d(2025, 1, 6), rule, d(2025, 6, 1), d(2025, 6, 30))
+        self.assertEqual(fechas, (d(2025, 6, 2), d(2025, 6, 9), d(2025, 6, 16), d(2025, 6, 23)))
+
+    def test_count_interval_and_exceptions(self):
+        rule = parse_rrule({'freq': 'daily', 'interval': 2, 'count': 5, 'exceptions': ['2025-06-05']})
+        fechas = occurrence_dates(d(2025, 6, 1), rule, d(2025, 5, 1), d(2025, 7, 1))
+        self.assertEqual(fechas, (d(2025, 6, 1), d(2025, 6, 3), d(2025, 6, 7), d(2025, 6, 9)))
+        self.assertEqual(last_occurrence(d(2025, 6, 1), rule), d(2025, 6, 9))
+
+    def test_monthly_skips_missing_days(self):
+        rule = parse_rrule('RRULE:FREQ=MONTHLY;COUNT=3;UNTIL=20251231')
+        self.assertEqual(occurrence_dates(d(2025, 1, 31), rule, d(2025, 1, 1), d(2026, 1, 1)),
+                         (d(2025, 1, 31), d(2025, 3, 31), d(2025, 5, 31)))
+
+    def test_invalid_rules(self):
+        for raw in ({'freq': 'hourly'}, {'freq': 'daily', 'interval': 0}, 'FREQ=WEEKLY;COUNT=x', 42,
+                    {'freq': 'monthly', 'until': '9999-12-31'}):
+            with self.assertRaises(ValueError):
+                parse_rrule(raw, d(2025, 1, 1))
+        self.assertEqual(parse_rrule({'freq': 'monthly', 'until': '2124-12-31'}, d(2025, 1, 1)).until, d(2124, 12, 31))
+
+
+class RecurringEventsAPITests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('recuser', password='testpass', is_staff=True)
+        self.client = Client()
+        self.client.login(username='recuser', password='testpass')
+
+    def test_series_is_one_row_expanded_per_window(self):
+        payload = {'title': 'Visita obra', 'start': '2025-01-06', 'end': '2025-01-07', 'type': 'task',
+                   'recurrence': {'freq': 'weekly', 'until': '2025-12-31', 'exceptions': ['2025-06-09']}}
+        res = self.client.post('/api/events/', json.dumps(payload), content_type='application/json')
+        self.assertEqual(res.status_code, 200, res.content)
+        self.assertEqual(Evento.objects.count(), 1)
+        ev = Evento.objects.get()
+        self.assertEqual(ev.recurrencia_fin, d(2025, 12, 30))
+
+        events = self.client.get('/api/events/', {'start': '2025-06-01', 'end': '2025-06-30'}).json()['events']
+        self.assertEqual([(e['start'], e['end']) for e in events],
+                         [('2025-06-02', '2025-06-03'), ('2025-06-16', '2025-06-17'), ('2025-06-23', '2025-06-24')])
+        self.assertTrue(all(e['recurring'] and e['id'] == ev.id_evento for e in events))
+        # ocurrencia que empieza antes de la ventana pero termina dentro
+        events = self.client.get('/api/events/', {'start': '2025-06-03', 'end': '2025-06-04'}).json()['events']
+        self.assertEqual([e['start'] for e in events], ['2025-06-02'])
+        # fuera del rango total de la serie no se devuelve nada
+        self.assertEqual(self.client.get('/api/events/', {'start': '2026-01-01', 'end': '2026-02-01'}).json()['events'], [])
+
+    def test_invalid_recurrence_rejected(self):
+        payload = {'title': 'Mala', 'start': '2025-01-06', 'recurrence': 'FREQ=SECONDLY'}
+        res = self.client.post('/api/events/', json.dumps(payload), content_type='application/json')
+        self.assertEqual(res.status_code, 400)
+        payload['recurrence'] = {'freq': 'monthly', 'until': '9999-12-31'}
+        res = self.client.post('/api/events/', json.dumps(payload), content_type='application/json')
+        self.assertEqual(res.status_code, 400)
@@ -0,0 +1,83 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from .models import Evento, Notificacion, RecordatorioEnviado, UsuariosSistema
+from .reminders import send_event_reminders
+
+
+class EventReminderTests(TestCase):
+    def setUp(self):
+        d, t = datetime.date, datetime.time
+        self.now = datetime.datetime(2025, 6, 10, 8, 0)
+        self.con_perfil = []
+        for i in range(3):
+            u = User.objects.create(username=f'recordado{i}')
+            us = UsuariosSistema.objects.create(username=f'recordado{i}_sys')
+            u.userprofile.usuariosistema = us
+            u.userprofile.save()
+            self.con_perfil.append(u)
+        self.sin_perfil = User.objects.create(username='sinperfil')
+
+        self.hoy = Evento.objects.create(titulo='Visita', fecha_inicio=d(2025, 6, 10), hora_inicio=t(15))
+        self.hoy.asignados.add(*self.con_perfil, self.sin_perfil)
+        self.manana = Evento.objects.create(titulo='Entrega', fecha_inicio=d(2025, 6, 11))
+        self.manana.asignados.add(self.con_perfil[0])
+        pasado = Evento.objects.create(titulo='Pasado', fecha_inicio=d(2025, 6, 10), hora_inicio=t(7))
+        lejano = Evento.objects.create(titulo='Lejano', fecha_inicio=d(2025, 6, 20))
+        for ev in (pasado, lejano):
+            ev.asignados.add(self.con_perfil[1])
+        self.serie = Evento.objects.create(titulo='Diaria', fecha_inicio=d(2025, 6, 1), hora_inicio=t(9),
+                                           recurrencia_freq='daily')
+        self.serie.asignados.add(self.con_perfil[2])
+
+    def test_creates_reminders_once(self):
+        stats = send_event_reminders(now=self.now)
+        self.assertEqual(stats['sent'], 3 + 1 + 1)
+        self.assertEqual(stats['skipped_without_profile'], 1)
+        mensajes = sorted(Notificacion.objects.values_list('mensaje', flat=True))
+        self.assertIn('Recordatorio: "Diaria" el 10/06/2025 a las 09:00', mensajes)
+        self.assertIn('Recordatorio: "Entrega" el 11/06/2025', mensajes)
+        self.assertFalse(any('Pasado' in m or 'Lejano' in m for m in mensajes))
+
+        again = send_event_reminders(now=self.now + datetime.timedelta(minutes=5))
+        self.assertEqual(again['sent'], 0)
+        self.assertEqual(again['already_sent'], 5)
+        self.assertEqual(Notificacion.objects.count(), 5)
+        self.assertEqual(RecordatorioEnviado.objects.count(), 5)
+
+    def test_next_occurrence_of_series_is_new(self):
+        send_event_reminders(now=self.now)
+        stats = send_event_reminders(now=self.now + datetime.timedelta(days=1, hours=2))
+        self.assertEqual(stats['sent'], 1)
+        self.assertEqual(RecordatorioEnviado.objects.filter(evento=self.serie).count(), 2)
+
+    def test_constant_queries_per_batch(self):
+        # candidatos, asignados, bloqueo de eventos, marcas existentes y dos inserciones (más dos savepoints)
+        with self.assertNumQueries(10):
+            send_event_reminders(now=self.now)
+
+    def test_markers_left_by_a_concurrent_run_are_not_notified_again(self):
+        # otra ejecución marcó una ocurrencia después de nuestra lectura de marcas
+        us = self.con_perfil[2].userprofile.usuariosistema
+        RecordatorioEnviado.objects.create(evento=self.serie, usuario=us, fecha_ocurrencia=datetime.date(2025, 6, 10))
+        with mock.patch('appejemplo.reminders._sent_markers', return_value=set()):
+            stats = send_event_reminders(now=self.now)
+        self.assertEqual((stats['sent'], stats['already_sent']), (4, 1))
+        self.assertEqual(RecordatorioEnviado.objects.count(), 5)
+        self.assertEqual(Notificacion.objects.count(), 4)
+        self.assertFalse(Notificacion.objects.filter(mensaje__contains='Diaria').exists())
+        self.assertEqual(send_event_reminders(now=self.now)['sent'], 0)
+
+    def test_commands(self):
+        out = StringIO()
+        call_command('send_event_reminders', '--dry-run', '--hours', '24', stdout=out)
+        self.assertIn('[DRY]', out.getvalue())
+        self.assertEqual(Notificacion.objects.count(), 0)
+        out = StringIO()
+        call_command('run_scheduler', '--iterations', '1', '--interval', '0', stdout=out)
+        self.assertIn('[1] reminders sent=', out.getvalue())
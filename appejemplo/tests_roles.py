@@ -0,0 +1,60 @@
+import json
+
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+
+from .models import UsuariosSistema
+from .roles import active_user_roles, canonical_role, invalidate_role_cache, user_roles
+
+
+class RoleResolutionTests(TestCase):
+    def setUp(self):
+        invalidate_role_cache()
+        self.users = []
+        for i in range(5):
+            u = User.objects.create_user(f'emp{i}', password='testpass', first_name='Emp', last_name=str(i))
+            us = UsuariosSistema.objects.create(username=f'emp{i}_sys', tipo_usuario='empresa_constructora')
+            u.userprofile.usuariosistema = us
+            u.userprofile.save()
+            self.users.append(u)
+        self.plain = User.objects.create_user('plain', password='testpass')
+        User.objects.create_user('inactive', password='testpass', is_active=False)
+
+    def test_canonical_role(self):
+        self.assertEqual(canonical_role(' Empresa_Constructora '), 'empresa')
+        self.assertEqual(canonical_role('jefe'), 'jefe_proyecto')
+        self.assertIsNone(canonical_role(''))
+
+    def test_active_users_single_query_then_cached(self):
+        with self.assertNumQueries(1):
+            roles = active_user_roles()
+        self.assertEqual([r.display for r in roles][:2], ['Emp 0', 'Emp 1'])
+        self.assertNotIn('inactive', [r.display for r in roles])
+        by_id = {r.id: r for r in roles}
+        self.assertEqual(by_id[self.users[0].id].role, 'empresa')
+        self.assertEqual(by_id[self.plain.id].role, 'usuario')
+        with self.assertNumQueries(0):
+            active_user_roles()
+            user_roles([u.id for u in self.users])
+
+    def test_cache_invalidated_on_profile_change(self):
+        user_roles([self.plain.id])
+        self.plain.userprofile.tipo_usuario = 'empresa'
+        self.plain.userprofile.save()
+        self.assertEqual(user_roles([self.plain.id])[self.plain.id].role, 'empresa')
+
+    def test_missing_ids_are_omitted(self):
+        self.assertEqual(set(user_roles([self.plain.id, 999999])), {self.plain.id})
+
+    def test_events_api_validates_assignees_in_one_query(self):
+        admin = User.objects.create_user('roleadmin', password='testpass', is_staff=True)
+        client = Client()
+        client.login(username='roleadmin', password='testpass')
+        invalidate_role_cache()
+        payload = {'title': 'Reunión', 'start': '2025-06-01', 'type': 'meeting',
+                   'assigned_to': [u.id for u in self.users] + [self.plain.id, 999999]}
+        res = client.post('/api/events/', json.dumps(payload), content_type='application/json')
+        self.assertEqual(res.status_code, 403)
+        details = res.json()['details']
+        self.assertEqual(details, [{'id': self.plain.id, 'role': 'usuario', 'role_canonical': 'usuario'},
+                                   {'id': 999999, 'missing': True}])
@@ -0,0 +1,78 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import Beneficiarios, EmpresasConstructoras, Municipios, Postulaciones, ProyectosHabitacionales, Terrenos
+from .serializers import ProyectosHabitacionalesSerializer
+from .sparse_fields import queryset_plan
+
+
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        municipio = Municipios.objects.create(nombre_municipio='Maipú')
+        empresa = EmpresasConstructoras.objects.create(razon_social='Constructora Sur', rut_empresa='7-1')
+        terreno = Terrenos.objects.create(direccion='Los Aromos 45', id_municipio=municipio)
+        cls.proyecto = ProyectosHabitacionales.objects.create(
+            nombre_proyecto='Villa Norte', descripcion='larga', id_municipio=municipio,
+            id_empresa_constructora=empresa, id_terreno=terreno)
+        beneficiario = Beneficiarios.objects.create(rut='1-9', nombre='Ana', apellidos='Soto')
+        for i in range(3):
+            Postulaciones.objects.create(id_beneficiario=beneficiario, id_proyecto=cls.proyecto,
+                                         fecha_postulacion=datetime.date(2026, 1, 1 + i))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json(), [q['sql'] for q in ctx.captured_queries]
+
+    def test_fields_narrow_representation_and_sql(self):
+        data, queries = self.get(f'/api/proyectos/{self.proyecto.pk}/', fields='id_proyecto,nombre_proyecto')
+        self.assertEqual(data, {'id_proyecto': self.proyecto.pk, 'nombre_proyecto': 'Villa Norte'})
+        sql = queries[-1]
+        self.assertNotIn('descripcion', sql)
+        self.assertNotIn('JOIN', sql)
+
+        data, queries = self.get(f'/api/proyectos/{self.proyecto.pk}/', fields='nombre_proyecto,razon_social_empresa')
+        self.assertEqual(data['razon_social_empresa'], 'Constructora Sur')
+        self.assertEqual(queries[-1].count('JOIN'), 1)
+        self.assertNotIn('rut_empresa', queries[-1])
+
+    def test_expand_and_nested_fields(self):
+        data, queries = self.get(f'/api/proyectos/{self.proyecto.pk}/', expand='empresa,terreno')
+        self.assertEqual(data['empresa']['razon_social'], 'Constructora Sur')
+        self.assertEqual(data['terreno']['nombre_municipio'], 'Maipú')
+        self.assertIn('descripcion', data)
+        self.assertEqual(len(queries), 1)
+
+        data, queries = self.get(f'/api/proyectos/{self.proyecto.pk}/', fields='nombre_proyecto,empresa.razon_social')
+        self.assertEqual(data, {'nombre_proyecto': 'Villa Norte', 'empresa': {'razon_social': 'Constructora Sur'}})
+        self.assertNotIn('rut_empresa', queries[-1])
+
+    def test_list_with_keyset_pagination(self):
+        data, queries = self.get('/api/postulaciones/', fields='id_postulacion,nombre_proyecto', page_size=2)
+        self.assertEqual(list(data['results'][0]), ['id_postulacion', 'nombre_proyecto'])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('observaciones', queries[0])
+        data, _ = self.get(data['next'])
+        self.assertEqual(len(data['results']), 1)
+
+    def test_invalid_names_and_writes(self):
+        self.assertEqual(self.client.get('/api/proyectos/', {'fields': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/proyectos/', {'expand': 'nope'}).status_code, 400)
+        full, _ = self.get(f'/api/proyectos/{self.proyecto.pk}/')
+        self.assertIn('descripcion', full)
+        self.assertNotIn('empresa', full)
+
+    def test_queryset_plan(self):
+        serializer = ProyectosHabitacionalesSerializer(fields=['nombre_proyecto', 'direccion_terreno', 'id_municipio'])
+        related, only = queryset_plan(serializer, ProyectosHabitacionales)
+        self.assertEqual(related, {'id_terreno'})
+        self.assertEqual(only, {'nombre_proyecto', 'id_terreno', 'id_terreno__direccion', 'id_municipio'})
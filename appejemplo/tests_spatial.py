@@ -0,0 +1,84 @@
+import random
+from decimal import Decimal
+
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from . import spatial
+from .models import ProyectosHabitacionales, Terrenos
+
+
+class GeohashTests(SimpleTestCase):
+    def test_known_geohash(self):
+        self.assertEqual(spatial.geohash_encode(42.6, -5.6, 12), 'ezs42e44yx96')
+        self.assertIsNone(spatial.geohash_encode(None, -70.6))
+
+    def test_covering_cells_contain_every_point_of_the_box(self):
+        bbox = spatial.bounding_box(-33.45, -70.66, 7.5)
+        cells = spatial.covering_cells(bbox)
+        self.assertLessEqual(len(cells), spatial.MAX_CELLS)
+        rnd = random.Random(3)
+        for _ in range(500):
+            lat = rnd.uniform(bbox[0], bbox[1])
+            lng = rnd.uniform(bbox[2], bbox[3])
+            gh = spatial.geohash_encode(lat, lng)
+            self.assertTrue(any(gh.startswith(c) for c in cells), (lat, lng))
+
+
+class SpatialQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(7)
+        cls.points = {}
+        for i in range(300):
+            lat = Decimal(str(round(rnd.uniform(-34.2, -32.8), 6)))
+            lng = Decimal(str(round(rnd.uniform(-71.4, -70.0), 6)))
+            p = ProyectosHabitacionales.objects.create(nombre_proyecto=f'P{i}', latitud=lat, longitud=lng)
+            cls.points[p.pk] = (float(lat), float(lng))
+        ProyectosHabitacionales.objects.create(nombre_proyecto='Sin coordenadas')
+
+    def brute_force(self, lat, lng, radius):
+        found = []
+        for pk, (plat, plng) in self.points.items():
+            d = spatial.haversine_km(lat, lng, plat, plng)
+            if d <= radius:
+                found.append((d, pk))
+        return [pk for _, pk in sorted(found)]
+
+    def test_cell_is_maintained_on_save(self):
+        p = ProyectosHabitacionales.objects.first()
+        self.assertEqual(p.celda_geo, spatial.geohash_encode(p.latitud, p.longitud))
+        p.latitud, p.longitud = None, None
+        p.save()
+        p.refresh_from_db()
+        self.assertIsNone(p.celda_geo)
+        t = Terrenos.objects.create(direccion='Calle 1', latitud=Decimal('-33.4'), longitud=Decimal('-70.6'))
+        self.assertEqual(t.celda_geo, spatial.geohash_encode(-33.4, -70.6))
+
+    def test_within_radius_matches_brute_force(self):
+        qs = ProyectosHabitacionales.objects.all()
+        for lat, lng, radius in [(-33.45, -70.66, 5), (-33.5, -70.7, 25), (-33.0, -71.0, 60), (-20.0, -70.0, 10)]:
+            rows = spatial.within_radius(qs, lat, lng, radius, fields=('id_proyecto',))
+            self.assertEqual([r['id_proyecto'] for r in rows], self.brute_force(lat, lng, radius))
+
+    def test_k_nearest(self):
+        rows = spatial.k_nearest(ProyectosHabitacionales.objects.all(), -33.45, -70.66, 5, fields=('id_proyecto',))
+        self.assertEqual([r['id_proyecto'] for r in rows], self.brute_force(-33.45, -70.66, 1000)[:5])
+
+    def test_prefilter_uses_a_single_query(self):
+        with self.assertNumQueries(1):
+            spatial.within_radius(ProyectosHabitacionales.objects.all(), -33.45, -70.66, 20, fields=('id_proyecto',))
+
+    def test_endpoints(self):
+        client = APIClient()
+        r = client.get('/api/proyectos/cercanos/', {'lat': -33.45, 'lng': -70.66, 'radio_km': 15})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual([p['id_proyecto'] for p in r.json()['results']], self.brute_force(-33.45, -70.66, 15))
+        r = client.get('/api/proyectos/mas-cercanos/', {'lat': -33.45, 'lng': -70.66, 'k': 3})
+        self.assertEqual(len(r.json()['results']), 3)
+        self.assertIn('distancia_km', r.json()['results'][0])
+        self.assertEqual(client.get('/api/proyectos/cercanos/', {'lat': 'x', 'lng': 1}).status_code, 400)
+        self.assertEqual(client.get('/api/proyectos/cercanos/', {'lat': -33, 'lng': -70, 'radio_km': -1}).status_code, 400)
+        for raro in ('nan', 'inf'):
+            self.assertEqual(client.get('/api/proyectos/cercanos/', {'lat': -33, 'lng': -70, 'radio_km': raro}).status_code, 400)
+            self.assertEqual(client.get('/api/proyectos/cercanos/', {'lat': raro, 'lng': -70}).status_code, 400)
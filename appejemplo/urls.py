@@ -1,11 +1,11 @@
 
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
 from . import views
+from .bulk import BulkRouter
 from django.contrib.auth import views as auth_views
 
 # Router para API REST
-router = DefaultRouter()
+router = BulkRouter()
 router.register(r'beneficiarios', views.BeneficiariosViewSet)
 router.register(r'proyectos', views.ProyectosHabitacionalesViewSet)
 router.register(r'postulaciones', views.PostulacionesViewSet)
@@ -43,8 +43,17 @@ urlpatterns = [
     path('reportes/', views.reportes, name='reportes'),
     path('calendar/', views.calendar_view, name='calendar'),
     path('api/events/', views.events_api, name='events_api'),
+    path('api/events/stats/', views.events_stats_api, name='events_stats_api'),
+    path('api/events/heatmap/', views.events_heatmap_api, name='events_heatmap_api'),
+    path('api/events/conflicts/', views.events_conflicts_api, name='events_conflicts_api'),
+    path('api/events/<str:token>.ics', views.events_ical_feed, name='events_ical_feed'),
     
     # Rutas explícitas que deben evaluarse antes del router DRF
+    path('api/actividad/', views.actividad_reciente_api, name='actividad_reciente_api'),
+    path('api/direcciones/autocompletar/', views.direcciones_autocompletar_api, name='direcciones_autocompletar_api'),
+    path('api/proyectos/geo/', views.proyectos_geo_api, name='proyectos_geo_api'),
+    path('api/proyectos/cercanos/', views.proyectos_cercanos_api, name='proyectos_cercanos_api'),
+    path('api/proyectos/mas-cercanos/', views.proyectos_mas_cercanos_api, name='proyectos_mas_cercanos_api'),
     path('api/matching/ejecutar/', views.ejecutar_matching_api, name='ejecutar_matching_api'),
     path('api/matching/<int:matching_id>/aprobar/', views.aprobar_matching_api, name='aprobar_matching_api'),
     path('api/matching/<int:matching_id>/rechazar/', views.rechazar_matching_api, name='rechazar_matching_api'),
@@ -1,5 +1,6 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib import messages
+from django.db import connection, transaction
 from django.db.models import Count, Avg, Sum, Q
 from rest_framework import viewsets, filters, status
 from rest_framework import permissions
@@ -16,10 +17,24 @@ from django.views.decorators.http import require_POST
 import datetime
 import calendar
 from .matching_algorithm import MatchingAlgorithm
+from .activity_feed import ActivityFeed
+from .roles import active_user_roles, user_roles
+from .recurrence import parse_rrule
+from .conflicts import (BatchSchedule, candidate_from_payload, candidate_intervals, conflicts_for_event,
+                        find_conflicts)
+from .ical_feed import feed_cache_key, feed_etag, feed_token, iter_feed_cached, user_from_feed_token
+from . import calendar_stats
+from .events import (events_in_range, make_sync_token, parse_filters, parse_sync_token, parse_window,
+                     serialize_events, sync_changes)
 from .models import LogAuditoria, Notificacion
-import folium
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
+from .geocoding import address_query
+from .geocode_jobs import request_coordinates
+from .maps import render_map
+from .api_filters import FieldFilterBackend
+from .bulk import BulkWriteMixin
+from .pagination import KeysetPagination, SizedPageNumberPagination
+from .sparse_fields import SparseFieldsViewSetMixin
+from . import address_index, proyectos_geo, spatial
 
 # ===== VISTAS WEB (Templates) =====
 
@@ -28,32 +43,15 @@ from django.middleware.csrf import get_token
 
 from django.views.decorators.csrf import csrf_protect
 from django.template.context_processors import csrf
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponseNotAllowed
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, HttpResponseNotAllowed, StreamingHttpResponse
+from django.core.cache import cache
 from django.views.decorators.http import require_http_methods
 import json
+import math
 
 
 # Helper: normalizar roles a claves canónicas usadas por frontend/backend
-def _canonical_role_from_string(raw):
-    if not raw:
-        return None
-    try:
-        r = str(raw).strip().lower()
-    except Exception:
-        return None
-    role_map = {
-        'empresa_constructora': 'empresa',
-        'empresa': 'empresa',
-        'beneficiario': 'beneficiario',
-        'beneficiarios': 'beneficiario',
-        'jefe_proyecto': 'jefe_proyecto',
-        'jefe': 'jefe_proyecto',
-        'ministro': 'ministro',
-        'admin': 'admin',
-        'superuser': 'admin',
-        'usuario': 'usuario',
-    }
-    return role_map.get(r, r)
+from .roles import canonical_role as _canonical_role_from_string
 
 
 @login_required
@@ -251,44 +249,50 @@ def dashboard(request):
             'porcentaje': (m['total'] / max_beneficiarios) * 100
         })
 
-    # Actividades recientes con manejo seguro de valores nulos
-    actividades_recientes = []
+    # Actividades recientes: una sola consulta UNION ALL ordenada y limitada
+    actividades_recientes = ActivityFeed.obtener(limite=5)
+
+    # determinar rol canónico del usuario (usar UsuariosSistema.tipo_usuario si existe)
+    raw_role = (getattr(getattr(getattr(request.user, 'userprofile', None), 'usuariosistema', None), 'tipo_usuario', None)
+                or getattr(getattr(request.user, 'userprofile', None), 'tipo_usuario', None))
+    canonical_role = _canonical_role_from_string(raw_role) or ''
+
+    context = {
+        'total_beneficiarios': total_beneficiarios,
+        'total_proyectos': total_proyectos,
+        'total_postulaciones': total_postulaciones,
+        'total_empresas': total_empresas,
+        'beneficiarios_por_estado': beneficiarios_por_estado,
+        'proyectos_por_estado': proyectos_por_estado,
+        'postulaciones_recientes': postulaciones_recientes,
+        'proyectos_activos': proyectos_activos,
+        'distribucion_regional': distribucion_regional,
+        'trend_labels': month_labels,
+        'trend_data': postulaciones_counts,
+        'viviendas_entregadas': viviendas_entregadas,
+        'postulaciones_aprobadas': postulaciones_aprobadas,
+        'postulaciones_revision': postulaciones_revision,
+        'casos_atencion': casos_atencion,
+        'top_municipios': top_municipios,
+        'actividades_recientes': actividades_recientes,
+        'today': datetime.date.today()
+    }
     
-    # Últimas postulaciones
-    postulaciones = Postulaciones.objects.select_related('id_beneficiario', 'id_proyecto').order_by('-fecha_postulacion')[:3]
-    for p in postulaciones:
-        beneficiario_nombre = f"{p.id_beneficiario.nombre} {p.id_beneficiario.apellidos}" if p.id_beneficiario else "Beneficiario no especificado"
-        proyecto_nombre = p.id_proyecto.nombre_proyecto if p.id_proyecto else "Proyecto no especificado"
-        actividades_recientes.append({
-            'descripcion': f"Nueva postulación de {beneficiario_nombre} para {proyecto_nombre}",
-            'fecha': p.fecha_postulacion or datetime.date.today(),
-            'icon': 'file-earmark-text'
-        })
+    return render(request, 'gestion/dashboard.html', context)
 
-    # Últimos beneficiarios registrados
-    beneficiarios = Beneficiarios.objects.order_by('-fecha_registro')[:3]
-    for b in beneficiarios:
-        actividades_recientes.append({
-            'descripcion': f"Nuevo beneficiario registrado: {b.nombre} {b.apellidos}",
-            'fecha': b.fecha_registro,
-            'icon': 'person-plus'
-        })
 
-    # Últimos proyectos
-    proyectos = ProyectosHabitacionales.objects.order_by('-fecha_inicio')[:3]
-    for p in proyectos:
-        actividades_recientes.append({
-            'descripcion': f"Nuevo proyecto: {p.nombre_proyecto}",
-            'fecha': p.fecha_inicio,
-            'icon': 'building'
-        })
+@login_required
+def calendar_view(request):
+    """Vista del calendario: muestra eventos, proyectos y usuarios para agendar visitas."""
+    from django.utils import timezone
+    today = datetime.date.today()
 
-    # Ordenar actividades por fecha
-    actividades_recientes = sorted(
-        [a for a in actividades_recientes if a['fecha']], 
-        key=lambda x: x['fecha'], 
-        reverse=True
-    )[:5]
+    # Consultas básicas
+    projects = ProyectosHabitacionales.objects.order_by('nombre_proyecto')
+    # construir lista de usuarios con rol canónico para el select (una sola consulta, con caché)
+    users = [{'id': r.id, 'display': r.display, 'role': r.role or ''} for r in active_user_roles()]
+    # contadores de cabecera en una sola consulta de agregación condicional
+    counters = calendar_stats.header_counters(today)
 
     # determinar rol canónico del usuario (usar UsuariosSistema.tipo_usuario si existe)
     raw_role = (getattr(getattr(getattr(request.user, 'userprofile', None), 'usuariosistema', None), 'tipo_usuario', None)
@@ -327,38 +331,23 @@ def calendar_view(request):
 
     # Consultas básicas
     projects = ProyectosHabitacionales.objects.order_by('nombre_proyecto')
-    users_qs = User.objects.filter(is_active=True).order_by('username')
-    # construir lista de usuarios con rol canónico para el select
-    users = []
-    for u in users_qs:
-        role_raw = None
-        try:
-            role_raw = getattr(getattr(u, 'userprofile', None), 'usuariosistema', None).tipo_usuario
-        except Exception:
-            try:
-                role_raw = getattr(getattr(u, 'userprofile', None), 'tipo_usuario', None)
-            except Exception:
-                role_raw = None
-        canonical = _canonical_role_from_string(role_raw) or ''
-        display = u.get_full_name() or u.username
-        users.append({'id': u.id, 'display': display, 'role': canonical})
-    events_qs = Evento.objects.order_by('-fecha_inicio')
-
-    total_events = events_qs.count()
-    upcoming_events = events_qs.filter(fecha_inicio__gte=today).count()
-    overdue_events = events_qs.filter(fecha_fin__lt=today).count()
-    today_events = events_qs.filter(fecha_inicio=today).count()
-
-    # Serializar eventos para uso en JS
+    # construir lista de usuarios con rol canónico para el select (una sola consulta, con caché)
+    users = [{'id': r.id, 'display': r.display, 'role': r.role or ''} for r in active_user_roles()]
+    # contadores de cabecera en una sola consulta de agregación condicional
+    counters = calendar_stats.header_counters(today)
+
+    # Serializar eventos para uso en JS (sólo la ventana visible por defecto;
+    # el calendario pide el resto a events_api según el rango mostrado)
+    window_start, window_end = default_window(today)
     events_list = []
-    for e in events_qs[:1000]:
+    for e in serialize_events(events_in_range(window_start, window_end), window=(window_start, window_end)):
         events_list.append({
-            'date': e.fecha_inicio.isoformat(),
-            'end_date': e.fecha_fin.isoformat() if e.fecha_fin else None,
-            'title': e.titulo,
-            'type': e.tipo or 'task',
-            'time': e.hora_inicio.strftime('%H:%M') if e.hora_inicio else None,
-            'project_id': e.proyecto.id_proyecto if e.proyecto else None,
+            'date': e['start'],
+            'end_date': e['end'],
+            'title': e['title'],
+            'type': e['type'] or 'task',
+            'time': e['time'],
+            'project_id': e['project_id'],
         })
 
     # determinar rol canónico del usuario (usar UsuariosSistema.tipo_usuario si existe)
@@ -367,15 +356,12 @@ def calendar_view(request):
     canonical_role = _canonical_role_from_string(raw_role)
 
     context = {
-        'total_events': total_events,
-        'upcoming_events': upcoming_events,
-        'overdue_events': overdue_events,
-        'today_events': today_events,
+        **counters,
         'projects': projects,
         'users': users,
-        'events_json': json.dumps(events_list, default=str),
         'user_type': getattr(getattr(request.user, 'userprofile', None), 'tipo_usuario', None),
         'user_tipo': getattr(getattr(request.user, 'userprofile', None), 'tipo_usuario', None),
+        'ics_feed_url': request.build_absolute_uri(reverse('gestion:events_ical_feed', args=[feed_token(request.user)])),
         # current_user_role: prefer UsuariosSistema.tipo_usuario (más granular), fallback to UserProfile.tipo_usuario
         'current_user_role': canonical_role,
         'user_company_id': getattr(getattr(request.user, 'userprofile', None), 'usuariosistema', None).id_empresa_id if getattr(getattr(request.user, 'userprofile', None), 'usuariosistema', None) else None,
@@ -395,23 +381,126 @@ def calendar_view(request):
     return render(request, 'gestion/calendar.html', context)
 
 
+@login_required
+def events_stats_api(request):
+    """Contadores del calendario y desgloses por tipo y por asignado (ventana opcional)."""
+    start = end = None
+    if request.GET.get('start') or request.GET.get('end'):
+        try:
+            start, end = parse_window(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({
+        'counters': calendar_stats.header_counters(),
+        'by_type': calendar_stats.by_type(start, end),
+        'by_assignee': calendar_stats.by_assignee(start, end),
+    })
+
+
+@login_required
+def events_heatmap_api(request):
+    """Cantidad de eventos por día en [start, end) (por defecto la ventana del calendario)."""
+    try:
+        start, end = parse_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse({'start': start.isoformat(), 'end': end.isoformat(),
+                         'days': calendar_stats.heatmap(start, end)})
+
+
+@login_required
+def events_conflicts_api(request):
+    """
+    Verificación previa de conflictos de agenda (GET con parámetros o POST JSON).
+
+    Recibe las mismas claves de fecha/hora/recurrencia que events_api más
+    `assigned_to` (y opcionalmente `exclude` con el id de un evento en edición)
+    y devuelve los eventos de esos usuarios que se solapan.
+    """
+    if request.method == 'POST':
+        try:
+            payload = json.loads(request.body.decode('utf-8'))
+        except Exception:
+            payload = request.POST.dict()
+    elif request.method == 'GET':
+        payload = request.GET.dict()
+        if len(request.GET.getlist('assigned_to')) > 1:
+            payload['assigned_to'] = request.GET.getlist('assigned_to')
+    else:
+        return HttpResponseNotAllowed(['GET', 'POST'])
+    if not isinstance(payload, dict):
+        return JsonResponse({'error': 'payload inválido'}, status=400)
+
+    _, assigned_ids = _event_refs(payload)
+    if not assigned_ids:
+        return JsonResponse({'error': 'assigned_to is required'}, status=400)
+    try:
+        ev = candidate_from_payload(payload)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    exclude = payload.get('exclude')
+    if exclude and str(exclude).isdigit():
+        ev.pk = int(exclude)
+    conflicts = conflicts_for_event(ev, assigned_ids)
+    return JsonResponse({'ok': not conflicts, 'conflicts': conflicts})
+
+
+def events_ical_feed(request, token):
+    """
+    Feed iCalendar del usuario dueño del token (para suscribirse desde apps externas).
+
+    Sin sesión: la autenticación es el token. Responde 304 si el ETag coincide,
+    sirve el cuerpo cacheado si existe y, si no, lo genera en streaming.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    user = user_from_feed_token(token)
+    if user is None:
+        return HttpResponse(status=404)
+
+    etag = feed_etag(user)
+    if_none_match = request.headers.get('If-None-Match', '')
+    if if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    cache_key = feed_cache_key(etag)
+    body = cache.get(cache_key)
+    if body is not None:
+        response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(iter_feed_cached(user, cache_key), content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=300'
+    response['Content-Disposition'] = 'inline; filename="eventos.ics"'
+    return response
+
+
 @login_required
 def events_api(request):
     """API mínima para listar y crear eventos via JSON (GET/POST)."""
     if request.method == 'GET':
-        qs = Evento.objects.order_by('-fecha_inicio')[:1000]
-        data = []
-        for e in qs:
-            data.append({
-                'id': e.id_evento,
-                'title': e.titulo,
-                'type': e.tipo,
-                'start': e.fecha_inicio.isoformat(),
-                'end': e.fecha_fin.isoformat() if e.fecha_fin else None,
-                'time': e.hora_inicio.strftime('%H:%M') if e.hora_inicio else None,
-                'project_id': e.proyecto.id_proyecto if e.proyecto else None,
-            })
-        return JsonResponse({'events': data})
+        # Sólo eventos que solapan la ventana pedida (start/end, end exclusivo)
+        try:
+            start, end = parse_window(request.GET)
+            filtros = parse_filters(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        include_assignees = str(request.GET.get('include_assignees', '')).lower() in ['1', 'true', 'yes']
+        # el token se toma antes de consultar: lo modificado durante la respuesta entra en la próxima sincronización
+        sync_token = make_sync_token()
+        if request.GET.get('since'):
+            # Sincronización incremental: sólo lo creado/modificado/eliminado desde el token
+            try:
+                since = parse_sync_token(request.GET['since'])
+            except ValueError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            data, deleted = sync_changes(since, start, end, filtros, include_assignees=include_assignees)
+            return JsonResponse({'events': data, 'deleted': deleted, 'start': start.isoformat(), 'end': end.isoformat(),
+                                 'sync_token': sync_token, 'delta': True})
+        data = serialize_events(events_in_range(start, end, **filtros), include_assignees=include_assignees, window=(start, end))
+        return JsonResponse({'events': data, 'start': start.isoformat(), 'end': end.isoformat(), 'sync_token': sync_token})
 
     if request.method == 'POST':
         # aceptar JSON o form-data
@@ -420,178 +509,333 @@ def events_api(request):
         except Exception:
             payload = request.POST.dict()
 
-        # Campos básicos
-        titulo = payload.get('title') or payload.get('titulo')
-        if not titulo:
-            return JsonResponse({'error': 'title is required'}, status=400)
+        # Modo masivo: un arreglo JSON de eventos
+        if isinstance(payload, list):
+            return _events_bulk_create(request, payload)
+        if not isinstance(payload, dict):
+            return JsonResponse({'error': 'payload inválido'}, status=400)
 
-        fecha_inicio = payload.get('start') or payload.get('fecha_inicio')
-        if not fecha_inicio:
-            return JsonResponse({'error': 'fecha_inicio is required'}, status=400)
+        ctx = _event_creator_context(request)
+        proyecto_id, assigned_ids = _event_refs(payload)
         try:
-            fecha_inicio_obj = datetime.date.fromisoformat(str(fecha_inicio))
-        except Exception:
-            return JsonResponse({'error': 'fecha_inicio inválida'}, status=400)
+            if proyecto_id is None and (payload.get('project') or payload.get('project_id')):
+                raise _EventPayloadError('proyecto no encontrado')
+            proyectos = _projects_by_id([proyecto_id] if proyecto_id else [])
+            roles = user_roles(assigned_ids) if assigned_ids else {}
+            ev = _build_event(payload, ctx, proyectos, roles)
+            ev.full_clean()
+        except _EventPayloadError as e:
+            return JsonResponse(e.as_dict(), status=e.status)
+        except Exception as e:
+            return JsonResponse({'error': 'validacion modelo', 'details': str(e)}, status=400)
 
-        fecha_fin = payload.get('end') or payload.get('fecha_fin')
-        fecha_fin_obj = None
-        if fecha_fin:
-            try:
-                fecha_fin_obj = datetime.date.fromisoformat(str(fecha_fin))
-            except Exception:
-                return JsonResponse({'error': 'fecha_fin inválida'}, status=400)
-            if fecha_fin_obj < fecha_inicio_obj:
-                return JsonResponse({'error': 'fecha_fin no puede ser anterior a fecha_inicio'}, status=400)
-
-        # Hora
-        hora_inicio = payload.get('time') or payload.get('hora_inicio')
-        hora_fin = payload.get('end_time') or payload.get('hora_fin')
-        hora_inicio_obj = None
-        hora_fin_obj = None
-        try:
-            if hora_inicio:
-                hora_inicio_obj = datetime.time.fromisoformat(str(hora_inicio))
-            if hora_fin:
-                hora_fin_obj = datetime.time.fromisoformat(str(hora_fin))
-            if hora_inicio_obj and hora_fin_obj and (datetime.datetime.combine(datetime.date.today(), hora_fin_obj) < datetime.datetime.combine(datetime.date.today(), hora_inicio_obj)):
-                return JsonResponse({'error': 'hora_fin no puede ser anterior a hora_inicio'}, status=400)
-        except Exception:
-            return JsonResponse({'error': 'hora inválida, usar HH:MM'}, status=400)
+        # Verificación opcional de conflictos de agenda de los asignados
+        if _truthy(payload.get('check_conflicts')):
+            conflicts = conflicts_for_event(ev, [uid for uid in assigned_ids if uid in roles])
+            if conflicts:
+                return JsonResponse({'error': 'conflicto de agenda', 'conflicts': conflicts}, status=409)
 
-        # Proyecto
-        proyecto_id = payload.get('project') or payload.get('project_id')
-        proyecto_obj = None
-        if proyecto_id:
-            try:
-                proyecto_obj = ProyectosHabitacionales.objects.get(pk=int(proyecto_id))
-            except Exception:
-                return JsonResponse({'error': 'proyecto no encontrado'}, status=400)
+        with transaction.atomic():
+            ev.save()
+            _bulk_assign(((ev, assigned_ids),), roles)
 
-        # All day
-        all_day = payload.get('all_day') or payload.get('allDay') or payload.get('all-day')
-        if isinstance(all_day, str):
-            all_day = all_day.lower() in ['1', 'true', 'yes', 'on']
-        else:
-            all_day = bool(all_day)
-
-        # Assigned users
-        assigned_raw = payload.get('assigned_to') or payload.get('assigned') or payload.get('assigned_to[]')
-        assigned_ids = []
-        if assigned_raw:
-            if isinstance(assigned_raw, str):
-                # comma separated or single
-                if ',' in assigned_raw:
-                    assigned_ids = [int(x) for x in assigned_raw.split(',') if x.strip().isdigit()]
-                elif assigned_raw.isdigit():
-                    assigned_ids = [int(assigned_raw)]
-            elif isinstance(assigned_raw, list):
-                assigned_ids = [int(x) for x in assigned_raw if str(x).isdigit()]
-
-        # Permisos: quién puede crear/asignar
-        is_staff = request.user.is_staff
-        user_type = getattr(getattr(request.user, 'userprofile', None), 'tipo_usuario', None)
-        user_company = getattr(getattr(request.user, 'userprofile', None), 'usuariosistema', None)
+        return JsonResponse({'ok': True, 'id': ev.id_evento})
+
+    return HttpResponseNotAllowed(['GET', 'POST'])
+
+
+# Roles que pueden crear cada tipo de evento
+EVENT_ALLOWED_CREATORS = {
+    'task': ['jefe_proyecto', 'ministro', 'admin'],
+    'meeting': ['empresa', 'admin'],
+    'deadline': ['empresa', 'admin'],
+    'agenda': ['beneficiario', 'admin']
+}
+
+# Roles que pueden ser asignados a cada tipo de evento
+EVENT_ALLOWED_ASSIGNEES = {
+    'task': ['jefe_proyecto', 'ministro', 'admin'],
+    'meeting': ['empresa', 'admin'],
+    'deadline': ['empresa', 'admin'],
+    'agenda': ['beneficiario']
+}
+
+# Máximo de eventos aceptados en una creación masiva
+EVENTS_BULK_MAX = 500
+
+
+class _EventPayloadError(Exception):
+    """Error de validación de un evento (mensaje, status HTTP y detalles opcionales)."""
+    def __init__(self, message, status=400, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+    def as_dict(self):
+        data = {'error': str(self)}
+        if self.details is not None:
+            data['details'] = self.details
+        return data
+
+
+def _truthy(value):
+    if isinstance(value, str):
+        return value.lower() in ['1', 'true', 'yes', 'on']
+    return bool(value)
+
+
+def _event_creator_context(request):
+    """Datos del creador que se reutilizan al validar uno o muchos eventos."""
+    user_type = getattr(getattr(request.user, 'userprofile', None), 'tipo_usuario', None)
+    user_company = getattr(getattr(request.user, 'userprofile', None), 'usuariosistema', None)
+    # Determine creator role (prefer UsuariosSistema.tipo_usuario then UserProfile.tipo_usuario)
+    try:
+        raw_creator_role = getattr(request.user.userprofile.usuariosistema, 'tipo_usuario', None) or getattr(request.user.userprofile, 'tipo_usuario', None)
+    except Exception:
+        raw_creator_role = getattr(getattr(request.user, 'userprofile', None), 'tipo_usuario', None)
+    return {
+        'user': request.user,
+        'is_staff': request.user.is_staff,
+        'user_type': user_type,
         # usar el id raw del FK para comparar correctamente
-        user_company_id = user_company.id_empresa_id if user_company else None
+        'user_company_id': user_company.id_empresa_id if user_company else None,
+        'creator_role': _canonical_role_from_string(raw_creator_role),
+    }
 
-        # Empresa users only create events for their own projects
-        if (user_type == 'empresa') and proyecto_obj:
-            try:
-                proj_company = proyecto_obj.id_empresa_constructora
-                if not proj_company or (proj_company.id_empresa != user_company_id):
-                    return JsonResponse({'error': 'No autorizado para crear eventos en este proyecto'}, status=403)
-            except Exception:
-                return JsonResponse({'error': 'Error verificando proyecto/empresa'}, status=403)
 
-        # Validate event type permissions and assignees by role
-        event_type = (payload.get('type') or payload.get('tipo') or '').lower()
+def _event_refs(payload):
+    """Extrae (proyecto_id, assigned_ids) de un payload sin consultar la base de datos."""
+    proyecto_raw = payload.get('project') or payload.get('project_id')
+    proyecto_id = int(proyecto_raw) if proyecto_raw and str(proyecto_raw).isdigit() else None
+
+    assigned_raw = payload.get('assigned_to') or payload.get('assigned') or payload.get('assigned_to[]')
+    assigned_ids = []
+    if assigned_raw:
+        if isinstance(assigned_raw, str):
+            # comma separated or single
+            if ',' in assigned_raw:
+                assigned_ids = [int(x) for x in assigned_raw.split(',') if x.strip().isdigit()]
+            elif assigned_raw.isdigit():
+                assigned_ids = [int(assigned_raw)]
+        elif isinstance(assigned_raw, list):
+            assigned_ids = [int(x) for x in assigned_raw if str(x).isdigit()]
+    return proyecto_id, assigned_ids
 
-        # Determine creator role (prefer UsuariosSistema.tipo_usuario then UserProfile.tipo_usuario)
-        # normalize creator role to canonical string
+
+def _projects_by_id(ids):
+    """Proyectos necesarios para validar, en una sola consulta."""
+    if not ids:
+        return {}
+    return ProyectosHabitacionales.objects.only('id_proyecto', 'id_empresa_constructora_id').in_bulk(set(ids))
+
+
+def _build_event(payload, ctx, proyectos, roles):
+    """
+    Valida un payload y construye el `Evento` sin guardarlo.
+
+    `proyectos` y `roles` vienen precargados para todo el lote, de modo que
+    validar N eventos no hace consultas por evento. Lanza _EventPayloadError.
+    """
+    # Campos básicos
+    titulo = payload.get('title') or payload.get('titulo')
+    if not titulo:
+        raise _EventPayloadError('title is required')
+
+    fecha_inicio = payload.get('start') or payload.get('fecha_inicio')
+    if not fecha_inicio:
+        raise _EventPayloadError('fecha_inicio is required')
+    try:
+        fecha_inicio_obj = datetime.date.fromisoformat(str(fecha_inicio))
+    except Exception:
+        raise _EventPayloadError('fecha_inicio inválida')
+
+    fecha_fin = payload.get('end') or payload.get('fecha_fin')
+    fecha_fin_obj = None
+    if fecha_fin:
         try:
-            raw_creator_role = getattr(request.user.userprofile.usuariosistema, 'tipo_usuario', None) or getattr(request.user.userprofile, 'tipo_usuario', None)
+            fecha_fin_obj = datetime.date.fromisoformat(str(fecha_fin))
         except Exception:
-            raw_creator_role = getattr(getattr(request.user, 'userprofile', None), 'tipo_usuario', None)
-        creator_role = _canonical_role_from_string(raw_creator_role)
-
-        # Allowed creators per event type
-        allowed_creators = {
-            'task': ['jefe_proyecto', 'ministro', 'admin'],
-            'meeting': ['empresa', 'admin'],
-            'deadline': ['empresa', 'admin'],
-            'agenda': ['beneficiario', 'admin']
-        }
-
-        # Allowed assignee roles per event type
-        allowed_assignees = {
-            'task': ['jefe_proyecto', 'ministro', 'admin'],
-            'meeting': ['empresa', 'admin'],
-            'deadline': ['empresa', 'admin'],
-            'agenda': ['beneficiario']
-        }
-
-        # If event_type is provided, enforce creation permission (admins always allowed)
-        if event_type:
-            if not request.user.is_staff:
-                allowed = allowed_creators.get(event_type)
-                if allowed and (creator_role not in allowed):
-                    return JsonResponse({'error': f'No autorizado para crear eventos de tipo {event_type}'}, status=403)
-
-        # Validate assigned users' roles match allowed assignees for this event type
-        if assigned_ids and event_type:
-            # fetch assignee roles
-            bad_assignees = []
-            for uid in assigned_ids:
-                try:
-                    u = User.objects.get(pk=uid)
-                    ar = None
-                    try:
-                        ar = getattr(u.userprofile.usuariosistema, 'tipo_usuario', None) or getattr(u.userprofile, 'tipo_usuario', None)
-                    except Exception:
-                        ar = getattr(getattr(u, 'userprofile', None), 'tipo_usuario', None)
-                    # normalizar rol del asignado antes de comparar
-                    ar_canonical = _canonical_role_from_string(ar)
-                    allowed = allowed_assignees.get(event_type)
-                    if allowed and (ar_canonical not in allowed):
-                        bad_assignees.append({'id': uid, 'role': ar, 'role_canonical': ar_canonical})
-                except User.DoesNotExist:
-                    bad_assignees.append({'id': uid, 'missing': True})
-            if bad_assignees:
-                return JsonResponse({'error': 'assigned_to contiene usuarios no permitidos para este tipo de evento', 'details': bad_assignees}, status=403)
-
-        # Non-staff regular users cannot assign other users
-        if not is_staff and user_type != 'empresa':
-            # assigned_ids must be empty or only contain the requester
-            if assigned_ids and not (len(assigned_ids) == 1 and assigned_ids[0] == request.user.id):
-                return JsonResponse({'error': 'No autorizado para asignar otros usuarios'}, status=403)
-
-        # Create event
-        ev = Evento(
-            titulo=titulo,
-            tipo=payload.get('type') or payload.get('tipo'),
-            descripcion=payload.get('description') or payload.get('descripcion'),
-            fecha_inicio=fecha_inicio_obj,
-            fecha_fin=fecha_fin_obj,
-            hora_inicio=hora_inicio_obj,
-            hora_fin=hora_fin_obj,
-            proyecto=proyecto_obj,
-            ubicacion=payload.get('location') or payload.get('ubicacion'),
-            all_day=all_day,
-            creado_por=request.user
-        )
+            raise _EventPayloadError('fecha_fin inválida')
+        if fecha_fin_obj < fecha_inicio_obj:
+            raise _EventPayloadError('fecha_fin no puede ser anterior a fecha_inicio')
+
+    # Hora
+    hora_inicio = payload.get('time') or payload.get('hora_inicio')
+    hora_fin = payload.get('end_time') or payload.get('hora_fin')
+    hora_inicio_obj = None
+    hora_fin_obj = None
+    try:
+        if hora_inicio:
+            hora_inicio_obj = datetime.time.fromisoformat(str(hora_inicio))
+        if hora_fin:
+            hora_fin_obj = datetime.time.fromisoformat(str(hora_fin))
+    except Exception:
+        raise _EventPayloadError('hora inválida, usar HH:MM')
+    if hora_inicio_obj and hora_fin_obj and (datetime.datetime.combine(datetime.date.today(), hora_fin_obj) < datetime.datetime.combine(datetime.date.today(), hora_inicio_obj)):
+        raise _EventPayloadError('hora_fin no puede ser anterior a hora_inicio')
+
+    # Proyecto
+    proyecto_id, assigned_ids = _event_refs(payload)
+    proyecto_obj = None
+    if payload.get('project') or payload.get('project_id'):
+        proyecto_obj = proyectos.get(proyecto_id)
+        if proyecto_obj is None:
+            raise _EventPayloadError('proyecto no encontrado')
+
+    # All day
+    all_day = payload.get('all_day') or payload.get('allDay') or payload.get('all-day')
+    if isinstance(all_day, str):
+        all_day = all_day.lower() in ['1', 'true', 'yes', 'on']
+    else:
+        all_day = bool(all_day)
+
+    # Recurrencia opcional: dict {'freq','interval','until','count','exceptions'} o string RRULE
+    recurrence_raw = payload.get('recurrence') or payload.get('rrule')
+    regla = None
+    if recurrence_raw:
         try:
-            ev.full_clean()
-        except Exception as e:
-            return JsonResponse({'error': 'validacion modelo', 'details': str(e)}, status=400)
-        ev.save()
+            regla = parse_rrule(recurrence_raw, fecha_inicio_obj)
+        except ValueError as e:
+            raise _EventPayloadError(str(e))
+        if regla.until and regla.until < fecha_inicio_obj:
+            raise _EventPayloadError('until no puede ser anterior a fecha_inicio')
+
+    # Empresa users only create events for their own projects
+    if (ctx['user_type'] == 'empresa') and proyecto_obj:
+        if not proyecto_obj.id_empresa_constructora_id or (proyecto_obj.id_empresa_constructora_id != ctx['user_company_id']):
+            raise _EventPayloadError('No autorizado para crear eventos en este proyecto', status=403)
+
+    # Validate event type permissions and assignees by role
+    event_type = (payload.get('type') or payload.get('tipo') or '').lower()
+
+    # If event_type is provided, enforce creation permission (admins always allowed)
+    if event_type and not ctx['is_staff']:
+        allowed = EVENT_ALLOWED_CREATORS.get(event_type)
+        if allowed and (ctx['creator_role'] not in allowed):
+            raise _EventPayloadError(f'No autorizado para crear eventos de tipo {event_type}', status=403)
+
+    # Validate assigned users' roles match allowed assignees for this event type
+    if assigned_ids and event_type:
+        bad_assignees = []
+        allowed = EVENT_ALLOWED_ASSIGNEES.get(event_type)
+        for uid in assigned_ids:
+            info = roles.get(uid)
+            if info is None:
+                bad_assignees.append({'id': uid, 'missing': True})
+            elif allowed and (info.role not in allowed):
+                bad_assignees.append({'id': uid, 'role': info.raw_role, 'role_canonical': info.role})
+        if bad_assignees:
+            raise _EventPayloadError('assigned_to contiene usuarios no permitidos para este tipo de evento', status=403, details=bad_assignees)
+
+    # Non-staff regular users cannot assign other users
+    if not ctx['is_staff'] and ctx['user_type'] != 'empresa':
+        # assigned_ids must be empty or only contain the requester
+        if assigned_ids and not (len(assigned_ids) == 1 and assigned_ids[0] == ctx['user'].id):
+            raise _EventPayloadError('No autorizado para asignar otros usuarios', status=403)
+
+    ev = Evento(
+        titulo=titulo,
+        tipo=payload.get('type') or payload.get('tipo'),
+        descripcion=payload.get('description') or payload.get('descripcion'),
+        fecha_inicio=fecha_inicio_obj,
+        fecha_fin=fecha_fin_obj,
+        hora_inicio=hora_inicio_obj,
+        hora_fin=hora_fin_obj,
+        proyecto=proyecto_obj,
+        ubicacion=payload.get('location') or payload.get('ubicacion'),
+        all_day=all_day,
+        creado_por=ctx['user']
+    )
+    if regla:
+        ev.recurrencia_freq = regla.freq
+        ev.recurrencia_intervalo = regla.interval
+        ev.recurrencia_hasta = regla.until
+        ev.recurrencia_count = regla.count
+        ev.recurrencia_excepciones = [d.isoformat() for d in regla.exceptions] or None
+    return ev
 
-        if assigned_ids:
-            users_qs = User.objects.filter(id__in=assigned_ids)
-            ev.asignados.set(users_qs)
 
-        return JsonResponse({'ok': True, 'id': ev.id_evento})
+def _bulk_assign(pairs, existing_ids):
+    """
+    Inserta las filas de `asignados` de muchos eventos con un solo bulk_create.
 
-    return HttpResponseNotAllowed(['GET', 'POST'])
+    Sólo se asignan usuarios existentes (`existing_ids`, normalmente las claves
+    de `user_roles`); los inexistentes se ignoran, como hacía asignados.set().
+    """
+    through = Evento.asignados.through
+    rows = []
+    for ev, assigned_ids in pairs:
+        for uid in dict.fromkeys(assigned_ids):
+            if uid in existing_ids:
+                rows.append(through(evento_id=ev.id_evento, user_id=uid))
+    if rows:
+        through.objects.bulk_create(rows)
+
+
+def _events_bulk_create(request, items):
+    """
+    Creación masiva de eventos (POST con un arreglo JSON).
+
+    Valida todos los elementos con consultas precargadas (proyectos y roles de
+    todos los asignados en una consulta cada uno) y, si todos son válidos,
+    inserta eventos y filas de `asignados` con bulk_create en una transacción.
+    Si alguno falla no se guarda nada y se devuelven los errores por elemento.
+    """
+    if not items:
+        return JsonResponse({'error': 'arreglo vacío'}, status=400)
+    if len(items) > EVENTS_BULK_MAX:
+        return JsonResponse({'error': f'máximo {EVENTS_BULK_MAX} eventos por solicitud'}, status=400)
+
+    ctx = _event_creator_context(request)
+    refs = [_event_refs(item) if isinstance(item, dict) else (None, []) for item in items]
+    proyectos = _projects_by_id([pid for pid, _ in refs if pid])
+    all_assignees = {uid for _, ids in refs for uid in ids}
+    roles = user_roles(all_assignees) if all_assignees else {}
+
+    # los elementos aceptados del lote también cuentan como agenda ocupada
+    chequear = any(isinstance(item, dict) and _truthy(item.get('check_conflicts')) for item in items)
+    lote = BatchSchedule() if chequear else None
+
+    eventos = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            if not isinstance(item, dict):
+                raise _EventPayloadError('elemento inválido, se esperaba un objeto')
+            ev = _build_event(item, ctx, proyectos, roles)
+            # FKs ya validadas con las consultas precargadas
+            ev.full_clean(exclude=['proyecto', 'creado_por'])
+            if lote is not None:
+                asignados = [uid for uid in refs[index][1] if uid in roles]
+                intervals, window = candidate_intervals(ev)
+                if _truthy(item.get('check_conflicts')):
+                    conflicts = find_conflicts(asignados, intervals, window) + lote.conflicts(asignados, intervals)
+                    if conflicts:
+                        raise _EventPayloadError('conflicto de agenda', status=409, details=conflicts)
+                lote.add(asignados, intervals, index, ev.titulo)
+            eventos.append((ev, refs[index][1]))
+        except _EventPayloadError as e:
+            errors.append(dict(e.as_dict(), index=index, status=e.status))
+        except Exception as e:
+            errors.append({'index': index, 'status': 400, 'error': 'validacion modelo', 'details': str(e)})
+
+    if errors:
+        return JsonResponse({'ok': False, 'errors': errors}, status=400)
+
+    with transaction.atomic():
+        nuevos = [ev for ev, _ in eventos]
+        for ev in nuevos:
+            # bulk_create no llama a save(): calcular aquí los campos derivados
+            ev.actualizar_recurrencia_fin()
+        if connection.features.can_return_rows_from_bulk_insert:
+            Evento.objects.bulk_create(nuevos)
+        else:
+            # backends sin RETURNING (p.ej. MySQL) no devuelven las PKs de bulk_create
+            for ev in nuevos:
+                ev.save()
+        _bulk_assign(eventos, roles)
+
+    return JsonResponse({'ok': True, 'ids': [ev.id_evento for ev in nuevos]}, status=201)
 
 
 def beneficiarios_list(request):
@@ -688,20 +932,21 @@ def beneficiario_detail(request, pk):
 
     # Generar mapa si tiene coordenadas
     mapa_html = None
+    geocode_pending = False
     if beneficiario.latitud and beneficiario.longitud:
         popup_text = f"{beneficiario.nombre} {beneficiario.apellidos}<br>{beneficiario.direccion}"
         mapa_html = generar_mapa(beneficiario.latitud, beneficiario.longitud, popup_text)
     elif beneficiario.direccion:
-        # Intentar geocodificar si no tiene coordenadas
-        lat, lng = geocodificar_direccion(
+        # Sin coordenadas: usar la caché o encolar la geocodificación (nunca bloquear la vista)
+        estado, coords = request_coordinates(address_query(
             beneficiario.direccion,
             beneficiario.id_municipio.nombre_municipio if beneficiario.id_municipio else None,
             beneficiario.id_municipio.id_region.nombre_region if beneficiario.id_municipio and beneficiario.id_municipio.id_region else None
-        )
-        if lat and lng:
-            beneficiario.latitud = lat
-            beneficiario.longitud = lng
-            beneficiario.save()
+        ), beneficiario)
+        geocode_pending = estado == 'pending'
+        if coords:
+            lat, lng = coords
+            Beneficiarios.objects.filter(pk=beneficiario.pk).update(latitud=lat, longitud=lng)
             popup_text = f"{beneficiario.nombre} {beneficiario.apellidos}<br>{beneficiario.direccion}"
             mapa_html = generar_mapa(lat, lng, popup_text)
 
@@ -709,6 +954,7 @@ def beneficiario_detail(request, pk):
         'beneficiario': beneficiario,
         'postulaciones': postulaciones,
         'mapa_html': mapa_html,
+        'geocode_pending': geocode_pending,
     }
     # asegurar que el token CSRF esté disponible en la plantilla (meta tag)
     try:
@@ -840,7 +1086,7 @@ class ProyectoPermission(permissions.BasePermission):
         return False
 
 
-class ProyectosHabitacionalesViewSet(viewsets.ModelViewSet):
+class ProyectosHabitacionalesViewSet(SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     """API CRUD para ProyectosHabitacionales."""
     queryset = ProyectosHabitacionales.objects.all().select_related('id_municipio', 'id_empresa_constructora', 'id_terreno')
     serializer_class = globals().get('ProyectosHabitacionalesSerializer')
@@ -984,22 +1230,25 @@ def proyecto_detail(request, pk):
     mapa_html = None
     map_lat = None
     map_lng = None
+    geocode_pending = False
     if proyecto.id_terreno and proyecto.id_terreno.latitud and proyecto.id_terreno.longitud:
         popup_text = f"Proyecto: {proyecto.nombre_proyecto}<br>Dirección: {proyecto.id_terreno.direccion}"
         mapa_html = generar_mapa(proyecto.id_terreno.latitud, proyecto.id_terreno.longitud, popup_text)
         map_lat = float(proyecto.id_terreno.latitud)
         map_lng = float(proyecto.id_terreno.longitud)
     elif proyecto.id_terreno and proyecto.id_terreno.direccion:
-        # Intentar geocodificar si no tiene coordenadas
-        lat, lng = geocodificar_direccion(
+        # Sin coordenadas: usar la caché o encolar la geocodificación (nunca bloquear la vista)
+        estado, coords = request_coordinates(address_query(
             proyecto.id_terreno.direccion,
             proyecto.id_municipio.nombre_municipio if proyecto.id_municipio else None,
             proyecto.id_municipio.id_region.nombre_region if proyecto.id_municipio and proyecto.id_municipio.id_region else None
-        )
-        if lat and lng:
-            proyecto.id_terreno.latitud = lat
-            proyecto.id_terreno.longitud = lng
-            proyecto.id_terreno.save()
+        ), proyecto.id_terreno)
+        geocode_pending = estado == 'pending'
+        if coords:
+            lat, lng = coords
+            Terrenos.objects.filter(pk=proyecto.id_terreno.pk).update(
+                latitud=lat, longitud=lng, celda_geo=spatial.geohash_encode(lat, lng))
+            proyectos_geo.invalidate_geo_cache()
             popup_text = f"Proyecto: {proyecto.nombre_proyecto}<br>Dirección: {proyecto.id_terreno.direccion}"
             mapa_html = generar_mapa(lat, lng, popup_text)
             try:
@@ -1031,6 +1280,7 @@ def proyecto_detail(request, pk):
         'mapa_html': mapa_html,
         'map_lat': map_lat,
         'map_lng': map_lng,
+        'geocode_pending': geocode_pending,
     }
 
     return render(request, 'gestion/proyecto_detail.html', context)
@@ -1530,13 +1780,21 @@ def postulacion_update(request, pk):
 
 # ===== API REST VIEWSETS =====
 
-class BeneficiariosViewSet(viewsets.ModelViewSet):
+class BeneficiariosViewSet(BulkWriteMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Beneficiarios.objects.select_related('id_municipio').all()
     serializer_class = BeneficiariosSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [FieldFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_fields = {
+        'municipio': 'id_municipio',
+        'region': 'id_municipio__id_region',
+        'estado': 'estado_beneficiario',
+        'puntaje': 'puntaje_socioeconomico',
+        'fecha_registro': 'fecha_registro',
+    }
     search_fields = ['nombre', 'apellidos', 'rut', 'email']
     ordering_fields = ['fecha_registro', 'puntaje_socioeconomico']
     ordering = ['-fecha_registro']
+    pagination_class = SizedPageNumberPagination
     
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
@@ -1552,12 +1810,20 @@ class BeneficiariosViewSet(viewsets.ModelViewSet):
         })
 
 
-class ProyectosHabitacionalesViewSet(viewsets.ModelViewSet):
+class ProyectosHabitacionalesViewSet(SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = ProyectosHabitacionales.objects.select_related(
         'id_municipio', 'id_empresa_constructora', 'id_terreno'
     ).all()
     serializer_class = ProyectosHabitacionalesSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [FieldFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_fields = {
+        'municipio': 'id_municipio',
+        'region': 'id_municipio__id_region',
+        'empresa': 'id_empresa_constructora',
+        'terreno': 'id_terreno',
+        'estado': 'estado_proyecto',
+        'fecha_inicio': 'fecha_inicio',
+    }
     search_fields = ['nombre_proyecto', 'descripcion']
     ordering_fields = ['fecha_inicio', 'numero_viviendas']
     ordering = ['-fecha_inicio']
@@ -1576,12 +1842,23 @@ class ProyectosHabitacionalesViewSet(viewsets.ModelViewSet):
         })
 
 
-class PostulacionesViewSet(viewsets.ModelViewSet):
+class PostulacionesViewSet(BulkWriteMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Postulaciones.objects.select_related('id_beneficiario', 'id_proyecto').all()
     serializer_class = PostulacionesSerializer
-    filter_backends = [filters.OrderingFilter]
+    filter_backends = [FieldFilterBackend, filters.OrderingFilter]
+    filter_fields = {
+        'beneficiario': 'id_beneficiario',
+        'proyecto': 'id_proyecto',
+        'municipio': 'id_proyecto__id_municipio',
+        'region': 'id_proyecto__id_municipio__id_region',
+        'estado': 'estado_postulacion',
+        'puntaje': 'puntaje_asignado',
+        'fecha_postulacion': 'fecha_postulacion',
+        'fecha_asignacion': 'fecha_asignacion',
+    }
     ordering_fields = ['fecha_postulacion', 'puntaje_asignado']
     ordering = ['-fecha_postulacion']
+    pagination_class = KeysetPagination
     
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
@@ -1597,55 +1874,85 @@ class PostulacionesViewSet(viewsets.ModelViewSet):
         })
 
 
-class MunicipiosViewSet(viewsets.ReadOnlyModelViewSet):
+class MunicipiosViewSet(SparseFieldsViewSetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Municipios.objects.select_related('id_region').all()
     serializer_class = MunicipiosSerializer
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [FieldFilterBackend, filters.SearchFilter]
+    filter_fields = {'region': 'id_region'}
     search_fields = ['nombre_municipio', 'codigo_municipio']
 
 
-class RegionesViewSet(viewsets.ReadOnlyModelViewSet):
+class RegionesViewSet(SparseFieldsViewSetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Regiones.objects.all()
     serializer_class = RegionesSerializer
 
 
-class EmpresasConstructorasViewSet(viewsets.ModelViewSet):
+class EmpresasConstructorasViewSet(SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = EmpresasConstructoras.objects.all()
     serializer_class = EmpresasConstructorasSerializer
     filter_backends = [filters.SearchFilter]
     search_fields = ['razon_social', 'rut_empresa']
 
 
-class TerrenosViewSet(viewsets.ModelViewSet):
+class TerrenosViewSet(SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Terrenos.objects.select_related('id_municipio').all()
     serializer_class = TerrenosSerializer
+    filter_backends = [FieldFilterBackend]
+    filter_fields = {
+        'municipio': 'id_municipio',
+        'region': 'id_municipio__id_region',
+        'estado': 'estado_terreno',
+    }
 
 
-class LogAuditoriaViewSet(viewsets.ModelViewSet):
+class LogAuditoriaViewSet(SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = LogAuditoria.objects.select_related('id_usuario').all()
     serializer_class = LogAuditoriaSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [FieldFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_fields = {
+        'usuario': 'id_usuario',
+        'accion': 'accion',
+        'tabla': 'tabla',
+        'timestamp': 'timestamp',
+    }
     search_fields = ['accion', 'tabla', 'id_usuario__username']
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
+    pagination_class = KeysetPagination
 
 
-class NotificacionViewSet(viewsets.ModelViewSet):
+class NotificacionViewSet(SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Notificacion.objects.select_related('id_usuario').all()
     serializer_class = NotificacionSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [FieldFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_fields = {
+        'usuario': 'id_usuario',
+        'tipo': 'tipo',
+        'leida': 'leida',
+        'fecha_envio': 'fecha_envio',
+    }
     search_fields = ['tipo', 'mensaje', 'id_usuario__username']
     ordering_fields = ['fecha_envio']
     ordering = ['-fecha_envio']
+    pagination_class = KeysetPagination
 
 
-class MatchingViewSet(viewsets.ModelViewSet):
+class MatchingViewSet(SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Matching.objects.select_related('id_beneficiario', 'id_proyecto').all()
     serializer_class = MatchingSerializer
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [FieldFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_fields = {
+        'beneficiario': 'id_beneficiario',
+        'proyecto': 'id_proyecto',
+        'region': 'id_proyecto__id_municipio__id_region',
+        'estado': 'estado',
+        'puntaje': 'puntaje_compatibilidad',
+        'fecha_matching': 'fecha_matching',
+    }
     search_fields = ['id_beneficiario__nombre', 'id_proyecto__nombre_proyecto']
     ordering_fields = ['fecha_matching', 'puntaje_compatibilidad']
     ordering = ['-fecha_matching']
+    pagination_class = KeysetPagination
 
 
 # ===== API Endpoints adicionales =====
@@ -1688,6 +1995,114 @@ def dashboard_api(request):
     return Response(stats)
 
 
+@api_view(['GET'])
+def actividad_reciente_api(request):
+    """API del feed de actividad reciente con paginación por keyset.
+
+    Parámetros: `limit` (máx. 100) y `before` (cursor del último elemento recibido).
+    """
+    try:
+        limite = int(request.GET.get('limit') or ActivityFeed.LIMITE_DEFECTO)
+        if limite <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        return Response({'error': 'limit inválido'}, status=400)
+    try:
+        actividades = ActivityFeed.obtener(limite=limite, antes_de=request.GET.get('before') or None)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+
+    siguiente = actividades[-1]['cursor'] if len(actividades) == min(limite, ActivityFeed.LIMITE_MAXIMO) else None
+    return Response({
+        'results': actividades,
+        'next_cursor': siguiente,
+    })
+
+
+PROYECTOS_CERCANOS_CAMPOS = ('id_proyecto', 'nombre_proyecto', 'estado_proyecto', 'numero_viviendas', 'id_municipio')
+
+
+def _punto_consulta(params):
+    """(lat, lng) de los parámetros `lat` y `lng`; ValueError si faltan o están fuera de rango."""
+    try:
+        lat, lng = float(params['lat']), float(params['lng'])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('lat y lng son obligatorios y numéricos')
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('lat/lng fuera de rango')
+    return lat, lng
+
+
+def _positivo(params, name, default, maximo, cast=float):
+    try:
+        value = cast(params.get(name) or default)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} inválido')
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError(f'{name} inválido')
+    return min(value, maximo)
+
+
+@api_view(['GET'])
+def proyectos_cercanos_api(request):
+    """Proyectos a menos de `radio_km` (por defecto 10, máx. 500) de (`lat`, `lng`), ordenados por distancia.
+
+    `limit` (por defecto 100, máx. 1000) acota la cantidad de resultados.
+    """
+    try:
+        lat, lng = _punto_consulta(request.GET)
+        radio = _positivo(request.GET, 'radio_km', 10, 500)
+        limite = _positivo(request.GET, 'limit', 100, 1000, cast=int)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    resultados = spatial.within_radius(ProyectosHabitacionales.objects.all(), lat, lng, radio,
+                                       fields=PROYECTOS_CERCANOS_CAMPOS)
+    return Response({'count': len(resultados), 'radio_km': radio, 'results': resultados[:limite]})
+
+
+@login_required
+def direcciones_autocompletar_api(request):
+    """Sugerencias de direcciones ya registradas para `q` (mín. 2 caracteres, `limit` máx. 10)."""
+    q = (request.GET.get('q') or '').strip()
+    if len(q) < 2:
+        return JsonResponse({'results': []})
+    try:
+        limit = max(1, min(int(request.GET.get('limit') or address_index.TOP_K), address_index.TOP_K))
+    except ValueError:
+        return JsonResponse({'error': 'limit inválido'}, status=400)
+    results = [{'direccion': e['direccion'], 'municipio': e['municipio'],
+                'latitud': e['latitud'], 'longitud': e['longitud']}
+               for e in address_index.get_index().suggest(q, limit)]
+    return JsonResponse({'results': results})
+
+
+def proyectos_geo_api(request):
+    """GeoJSON compacto de proyectos (`bbox`=oeste,sur,este,norte, `zoom`), agrupado en zoom bajo."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        bbox = proyectos_geo.parse_bbox(request.GET.get('bbox'))
+        zoom = proyectos_geo.parse_zoom(request.GET.get('zoom'))
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    response = HttpResponse(proyectos_geo.geojson_body(bbox, zoom), content_type='application/geo+json')
+    response['Cache-Control'] = f'public, max-age={proyectos_geo.GEO_CACHE_TTL}'
+    return response
+
+
+@api_view(['GET'])
+def proyectos_mas_cercanos_api(request):
+    """Los `k` proyectos (por defecto 10, máx. 100) más cercanos a (`lat`, `lng`)."""
+    try:
+        lat, lng = _punto_consulta(request.GET)
+        k = _positivo(request.GET, 'k', 10, 100, cast=int)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=400)
+    resultados = spatial.k_nearest(ProyectosHabitacionales.objects.all(), lat, lng, k,
+                                   fields=PROYECTOS_CERCANOS_CAMPOS)
+    return Response({'k': k, 'results': resultados})
+
+
 @api_view(['POST'])
 def ejecutar_matching_api(request):
     """API para ejecutar el algoritmo de matching automático"""
@@ -1695,12 +2110,15 @@ def ejecutar_matching_api(request):
         region_id = request.data.get('region_id')
         municipio_id = request.data.get('municipio_id')
         limite_proyectos = request.data.get('limite_proyectos')
+        # sin el parámetro se usa settings.MATCHING_DISTANCE_SCORE
+        por_distancia = request.data.get('por_distancia')
 
         # Ejecutar matching
         resultados = MatchingAlgorithm.ejecutar_matching(
             region_id=region_id,
             municipio_id=municipio_id,
-            limite_proyectos=limite_proyectos
+            limite_proyectos=limite_proyectos,
+            por_distancia=None if por_distancia in (None, '') else _truthy(por_distancia)
         )
 
         # Log de auditoría
@@ -1759,27 +2177,7 @@ def rechazar_matching_api(request, matching_id):
 
 
 def generar_mapa(lat, lng, popup_text, zoom_start=15):
-    """Genera un mapa con Folium centrado en lat, lng con un marcador."""
-    if not lat or not lng:
-        return None
-    mapa = folium.Map(location=[lat, lng], zoom_start=zoom_start)
-    folium.Marker([lat, lng], popup=popup_text).add_to(mapa)
-    return mapa._repr_html_()
-
-def geocodificar_direccion(direccion, municipio=None, region=None):
-    """Geocodifica una dirección usando geopy."""
-    geolocator = Nominatim(user_agent="sistema_habitacional")
-    query = direccion
-    if municipio:
-        query += f", {municipio}"
-    if region:
-        query += f", {region}, Chile"
-    try:
-        location = geolocator.geocode(query, timeout=10)
-        if location:
-            return location.latitude, location.longitude
-    except (GeocoderTimedOut, GeocoderUnavailable):
-        pass
-    return None, None
+    """Genera el mapa centrado en lat, lng con un marcador (cacheado, ver maps.render_map)."""
+    return render_map(lat, lng, popup_text, zoom=zoom_start)
 
 # Create your views here.